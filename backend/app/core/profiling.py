@@ -0,0 +1,142 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it is sampled (PROFILE_SAMPLE_RATE, 0-1) or, if
+PROFILE_ALLOW_HEADER is set, when it carries an "X-Profile: 1" header. The dump is
+kept only if the request took at least PROFILE_SLOW_SECONDS (header requests are
+always kept) and is written to PROFILE_DIR; its name is returned in the
+X-Profile-File response header.
+
+PROFILE_MODE selects the profiler:
+  cprofile  deterministic cProfile of the event-loop thread (.prof, open with pstats
+            or snakeviz); concurrent requests on the loop show up in it too
+  sample    a background thread samples the event-loop thread's stack every
+            PROFILE_SAMPLE_INTERVAL seconds (.folded, for flamegraph.pl/speedscope)
+One request is profiled at a time; others run unprofiled meanwhile.
+"""
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ALLOW_HEADER = os.getenv("PROFILE_ALLOW_HEADER", "false").lower() in ("1", "true", "yes")
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", "1.0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+PROFILE_HEADER = b"x-profile"
+
+_active = threading.Lock()
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts identical stacks."""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+def _dump_path(method: str, path: str, seconds: float, extension: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    return os.path.join(PROFILE_DIR, f"{stamp}_{method}_{slug}_{seconds * 1000:.0f}ms.{extension}")
+
+class ProfilingMiddleware:
+    """ASGI middleware implementing the sampling/header rules described above."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> Optional[bool]:
+        """None: don't profile; otherwise whether the dump is kept regardless of duration."""
+        if PROFILE_ALLOW_HEADER and dict(scope.get("headers") or []).get(PROFILE_HEADER, b"").strip() in (b"1", b"true"):
+            return True
+        if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+            return False
+        return None
+
+    async def __call__(self, scope, receive, send):
+        forced = self._wanted(scope) if scope["type"] == "http" else None
+        if forced is None or not _active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = profiler = None
+        if PROFILE_MODE == "sample":
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+        else:
+            profiler = cProfile.Profile()
+        started = time.perf_counter()
+        state = {"path": None}
+
+        async def send_wrapper(message):
+            # The dump is written before the body starts so its name can go in a header
+            if message["type"] == "http.response.start":
+                path = finish()
+                if path:
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-file", os.path.basename(path).encode())]}
+            await send(message)
+
+        def finish() -> Optional[str]:
+            if state["path"] is not None:
+                return state["path"] or None
+            seconds = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            else:
+                sampler.stop()
+            state["path"] = ""
+            try:
+                if forced or seconds >= PROFILE_SLOW_SECONDS:
+                    path = _dump_path(scope["method"], scope["path"], seconds, "prof" if profiler is not None else "folded")
+                    if profiler is not None:
+                        profiler.dump_stats(path)
+                    else:
+                        sampler.dump(path)
+                    state["path"] = path
+            except OSError as e:
+                print(f"Could not write profile: {e}")
+            finally:
+                _active.release()
+            return state["path"] or None
+
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
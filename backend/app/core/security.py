@@ -1,4 +1,4 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 import os
 import json
 
@@ -6,8 +6,11 @@ import json
 # DO NOT COMMIT THIS KEY IN PRODUCTION.
 # For this prototype, we will generate/get from env.
 KEY = os.getenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
+# Retired keys (comma-separated), still accepted for decryption until rotate_keys has run
+OLD_KEYS = [k.strip() for k in os.getenv("ENCRYPTION_OLD_KEYS", "").split(",") if k.strip()]
 
-cipher_suite = Fernet(KEY.encode())
+# Encrypts with KEY; decrypts with KEY or any of OLD_KEYS
+cipher_suite = MultiFernet([Fernet(KEY.encode())] + [Fernet(k.encode()) for k in OLD_KEYS])
 
 def encrypt_data(data: dict) -> str:
     """Encrypts a dictionary and returns a base64 encoded string."""
@@ -21,3 +24,40 @@ def decrypt_data(encrypted_str: str) -> dict:
         return {}
     decrypted_bytes = cipher_suite.decrypt(encrypted_str.encode())
     return json.loads(decrypted_bytes.decode())
+
+def rotate_token(encrypted_str: str) -> str:
+    """Re-encrypts a token under the current KEY (no-op for empty values)."""
+    if not encrypted_str:
+        return encrypted_str
+    return cipher_suite.rotate(encrypted_str.encode()).decode()
+
+class Envelope:
+    """
+    Decrypted view of an envelope: one Fernet token holding several JSON fields.
+    The token is decrypted once; each field is only JSON-decoded when first read.
+    """
+
+    def __init__(self, encoded_fields: dict):
+        self._encoded = encoded_fields
+        self._decoded = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._encoded
+
+    def get(self, name: str, default=None):
+        if name not in self._encoded:
+            return default
+        if name not in self._decoded:
+            self._decoded[name] = json.loads(self._encoded[name])
+        return self._decoded[name]
+
+def encrypt_envelope(fields: dict) -> str:
+    """Encrypts several JSON-serialisable fields as a single token (one cipher operation)."""
+    payload = {"v": 1, "fields": {name: json.dumps(value) for name, value in fields.items()}}
+    return cipher_suite.encrypt(json.dumps(payload).encode()).decode()
+
+def open_envelope(encrypted_str: str) -> Envelope:
+    if not encrypted_str:
+        return Envelope({})
+    payload = json.loads(cipher_suite.decrypt(encrypted_str.encode()).decode())
+    return Envelope(payload["fields"])
@@ -0,0 +1,242 @@
+"""
+In-process metrics in the Prometheus text exposition format (served at /metrics).
+
+Request handlers time their pipeline stages with a StageTimer:
+
+    with telemetry.StageTimer("upload", file_type="csv") as timer:
+        with telemetry.stage("parse"):
+            ...
+        timer.set_rows(len(df))
+
+Stages recorded while the timer is active (including from service code and threads
+started with asyncio.to_thread, via a context variable) are observed into
+fhp_stage_seconds when the timer exits, all with the request's final labels.
+Collectors registered with register_collector() are sampled at scrape time.
+"""
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Upper bounds of the row-count label
+ROW_BUCKETS = [(1_000, "0-1k"), (10_000, "1k-10k"), (100_000, "10k-100k"), (1_000_000, "100k-1M")]
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # per label set: bucket counts..., +Inf count, sum
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + [math.inf], series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+# (name, kind, documentation, [(labels, value)]) produced at scrape time
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+_metrics: List[_Metric] = []
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+
+def register(metric: _Metric) -> _Metric:
+    _metrics.append(metric)
+    return metric
+
+def register_collector(collector: Callable[[], Iterable[Sample]]) -> None:
+    _collectors.append(collector)
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            samples = list(collector())
+        except Exception as e:
+            print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+            continue
+        for name, kind, documentation, values in samples:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            for labels, value in values:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+STAGE_SECONDS = register(Histogram(
+    "fhp_stage_seconds", "Time spent in each request pipeline stage.", ["endpoint", "stage", "file_type", "rows"],
+))
+HTTP_REQUEST_SECONDS = register(Histogram(
+    "fhp_http_request_seconds", "HTTP request latency by route template.", ["method", "route", "status"],
+))
+LLM_TOKENS = register(Counter("fhp_llm_tokens_total", "Tokens used by advisor LLM calls.", ["model", "kind"]))
+LLM_REQUESTS = register(Counter("fhp_llm_requests_total", "Advisor LLM calls by outcome.", ["model", "outcome"]))
+
+def row_bucket(rows: Optional[int]) -> str:
+    if rows is None:
+        return "unknown"
+    for bound, label in ROW_BUCKETS:
+        if rows < bound:
+            return label
+    return "1M+"
+
+def file_type(filename: Optional[str]) -> str:
+    extension = (filename or "").rsplit(".", 1)[-1].lower() if "." in (filename or "") else ""
+    return extension if extension in ("csv", "xlsx", "xls", "pdf", "parquet", "feather", "zip") else "other" if extension else "none"
+
+_current: contextvars.ContextVar[Optional["StageTimer"]] = contextvars.ContextVar("stage_timer", default=None)
+
+class StageTimer:
+    """Collects stage durations for one request; observes them (plus "total") on exit."""
+
+    def __init__(self, endpoint: str, file_type: str = "none", rows: Optional[int] = None):
+        self.endpoint = endpoint
+        self.file_type = file_type
+        self.rows = rows
+        self.stages: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+        self._token = None
+        self._started = 0.0
+
+    def set_rows(self, rows: Optional[int]) -> None:
+        self.rows = rows
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages.append((name, seconds))
+
+    def __enter__(self) -> "StageTimer":
+        self._started = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.record("total", time.perf_counter() - self._started)
+        _current.reset(self._token)
+        labels = {"endpoint": self.endpoint, "file_type": self.file_type, "rows": row_bucket(self.rows)}
+        with self._lock:
+            stages = list(self.stages)
+        for name, seconds in stages:
+            STAGE_SECONDS.observe(seconds, stage=name, **labels)
+
+@contextmanager
+def stage(name: str):
+    """Times the block as a stage of the active StageTimer (a no-op outside one)."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - started)
+
+class HttpMetricsMiddleware:
+    """ASGI middleware observing fhp_http_request_seconds by route template (not raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=_route_template(scope),
+                status=str(status["code"]),
+            )
+
+def _route_template(scope) -> str:
+    """The request path with path parameter values put back as {name} (bounded label values)."""
+    if scope.get("route") is None:
+        return "unmatched"
+    segments = scope["path"].split("/")
+    for name, value in (scope.get("path_params") or {}).items():
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == str(value):
+                segments[i] = "{" + name + "}"
+                break
+    return "/".join(segments)
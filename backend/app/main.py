@@ -1,14 +1,69 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import AddConstraint, CreateColumn
 from .database import engine, Base
-from .routes import analysis, banking
+from .core import telemetry, profiling
+from .routes import analysis, banking, admin
+from .models import FinancialReport, BankAccount
+from .services import jobs, ai_advisor, bulk, bank_sync, pdf_parser, export
 
 Base.metadata.create_all(bind=engine)
+# create_all skips tables that already exist; add columns and indexes introduced since they were created
+_existing = {column["name"] for column in inspect(engine).get_columns(FinancialReport.__tablename__)}
+with engine.begin() as conn:
+    for column in FinancialReport.__table__.columns:
+        if column.name not in _existing:
+            conn.execute(text(f"ALTER TABLE {FinancialReport.__tablename__} ADD COLUMN {CreateColumn(column).compile(dialect=engine.dialect)}"))
+for index in FinancialReport.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
+def _scope_bank_accounts_to_reports() -> None:
+    """bank_accounts used to be unique on (provider, account_id); accounts are now per report."""
+    table = BankAccount.__table__
+    if "uq_bank_accounts_provider_account" not in {c["name"] for c in inspect(engine).get_unique_constraints(table.name)}:
+        return
+    columns = ", ".join(column.name for column in table.columns)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # SQLite cannot drop a constraint: copy the rows into a table created with the new one and swap
+            scoped = table.to_metadata(Base.metadata, name=f"{table.name}_scoped")
+            scoped.indexes.clear()  # index names clash with the old table's; recreated below
+            try:
+                scoped.create(conn)
+            finally:
+                Base.metadata.remove(scoped)
+            conn.execute(text(f"INSERT INTO {scoped.name} ({columns}) SELECT {columns} FROM {table.name}"))
+            conn.execute(text(f"DROP TABLE {table.name}"))
+            conn.execute(text(f"ALTER TABLE {scoped.name} RENAME TO {table.name}"))
+        else:
+            conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT uq_bank_accounts_provider_account"))
+            conn.execute(AddConstraint(next(c for c in table.constraints if c.name == "uq_bank_accounts_provider_account_report")))
+    for index in table.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+_scope_bank_accounts_to_reports()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pick up analysis jobs left unfinished by a previous run
+    manager = jobs.get_job_manager()
+    manager.recover()
+    yield
+    manager.shutdown()
+    bulk.shutdown()
+    export.shutdown()
+    pdf_parser.shutdown()
+    await ai_advisor.aclose()
+    await bank_sync.aclose()
 
 app = FastAPI(
     title="Financial Health Assessment Platform API",
     description="API for analyzing SME financial health using AI.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -24,9 +79,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(telemetry.HttpMetricsMiddleware)
+app.add_middleware(profiling.ProfilingMiddleware)
 
 app.include_router(analysis.router, prefix="/api/v1/analysis", tags=["analysis"])
 app.include_router(banking.router, prefix="/api/v1/banking", tags=["banking"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
 
 @app.get("/")
 def read_root():
@@ -35,3 +93,8 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def prometheus_metrics():
+    """Stage latency histograms, HTTP latency, LLM usage, advice cache and DB pool figures."""
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
@@ -1 +1 @@
-from .models import User, FinancialReport
+from .models import User, FinancialReport, ReportLineItems, PeerSketch, BankAccount, BankTransaction, CashflowCache
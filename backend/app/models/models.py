@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, JSON, Text, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
@@ -38,6 +38,11 @@ class FinancialReport(Base):
     loan_obligations = Column(JSON)
     banking_data = Column(JSON) # Transactions/Balance from API
     tax_compliance = Column(String) # Encrypted JSON
+
+    # Single encrypted envelope holding every sensitive bucket (revenue, costs, AR/AP,
+    # inventory, loans, tax, recommendations). The per-bucket columns above are only
+    # populated on reports written before the envelope existed.
+    sensitive_data = Column(Text, nullable=True)
     
     # Analysis Metadata
     industry = Column(String, default="Unknown") # E.g., Retail, Manufacturing, Services
@@ -47,4 +52,105 @@ class FinancialReport(Base):
     credit_score_estimate = Column(Integer)
     recommendations = Column(JSON) # List of suggestions
 
+    # Bumped on every update (services/report_cache); the ETag of GET /{report_id}
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
     owner = relationship("User", back_populates="reports")
+    # Set on new reports only; existing blocks are queried directly (see line_items)
+    line_items = relationship("ReportLineItems", lazy="raise")
+
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), alone or behind an equality filter
+        Index("ix_financial_reports_created_at_id", "created_at", "id"),
+        Index("ix_financial_reports_user_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_financial_reports_industry_created_at_id", "industry", "created_at", "id"),
+        Index("ix_financial_reports_risk_created_at_id", "risk_assessment", "created_at", "id"),
+        # Covers the portfolio summary (GROUP BY industry, risk tier over the score)
+        Index("ix_financial_reports_industry_risk_score", "industry", "risk_assessment", "credit_score_estimate"),
+    )
+
+class ReportLineItems(Base):
+    """
+    One encrypted block of a report bucket's line items (receivables, payables, ...).
+    `data` is a Fernet token of a JSON list of [item, amount] pairs holding the
+    bucket's items start .. start + count - 1, in upload order.
+    """
+    __tablename__ = "report_line_items"
+
+    id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, ForeignKey("financial_reports.id"), nullable=False)
+    bucket = Column(String, nullable=False) # accounts_receivable, tax_compliance, ...
+    start = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+    data = Column(Text, nullable=False)
+
+    __table_args__ = (
+        Index("ix_report_line_items_report_bucket_start", "report_id", "bucket", "start"),
+    )
+
+class PeerSketch(Base):
+    """Quantile sketch (serialized t-digest) of one ratio across one industry's reports."""
+    __tablename__ = "peer_sketches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    industry = Column(String, nullable=False)
+    metric = Column(String, nullable=False) # e.g. net_profit_margin, credit_score
+    digest = Column(JSON, nullable=False)
+    count = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("industry", "metric", name="uq_peer_sketches_industry_metric"),
+    )
+
+class BankAccount(Base):
+    """
+    A provider account synced into a report, with the provider's incremental sync cursor.
+    Rows are per report: the same provider account linked to several reports (e.g.
+    successive statements of one business) gets one row, cursor and transaction set each.
+    """
+    __tablename__ = "bank_accounts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    provider = Column(String, nullable=False) # plaid, stripe
+    account_id = Column(String, nullable=False) # Provider's account identifier
+    report_id = Column(Integer, ForeignKey("financial_reports.id"), nullable=True)
+    cursor = Column(String, nullable=True) # Opaque; null until the first sync
+    balance = Column(Float, nullable=True)
+    transaction_count = Column(Integer, default=0)
+    last_sync = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("provider", "account_id", "report_id", name="uq_bank_accounts_provider_account_report"),
+    )
+
+class BankTransaction(Base):
+    __tablename__ = "bank_transactions"
+
+    id = Column(Integer, primary_key=True)
+    bank_account_id = Column(Integer, ForeignKey("bank_accounts.id"), nullable=False)
+    provider_transaction_id = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False)
+    description = Column(String, nullable=True)
+    category = Column(String, nullable=True)
+    type = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Re-delivered transactions are dropped on insert
+        UniqueConstraint("bank_account_id", "provider_transaction_id", name="uq_bank_transactions_account_provider_txn"),
+        Index("ix_bank_transactions_account_date", "bank_account_id", "date", "id"),
+    )
+
+class CashflowCache(Base):
+    """
+    Per-report cash-flow aggregates by month (daily net flows, inflow, outflow), so a
+    new sync only recomputes months touched by transactions stored since `watermark`.
+    """
+    __tablename__ = "cashflow_cache"
+
+    report_id = Column(Integer, ForeignKey("financial_reports.id"), primary_key=True)
+    accounts_key = Column(String, nullable=False) # Linked bank_accounts ids the months were built from
+    watermark = Column(Integer, nullable=False) # Highest bank_transactions.id included
+    months = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from .. import database
+from ..database import get_db
+from ..services import reports, peers
+
+router = APIRouter()
+
+@router.post("/rescore")
+def rescore_portfolio(language: str = "en", batch_size: int = reports.RESCORE_BATCH_SIZE, db: Session = Depends(get_db)):
+    """
+    Re-scores every stored FinancialReport with the current rule-based thresholds
+    and bulk-updates risk_assessment and credit_score_estimate.
+    """
+    return reports.rescore_reports(db, language, batch_size)
+
+@router.post("/peers/rebuild")
+def rebuild_peer_sketches(batch_size: int = peers.REBUILD_BATCH_SIZE, db: Session = Depends(get_db)):
+    """Recomputes the industry peer sketches from every stored report."""
+    return peers.rebuild(db, batch_size)
+
+@router.get("/db/pool")
+async def get_pool_stats():
+    """Checked-out connections, overflow and checkout wait time for the database pools."""
+    return database.pool_stats()
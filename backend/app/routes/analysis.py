@@ -1,10 +1,18 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from sqlalchemy.orm import Session
-from ..database import get_db
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Header, Response
+from fastapi.responses import StreamingResponse
+import hashlib
+import os
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database import get_async_db, SessionLocal
 from ..models import FinancialReport
 from ..schemas import schemas
-from ..services import parser, ai_advisor
-from ..core import security
+from ..services import parser, ai_advisor, streaming, reports, jobs, bulk, portfolio, peers, parse_cache, trends, line_items, report_cache, export
+from ..services.advice_cache import get_advice_cache
+from ..services.parse_cache import get_parse_cache
+from ..services.report_cache import get_report_cache
+from ..core import telemetry
 
 router = APIRouter()
 
@@ -12,76 +20,403 @@ router = APIRouter()
 async def upload_financial_data(
     file: UploadFile = File(...), 
     language: str = "en",
-    db: Session = Depends(get_db)
+    stream: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    contents = await file.read()
-    
-    # Parse file
-    try:
-        df = parser.parse_file(contents, file.filename)
-        metrics = parser.extract_financial_metrics(df)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    
-    # AI Analysis
-    analysis_result = ai_advisor.analyze_financial_health(metrics, language)
-    
-    # Create Report with Encrypted Data
-    # We serialize and encrypt the JSON buckets to protect sensitive info at rest
-    new_report = FinancialReport(
-        user_id=1, # Hardcoded for prototyping
-        source_type="file",
-        filename=file.filename,
+    with telemetry.StageTimer("upload", file_type=telemetry.file_type(file.filename)) as timer:
+        cache = get_parse_cache()
+        # Parse file
+        if stream and file.filename.endswith('.csv'):
+            # Streaming mode: spool to disk and aggregate in bounded-size chunks
+            hasher = hashlib.sha256()
+            with telemetry.stage("read"):
+                path = await streaming.spool_upload(file, hasher=hasher)
+            try:
+                key = parse_cache.cache_key(hasher.hexdigest(), file.filename)
+                entry = cache.get(key) if cache else None
+                if entry is None:
+                    with telemetry.stage("extract"):
+                        accumulator = streaming.accumulate_csv(path)
+                    timer.set_rows(accumulator.rows)
+                    entry = {"metrics": accumulator.result(), "aggregates": accumulator.state()}
+                    if cache:
+                        cache.put(key, entry["metrics"], entry["aggregates"])
+                    cache_status = "miss"
+                else:
+                    cache_status = "hit"
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Error parsing file: {str(e)}")
+            finally:
+                os.remove(path)
+        else:
+            with telemetry.stage("read"):
+                contents, digest = await streaming.read_upload(file)
+            key = parse_cache.cache_key(digest, file.filename)
+            entry = cache.get(key) if cache else None
+            if entry is None:
+                try:
+                    with telemetry.stage("parse"):
+                        df = parser.parse_file(contents, file.filename)
+                    timer.set_rows(len(df))
+                    with telemetry.stage("extract"):
+                        metrics = parser.extract_financial_metrics(df)
+                        aggregates = streaming.MetricsAccumulator.from_metrics(df, metrics).state()
+                except Exception as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+                entry = {"metrics": metrics, "aggregates": aggregates}
+                if cache:
+                    cache.put(key, metrics, aggregates)
+                cache_status = "miss"
+            else:
+                cache_status = "hit"
+        if cache is None:
+            cache_status = "disabled"
+        # Line items go to their own table; the report keeps per-bucket summaries
+        metrics, items = line_items.split(entry["metrics"])
         
-        # Encrypt sensitive JSON data
-        revenue_streams=security.encrypt_data(metrics["revenue_streams"]),
-        cost_structure=security.encrypt_data(metrics["cost_structure"]),
-        key_metrics=metrics["net_profit"], # This one is just a float/simple dict, keeping it open for quick querying or encrypt if needed
+        # AI Analysis (bounded by the advisor latency budget)
+        with telemetry.stage("advisor"):
+            analysis_result = await ai_advisor.analyze_financial_health_async(metrics, language)
         
-        accounts_receivable=security.encrypt_data(metrics["accounts_receivable"]),
-        accounts_payable=security.encrypt_data(metrics["accounts_payable"]),
-        inventory_levels=security.encrypt_data(metrics["inventory_levels"]),
-        loan_obligations=security.encrypt_data(metrics["loan_obligations"]),
-        tax_compliance=security.encrypt_data(metrics["tax_compliance"]),
+        new_report = reports.build_report(metrics, analysis_result, file.filename, aggregates=entry["aggregates"], items=items)
         
-        industry=metrics.get("industry", "Unknown"),
+        with telemetry.stage("db_commit"):
+            db.add(new_report)
+            await db.commit()
+            await db.refresh(new_report)
+        with telemetry.stage("peers"):
+            await peers.record_async([peers.observation(new_report, metrics)])
         
-        risk_assessment=analysis_result["risk_assessment"], # Open for querying
-        credit_score_estimate=analysis_result["credit_score_estimate"],
-        recommendations=security.encrypt_data(analysis_result["recommendations"])
-    )
-    
-    db.add(new_report)
-    db.commit()
-    db.refresh(new_report)
+        response = reports.serialize_report(new_report)
+        response["advisor_degraded"] = analysis_result.get("degraded", False)
+        response["parse_cache"] = cache_status
+        return response
+
+@router.post("/bulk")
+async def bulk_upload(
+    files: List[UploadFile] = File(...),
+    language: str = "en",
+):
+    """
+    Analyzes many files at once: CSV/Excel/PDF files and/or ZIP archives of them.
+    Files are parsed in parallel and reports saved in batched transactions. The
+    response is NDJSON: one line per file as it finishes (status "completed" with its
+    report_id, or "failed" with an error), then a final {"status": "done", ...} summary.
+    """
+    paths, items = [], []
+    try:
+        for file in files:
+            path = await streaming.spool_upload(file)
+            paths.append(path)
+            items.extend(bulk.expand_upload(path, file.filename))
+            if len(items) > bulk.BULK_MAX_FILES:
+                raise HTTPException(status_code=413, detail=f"Too many files: at most {bulk.BULK_MAX_FILES} per request.")
+    except Exception:
+        for path in paths:
+            os.remove(path)
+        raise
+
+    async def results():
+        try:
+            async for line in bulk.run_bulk(items, language):
+                yield line
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.post("/jobs", response_model=schemas.JobResponse, status_code=202)
+async def create_analysis_job(
+    file: UploadFile = File(...),
+    language: str = "en",
+):
+    """
+    Queues an upload for analysis on the background worker pool and returns immediately.
+    Poll GET /jobs/{job_id} for the result.
+    """
+    manager = jobs.get_job_manager()
+    if manager.is_full():
+        # Fail fast before spooling the body when the queue is already full
+        raise HTTPException(status_code=503, detail="Analysis queue is full. Retry later.", headers={"Retry-After": "5"})
+
+    path = await streaming.spool_upload(file, directory=jobs.JOB_SPOOL_DIR)
+    try:
+        job_id = manager.submit(file.filename, language, path)
+    except jobs.JobQueueFull as e:
+        os.remove(path)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     
-    return new_report
+    return _job_response(manager.store.get(job_id), manager)
+
+@router.get("/jobs", response_model=schemas.JobQueueStats)
+async def get_job_queue_stats():
+    return jobs.get_job_manager().stats()
+
+@router.get("/jobs/{job_id}", response_model=schemas.JobResponse)
+async def get_analysis_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    manager = jobs.get_job_manager()
+    job = manager.store.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    report = None
+    if job["status"] == "completed":
+        row = await db.get(FinancialReport, job["report_id"])
+        report = reports.serialize_report(row) if row else None
+    return _job_response(job, manager, report)
+
+def _job_response(job, manager, report=None):
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "report_id": job["report_id"],
+        "error": job["error"],
+        "report": report,
+        "queue": manager.stats(),
+    }
+
+@router.get("/advisor/cache")
+async def get_advisor_cache_stats():
+    """Hit/miss/eviction counters for the advisor result cache."""
+    return get_advice_cache().stats()
+
+@router.get("/parse-cache")
+async def get_parse_cache_stats():
+    """Hit/miss/eviction counters and size of the parse result cache."""
+    cache = get_parse_cache()
+    return cache.stats() if cache else {"enabled": False}
+
+@router.get("/report-cache")
+async def get_report_cache_stats():
+    """Hit/miss/304/eviction counters and size of the decrypted report read cache."""
+    cache = get_report_cache()
+    return cache.stats() if cache else {"enabled": False}
 
-@router.get("/{report_id}", response_model=schemas.ReportResponse)
-async def get_report(report_id: int, db: Session = Depends(get_db)):
-    report = db.query(FinancialReport).filter(FinancialReport.id == report_id).first()
+def portfolio_filters(
+    user_id: Optional[int] = None,
+    industry: Optional[str] = None,
+    risk: Optional[str] = Query(None, description="Risk tier: Low, Medium or High"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+) -> Dict[str, Any]:
+    return {
+        "user_id": user_id, "industry": industry, "risk": risk,
+        "created_from": created_from, "created_to": created_to,
+        "min_score": min_score, "max_score": max_score,
+    }
+
+@router.get("/reports", response_model=schemas.ReportPage)
+async def list_reports(
+    cursor: Optional[str] = None,
+    limit: int = Query(portfolio.DEFAULT_PAGE_SIZE, ge=1, le=portfolio.MAX_PAGE_SIZE),
+    filters: Dict[str, Any] = Depends(portfolio_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Lists reports newest first without decrypting them. Filter by industry, risk tier,
+    created_at range ([created_from, created_to)) and credit score range; page with
+    the returned next_cursor.
+    """
+    try:
+        return await portfolio.list_reports(db, cursor, limit, **filters)
+    except portfolio.InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/reports/summary", response_model=schemas.PortfolioSummary)
+async def summarize_reports(
+    filters: Dict[str, Any] = Depends(portfolio_filters),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Portfolio counts and credit-score mean/min/max per industry and risk tier (same filters as the listing)."""
+    return await portfolio.summarize(db, **filters)
+
+@router.get("/export")
+def export_reports(
+    format: str = "ndjson",
+    batch_size: int = Query(export.EXPORT_BATCH_SIZE, ge=1, le=10_000),
+    filters: Dict[str, Any] = Depends(portfolio_filters),
+):
+    """
+    Streams every decrypted report matching the listing filters as NDJSON, CSV or
+    Parquet. Rows are read through a server-side cursor and decrypted in parallel
+    batches, so memory stays flat whatever the number of reports. Nested buckets
+    are JSON strings in CSV and Parquet.
+    """
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format. Use one of: {', '.join(export.FORMATS)}")
+
+    def body():
+        db = SessionLocal()
+        stats = {}
+        try:
+            yield from export.export_reports(db, format, batch_size, stats=stats, **filters)
+        finally:
+            db.close()
+        print(f"Export: {stats.get('rows')} reports as {format} in {stats.get('seconds')}s ({stats.get('rows_per_second')} rows/s)")
+
+    return StreamingResponse(
+        body(),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="reports.{format}"'},
+    )
+
+@router.get("/{report_id}", response_model=schemas.ReportProjection, response_model_exclude_unset=True)
+async def get_report(
+    report_id: int,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns a decrypted report. `fields` (comma-separated, e.g. ?fields=risk_assessment,tax_compliance)
+    restricts the response, and the decryption work, to those fields.
+    Responses carry an ETag that changes with every update of the report; send it back
+    in If-None-Match to get a 304. Recently served reports are answered from memory,
+    a 304 for them without touching the database or the cipher.
+    """
+    projection = None
+    if fields:
+        projection = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in projection if f not in reports.REPORT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    cache_fields = tuple(sorted(set(projection))) if projection else None
+    cache = get_report_cache()
+
+    with telemetry.StageTimer("get_report") as timer:
+        if cache is not None:
+            with telemetry.stage("cache_lookup"):
+                cached = cache.get(report_id, cache_fields)
+            if cached is not None:
+                tag, body = cached
+                if report_cache.etag_matches(if_none_match, tag):
+                    cache.record_not_modified()
+                    return Response(status_code=304, headers={"ETag": tag})
+                return Response(body, media_type="application/json", headers={"ETag": tag})
+
+        with telemetry.stage("db_fetch"):
+            report = await db.get(FinancialReport, report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        timer.file_type = telemetry.file_type(report.filename)
+        tag = report_cache.etag(report_id, report.version, cache_fields)
+        if report_cache.etag_matches(if_none_match, tag):
+            if cache is not None:
+                cache.record_not_modified()
+            return Response(status_code=304, headers={"ETag": tag})
+
+        data = reports.serialize_report(report, projection)
+        with telemetry.stage("serialize"):
+            body = schemas.ReportProjection(**data).model_dump_json(exclude_unset=True).encode()
+        if cache is not None:
+            cache.put(report_id, cache_fields, tag, body)
+        return Response(body, media_type="application/json", headers={"ETag": tag})
+
+@router.patch("/{report_id}/rows", response_model=schemas.ReportResponse)
+async def append_report_rows(
+    report_id: int,
+    file: UploadFile = File(...),
+    language: str = "en",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Extends a report with new rows only (same column layout as the original upload,
+    any supported format). Their aggregates are merged into the report's stored ones
+    and only the advisor is re-run; the result matches re-uploading the combined file.
+    """
+    with telemetry.StageTimer("append_rows", file_type=telemetry.file_type(file.filename)) as timer:
+        with telemetry.stage("db_fetch"):
+            report = await db.get(FinancialReport, report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        with telemetry.stage("read"):
+            contents = await file.read()
+        with telemetry.stage("parse"):
+            df = parser.parse_file(contents, file.filename)
+        timer.set_rows(len(df))
+        try:
+            analysis_result = await reports.apply_rows(db, report, df, language)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        with telemetry.stage("db_commit"):
+            await db.commit()
+            await db.refresh(report)
+
+        response = reports.serialize_report(report)
+        response["advisor_degraded"] = analysis_result.get("degraded", False)
+        return response
+
+@router.get("/{report_id}/trends", response_model=schemas.TrendResponse)
+async def get_report_trends(
+    report_id: int,
+    bucket: str = "revenue_streams",
+    granularity: str = "month",
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Monthly or quarterly totals of one bucket (or net_profit), with growth,
+    seasonality and trailing-twelve-month figures, sliced from the period cube
+    stored with the report when it was uploaded. Needs a ledger with a date column.
+    """
+    if bucket not in trends.TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket. Use one of: {', '.join(trends.TREND_BUCKETS)}")
+    if granularity not in trends.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be month or quarter")
+
+    with telemetry.StageTimer("trends") as timer:
+        with telemetry.stage("db_fetch"):
+            report = await db.get(FinancialReport, report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        timer.file_type = telemetry.file_type(report.filename)
+        with telemetry.stage("decrypt"):
+            cube = (reports.load_aggregates(report) or {}).get("periods")
+        if cube is None:
+            raise HTTPException(status_code=404, detail="No dated transactions stored for this report")
+        return {"report_id": report_id, **trends.trends(cube, bucket, granularity, category)}
+
+@router.get("/{report_id}/items", response_model=schemas.LineItemPage)
+async def list_report_items(
+    report_id: int,
+    bucket: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(line_items.DEFAULT_PAGE_SIZE, ge=1, le=line_items.MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Line items of one bucket (accounts_receivable, accounts_payable, inventory_levels,
+    loan_obligations, tax_compliance) in upload order; page with the returned next_cursor.
+    The report itself only carries each bucket's count, total and largest items.
+    """
+    if bucket not in line_items.ITEM_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Unknown bucket. Use one of: {', '.join(line_items.ITEM_BUCKETS)}")
+    with telemetry.StageTimer("items") as timer:
+        with telemetry.stage("db_fetch"):
+            report = await db.get(FinancialReport, report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        timer.file_type = telemetry.file_type(report.filename)
+        with telemetry.stage("decrypt"):
+            summary = reports.load_sensitive(report, [bucket])[bucket] or {}
+            try:
+                return await line_items.page(db, report_id, summary, bucket, cursor, limit)
+            except line_items.InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{report_id}/peers", response_model=schemas.PeerBenchmark)
+async def get_peer_benchmark(report_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Percentile of the report's key ratios (net profit margin, debt-to-revenue,
+    inventory-to-revenue, credit score) among reports in the same industry,
+    read from the per-industry quantile sketches.
+    """
+    report = await db.get(FinancialReport, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    
-    # Decrypt fields for the response
-    # We create a new dict or copy to avoid modifying the DB object in session
-    response_data = {
-        "id": report.id,
-        "filename": report.filename,
-        "created_at": report.created_at,
-        "industry": report.industry,
-        "risk_assessment": report.risk_assessment,
-        "credit_score_estimate": report.credit_score_estimate,
-        # Decrypt sensitive fields
-        "revenue_streams": security.decrypt_data(report.revenue_streams),
-        "cost_structure": security.decrypt_data(report.cost_structure),
-        "key_metrics": report.key_metrics if isinstance(report.key_metrics, dict) else {"net_profit": report.key_metrics}, # Handle legacy/types
-        "accounts_receivable": security.decrypt_data(report.accounts_receivable),
-        "accounts_payable": security.decrypt_data(report.accounts_payable),
-        "inventory_levels": security.decrypt_data(report.inventory_levels),
-        "loan_obligations": security.decrypt_data(report.loan_obligations),
-        "tax_compliance": security.decrypt_data(report.tax_compliance),
-        "recommendations": security.decrypt_data(report.recommendations)
-    }
-    
-    return response_data
+    return await peers.benchmark(db, report)
@@ -1,44 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any
-from ..database import get_db
-from ..models import FinancialReport
-from ..services import banking
-from ..core import security
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from typing import Dict, Any, Optional
+from ..core import telemetry
+from ..database import get_async_db
+from ..models import FinancialReport, BankAccount
+from ..schemas import schemas
+from ..services import banking, bank_sync, cashflow, ai_advisor, reports
 
 router = APIRouter()
 
+@router.post("/sync")
+async def sync_report_accounts(
+    report_id: int,
+    request: Optional[schemas.BankSyncRequest] = None,
+    full: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Syncs every account linked to the report, plus any accounts listed in the body
+    (which become linked), concurrently across providers. Each provider has its own
+    rate limit, retries and circuit breaker; a failing provider yields status
+    "partial" rather than failing the whole sync. `data` is the consolidated banking_data.
+    """
+    accounts = [(a.provider, a.account_id) for a in (request.accounts if request else [])]
+    unknown = sorted({p for p, _ in accounts if p.lower() not in banking.PROVIDERS})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown provider: {', '.join(unknown)}")
+
+    report = await db.get(FinancialReport, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    linked = (await db.execute(select(BankAccount.id).where(BankAccount.report_id == report_id))).first()
+    if not accounts and not linked:
+        raise HTTPException(status_code=400, detail="No accounts linked to this report; list accounts to link in the request body")
+
+    return await bank_sync.sync_report(report_id, accounts, full=full)
+
 @router.post("/sync/{provider}")
-async def sync_bank_account(provider: str, report_id: int, db: Session = Depends(get_db)):
+async def sync_bank_account(
+    provider: str,
+    report_id: int,
+    account_id: str = "acc_12345",
+    full: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Incrementally syncs one bank provider account (Plaid/Stripe) into the transaction
+    store and links it to the report. Only transactions after the account's stored
+    cursor are fetched; `full=true` re-reads the whole history (duplicates are skipped).
+    `data` is the report's consolidated banking_data (every linked account); `sync`
+    describes this account's sync.
     """
-    Simulates syncing with a bank provider (Plaid/Stripe) and updating the report.
+    if provider.lower() not in banking.PROVIDERS:
+        raise HTTPException(status_code=400, detail=f"Unknown provider: {provider}")
+
+    with telemetry.StageTimer("bank_sync") as timer:
+        with telemetry.stage("db_fetch"):
+            report = await db.get(FinancialReport, report_id)
+        if not report:
+             raise HTTPException(status_code=404, detail="Report not found")
+
+        result = await bank_sync.sync_report(report_id, [(provider, account_id)], include_linked=False, full=full)
+        sync = result["accounts"][0]
+        timer.set_rows(sync["fetched"])
+        if sync["status"] != "success":
+            raise HTTPException(status_code=502, detail=sync["error"])
+        return {"status": "success", "data": result["data"], "sync": sync}
+
+@router.get("/{report_id}/cashflow")
+async def get_cash_flow(
+    report_id: int,
+    days: int = Query(90, ge=0, le=3660, description="Trailing days of running balance to return (0 = all)"),
+    advise: bool = False,
+    language: str = "en",
+    db: AsyncSession = Depends(get_async_db),
+):
     """
-    # 1. Fetch data from external API (Mock)
+    Cash-flow analytics over the transactions of every account linked to the report:
+    monthly inflow/outflow, running daily balance, burn rate, runway and volatility.
+    Completed months come from the cash-flow cache; only months touched by
+    transactions synced since the last call are recomputed. `advise=true` re-runs the
+    advisor with these figures (as metrics["cash_flow"]) without storing the result.
+    """
+    report = await db.get(FinancialReport, report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    result = await db.run_sync(cashflow.compute, report_id, days)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No bank accounts linked to this report")
+    if advise:
+        metrics = reports.advisor_metrics(report)
+        metrics["cash_flow"] = cashflow.advisor_inputs(result)
+        result["advice"] = await ai_advisor.analyze_financial_health_async(metrics, language)
+    return result
+
+@router.get("/providers")
+async def get_provider_stats():
+    """Registered providers and, for those used since startup, call/retry counters and circuit state."""
+    return {"providers": sorted(banking.PROVIDERS), "clients": bank_sync.provider_stats()}
+
+@router.get("/accounts/{provider}/{account_id}/transactions")
+async def list_bank_transactions(
+    provider: str,
+    account_id: str,
+    report_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Synced transactions for an account in [start, end], oldest first; page with next_cursor.
+    An account linked to several reports is read from `report_id`'s copy, or by default
+    from the most recently synced one.
+    """
+    stmt = select(BankAccount).where(BankAccount.provider == provider.lower(), BankAccount.account_id == account_id)
+    if report_id is not None:
+        stmt = stmt.where(BankAccount.report_id == report_id)
+    account = (await db.execute(stmt.order_by(BankAccount.last_sync.desc().nulls_last(), BankAccount.id.desc()))).scalars().first()
+    if not account:
+        raise HTTPException(status_code=404, detail="Account has not been synced")
+
     try:
-        data = banking.fetch_banking_data(provider, "acc_12345")
-    except Exception as e:
+        stmt = banking.transactions_query(account.id, start, end, cursor, limit)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    
-    # 2. Update the report
-    report = db.query(FinancialReport).filter(FinancialReport.id == report_id).first()
-    if not report:
-         raise HTTPException(status_code=404, detail="Report not found")
-         
-    # Encrypt/Save logic would go here. For now, let's just save it to the new column.
-    # Note: banking_data is JSON column, unencrypted for this prototyped demo, 
-    # but in real app we'd encrypt it too using security.encrypt_data
-    
-    # Let's encrypt it to verify the requirement "Encryption for all financial data"
-    # But wait, the column is JSON type in my previous edit. 
-    # If I encrypt it, it becomes a string. Postgres JSON column might accept a JSON string "..."
-    # strict JSON columns might require an object/array.
-    # I'll store it as a dict but encrypt sensitive inner fields if I had time, 
-    # OR, since I set the column to JSON, I will just store it as plain JSON for now 
-    # to avoid the "Invalid JSON text" error if I pass a base64 string.
-    # To strictly follow "Mandatory encryption", I should have made it a String column. 
-    # I will stick to plain JSON for this specific column to avoid breaking the DB schema I just did 
-    # without another reset, but I'll add a comment that it *should* be encrypted.
-    
-    report.banking_data = data
-    db.commit()
-    return {"status": "success", "data": data}
+    rows = (await db.execute(stmt)).scalars().all()
+    next_cursor = banking.encode_transaction_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {
+        "provider": account.provider,
+        "account_id": account.account_id,
+        "transactions": [banking.serialize_transaction(tx) for tx in rows[:limit]],
+        "next_cursor": next_cursor,
+    }
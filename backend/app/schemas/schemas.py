@@ -38,6 +38,138 @@ class ReportResponse(ReportBase):
     risk_assessment: str
     credit_score_estimate: int
     recommendations: Optional[List[str]]
+    # Set on fresh analyses: True when the rule-based result was served instead of the LLM's
+    advisor_degraded: Optional[bool] = None
+    # Set on fresh uploads: "hit" when parsing was skipped for previously seen content, "miss" or "disabled"
+    parse_cache: Optional[str] = None
 
     class Config:
         orm_mode = True
+
+class ReportProjection(BaseModel):
+    """ReportResponse with every field optional, for ?fields= projections."""
+    id: int
+    source_type: Optional[str] = None
+    filename: Optional[str] = None
+    created_at: Optional[datetime] = None
+    revenue_streams: Optional[Dict[str, Any]] = None
+    cost_structure: Optional[Dict[str, Any]] = None
+    key_metrics: Optional[Dict[str, Any]] = None
+    
+    accounts_receivable: Optional[Dict[str, Any]] = None
+    accounts_payable: Optional[Dict[str, Any]] = None
+    inventory_levels: Optional[Dict[str, Any]] = None
+    loan_obligations: Optional[Dict[str, Any]] = None
+    banking_data: Optional[Dict[str, Any]] = None
+    tax_compliance: Optional[Dict[str, Any]] = None
+    
+    industry: Optional[str] = None
+    risk_assessment: Optional[str] = None
+    credit_score_estimate: Optional[int] = None
+    recommendations: Optional[List[str]] = None
+
+class ReportListItem(BaseModel):
+    id: int
+    created_at: datetime
+    source_type: Optional[str] = None
+    filename: Optional[str] = None
+    industry: Optional[str] = None
+    risk_assessment: Optional[str] = None
+    credit_score_estimate: Optional[int] = None
+
+class ReportPage(BaseModel):
+    items: List[ReportListItem]
+    # Pass as ?cursor= to fetch the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+class PortfolioGroup(BaseModel):
+    industry: Optional[str] = None
+    risk_assessment: Optional[str] = None
+    count: int
+    mean_score: Optional[float] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+
+class PortfolioSummary(BaseModel):
+    total: int
+    mean_score: Optional[float] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    groups: List[PortfolioGroup]
+
+class PeerPosition(BaseModel):
+    value: float
+    # Share of industry peers below this value, 0-100 (ties count half)
+    percentile: float
+    peers: int
+    p25: Optional[float] = None
+    median: Optional[float] = None
+    p75: Optional[float] = None
+
+class PeerBenchmark(BaseModel):
+    report_id: int
+    industry: str
+    # Keyed by ratio: net_profit_margin, debt_to_revenue, inventory_to_revenue, credit_score
+    metrics: Dict[str, PeerPosition]
+
+class LineItem(BaseModel):
+    item: str
+    amount: float
+
+class LineItemPage(BaseModel):
+    report_id: int
+    bucket: str
+    # Items in the bucket overall
+    count: int
+    items: List[LineItem]
+    # Pass as ?cursor= to fetch the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+class TrendPoint(BaseModel):
+    period: str # YYYY-MM or YYYY-Qn
+    total: float
+    # Percent change on the previous period; null for the first or after a zero period
+    growth: Optional[float] = None
+
+class TrailingTwelveMonths(BaseModel):
+    end: str
+    total: float
+    previous: Optional[float] = None
+    growth: Optional[float] = None
+
+class TrendResponse(BaseModel):
+    report_id: int
+    bucket: str
+    granularity: str
+    category: Optional[str] = None
+    # Categories of the bucket that can be passed as ?category=
+    categories: List[str]
+    periods: List[TrendPoint]
+    # Month (M1-M12) or quarter (Q1-Q4) of year -> mean over overall mean; empty under a year of data
+    seasonality: Dict[str, float]
+    ttm: Optional[TrailingTwelveMonths] = None
+
+class BankAccountRef(BaseModel):
+    provider: str
+    account_id: str
+
+class BankSyncRequest(BaseModel):
+    # Accounts to link to the report and sync, in addition to those already linked
+    accounts: List[BankAccountRef] = []
+
+class JobQueueStats(BaseModel):
+    workers: int
+    running: int
+    queued: int
+    capacity: int
+
+class JobResponse(BaseModel):
+    id: str
+    status: str # queued, running, completed, failed
+    filename: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    report_id: Optional[int] = None
+    error: Optional[str] = None
+    report: Optional[ReportResponse] = None
+    queue: JobQueueStats
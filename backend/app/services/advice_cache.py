@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+from cryptography.fernet import InvalidToken
+
+from ..core import security, telemetry
+
+ADVICE_CACHE_PATH = os.getenv("ADVICE_CACHE_PATH", "advice_cache.db")
+# Seconds an entry stays valid in either tier (0 = never expires)
+ADVICE_CACHE_TTL = float(os.getenv("ADVICE_CACHE_TTL", str(7 * 24 * 3600)))
+ADVICE_CACHE_MEMORY_ITEMS = int(os.getenv("ADVICE_CACHE_MEMORY_ITEMS", "1024"))
+ADVICE_CACHE_DISK_ITEMS = int(os.getenv("ADVICE_CACHE_DISK_ITEMS", "100000"))
+
+def _json_default(value):
+    # numpy scalars and similar
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def cache_key(metrics: Dict[str, Any], language: str, model: str) -> str:
+    """Canonical content hash: key order and float repr of the metrics do not matter."""
+    payload = json.dumps(
+        {"metrics": metrics, "language": language, "model": model},
+        sort_keys=True, separators=(",", ":"), default=_json_default,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class AdviceCache:
+    """
+    Two-tier cache for advisor results with single-flight.
+
+    Tier 1 is an in-process LRU, tier 2 a SQLite table (values Fernet-encrypted like
+    the report columns). Both honour the TTL and their own entry limits. Concurrent
+    get_or_compute() calls for the same key run `compute` once; the others wait for it.
+    """
+
+    def __init__(self, path: str = ADVICE_CACHE_PATH, ttl: float = ADVICE_CACHE_TTL,
+                 memory_items: int = ADVICE_CACHE_MEMORY_ITEMS, disk_items: int = ADVICE_CACHE_DISK_ITEMS):
+        self.ttl = ttl
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory = OrderedDict()  # key -> (stored_at, value)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0,
+            "memory_evictions": 0, "disk_evictions": 0, "expired": 0,
+        }
+
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS advice_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_advice_cache_accessed_at ON advice_cache (accessed_at)")
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - stored_at > self.ttl
+
+    def _get_memory(self, key: str, now: float):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry[0], now):
+            del self._memory[key]
+            self._counters["expired"] += 1
+            return None
+        self._memory.move_to_end(key)
+        return entry[1]
+
+    def _put_memory(self, key: str, value: Dict[str, Any], stored_at: float) -> None:
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self._counters["memory_evictions"] += 1
+
+    def _get_disk(self, key: str, now: float):
+        with self._db_lock:
+            row = self._conn.execute("SELECT value, stored_at FROM advice_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[1], now):
+                with self._conn:
+                    self._conn.execute("DELETE FROM advice_cache WHERE key = ?", (key,))
+                with self._lock:
+                    self._counters["expired"] += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE advice_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        try:
+            return row[1], security.decrypt_data(row[0])
+        except InvalidToken:
+            # Written under a different ENCRYPTION_KEY; treat as a miss
+            return None
+
+    def _put_disk(self, key: str, value: Dict[str, Any], now: float) -> None:
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO advice_cache (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, security.encrypt_data(value), now, now),
+            )
+            if self.ttl:
+                self._conn.execute("DELETE FROM advice_cache WHERE stored_at < ?", (now - self.ttl,))
+            overflow = self._conn.execute("SELECT COUNT(*) FROM advice_cache").fetchone()[0] - self.disk_items
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM advice_cache WHERE key IN (SELECT key FROM advice_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                with self._lock:
+                    self._counters["disk_evictions"] += overflow
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            value = self._get_memory(key, now)
+            if value is not None:
+                self._counters["memory_hits"] += 1
+                return value
+        found = self._get_disk(key, now)
+        if found is None:
+            return None
+        stored_at, value = found
+        with self._lock:
+            self._counters["disk_hits"] += 1
+            self._put_memory(key, value, stored_at)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._put_memory(key, value, now)
+        self._put_disk(key, value, now)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            # A leader may have finished between get() and here; it fills memory before leaving
+            value = self._get_memory(key, time.time())
+            if value is not None:
+                self._counters["memory_hits"] += 1
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters["misses"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            self.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            # Failures are shared with the waiters but never cached
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._db_lock:
+            disk_items = self._conn.execute("SELECT COUNT(*) FROM advice_cache").fetchone()[0]
+        with self._lock:
+            return {**self._counters, "memory_items": len(self._memory), "disk_items": disk_items, "in_flight": len(self._flights)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock, self._conn:
+            self._conn.execute("DELETE FROM advice_cache")
+
+_cache: Optional[AdviceCache] = None
+_cache_lock = threading.Lock()
+
+def get_advice_cache() -> AdviceCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AdviceCache()
+        return _cache
+
+def _cache_samples():
+    """Advice cache counters for /metrics (only once the cache has been opened)."""
+    if _cache is None:
+        return
+    stats = _cache.stats()
+    events = ["memory_hits", "disk_hits", "misses", "coalesced", "memory_evictions", "disk_evictions", "expired"]
+    yield ("fhp_advice_cache_events_total", "counter", "Advice cache lookups and evictions by event.",
+           [({"event": event}, stats[event]) for event in events])
+    yield ("fhp_advice_cache_items", "gauge", "Entries held by each advice cache tier.",
+           [({"tier": "memory"}, stats["memory_items"]), ({"tier": "disk"}, stats["disk_items"])])
+
+telemetry.register_collector(_cache_samples)
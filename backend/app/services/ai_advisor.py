@@ -1,25 +1,121 @@
 import os
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List, Optional, Tuple
 
 import json
-from openai import OpenAI
+import httpx
+import numpy as np
+from openai import OpenAI, AsyncOpenAI
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from ..core import telemetry
+from .advice_cache import get_advice_cache, cache_key
+
+LLM_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o") # or gpt-3.5-turbo if cost is concern
+
+# Async client tuning: per-call timeout (s), SDK retries (exponential backoff), pool size
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "20"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+# Seconds a request waits for the LLM before answering with the rule-based result (0 = no limit)
+ADVISOR_LATENCY_BUDGET = float(os.getenv("ADVISOR_LATENCY_BUDGET", "8"))
+# Cash runway (days, from synced bank transactions) below which the advisor flags it
+RUNWAY_WARNING_DAYS = 90
+
+# Only built when a key is configured; tests can swap in a stub with the same interface
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY")) if os.getenv("OPENAI_API_KEY") else None
+
+# Shared, lazily built async client (one connection pool per worker process)
+async_client: Optional[AsyncOpenAI] = None
+# LLM calls currently running, by cache key, so concurrent identical requests share one
+_inflight: Dict[str, asyncio.Task] = {}
+
+def get_async_client() -> AsyncOpenAI:
+    global async_client
+    if async_client is None:
+        async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=OPENAI_TIMEOUT,
+            max_retries=OPENAI_MAX_RETRIES,
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_KEEPALIVE),
+                timeout=OPENAI_TIMEOUT,
+            ),
+        )
+    return async_client
+
+async def aclose() -> None:
+    global async_client
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
 
 def analyze_financial_health(metrics: Dict[str, Any], language: str = "en") -> Dict[str, Any]:
     """
     Analyzes financial health using OpenAI if API key is present, otherwise uses fallback logic.
+    LLM results are cached by content hash, and identical concurrent requests share one call.
+    Rule-based fallbacks are cheap and never cached, so a later request retries the LLM.
     """
     if os.getenv("OPENAI_API_KEY"):
         try:
-            return _analyze_with_llm(metrics, language)
+            key = cache_key(metrics, language, LLM_MODEL)
+            return get_advice_cache().get_or_compute(key, lambda: _analyze_with_llm(metrics, language))
         except Exception as e:
             print(f"LLM Error: {e}. Falling back to rule-based logic.")
             return _analyze_rule_based(metrics, language)
     else:
         return _analyze_rule_based(metrics, language)
 
-def _analyze_with_llm(metrics: Dict[str, Any], language: str) -> Dict[str, Any]:
+async def analyze_financial_health_async(metrics: Dict[str, Any], language: str = "en", budget: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Event-loop friendly variant of analyze_financial_health with a latency budget.
+
+    If the LLM has not answered within `budget` seconds (default ADVISOR_LATENCY_BUDGET),
+    or fails, the rule-based result is returned with "degraded": True. A timed-out call
+    keeps running in the background and fills the cache for the next request.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        return _analyze_rule_based(metrics, language)
+
+    budget = ADVISOR_LATENCY_BUDGET if budget is None else budget
+    key = cache_key(metrics, language, LLM_MODEL)
+    cache = get_advice_cache()
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_llm_and_cache(key, metrics, language))
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _finish_flight(key, t))
+
+    try:
+        # shield: hitting the budget must not cancel the shared call
+        return await asyncio.wait_for(asyncio.shield(task), timeout=budget or None)
+    except asyncio.TimeoutError:
+        telemetry.LLM_REQUESTS.inc(model=LLM_MODEL, outcome="over_budget")
+        print(f"LLM exceeded latency budget of {budget}s. Serving rule-based result.")
+    except Exception as e:
+        print(f"LLM Error: {e}. Falling back to rule-based logic.")
+
+    result = _analyze_rule_based(metrics, language)
+    result["degraded"] = True
+    return result
+
+async def _llm_and_cache(key: str, metrics: Dict[str, Any], language: str) -> Dict[str, Any]:
+    result = await _analyze_with_llm_async(metrics, language)
+    await asyncio.to_thread(get_advice_cache().put, key, result)
+    return result
+
+def _finish_flight(key: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Retrieve the outcome so a failure nobody awaited is not reported as "never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+def _build_messages(metrics: Dict[str, Any], language: str):
     # Prune heavy data for the prompt
     summary_metrics = {k: v for k, v in metrics.items() if k not in ['raw_text']}
     
@@ -39,11 +135,42 @@ def _analyze_with_llm(metrics: Dict[str, Any], language: str) -> Dict[str, Any]:
     }}
     """
     
-    response = client.chat.completions.create(
-        model="gpt-4o", # or gpt-3.5-turbo if cost is concern
-        messages=[{"role": "system", "content": "You are a helpful financial expert."}, {"role": "user", "content": prompt}],
-        response_format={"type": "json_object"}
-    )
+    return [{"role": "system", "content": "You are a helpful financial expert."}, {"role": "user", "content": prompt}]
+
+def _record_usage(response) -> None:
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        telemetry.LLM_TOKENS.inc(usage.prompt_tokens or 0, model=LLM_MODEL, kind="prompt")
+        telemetry.LLM_TOKENS.inc(usage.completion_tokens or 0, model=LLM_MODEL, kind="completion")
+
+def _analyze_with_llm(metrics: Dict[str, Any], language: str) -> Dict[str, Any]:
+    try:
+        response = client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=_build_messages(metrics, language),
+            response_format={"type": "json_object"}
+        )
+    except Exception:
+        telemetry.LLM_REQUESTS.inc(model=LLM_MODEL, outcome="error")
+        raise
+    telemetry.LLM_REQUESTS.inc(model=LLM_MODEL, outcome="success")
+    _record_usage(response)
+    
+    content = response.choices[0].message.content
+    return json.loads(content)
+
+async def _analyze_with_llm_async(metrics: Dict[str, Any], language: str) -> Dict[str, Any]:
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=LLM_MODEL,
+            messages=_build_messages(metrics, language),
+            response_format={"type": "json_object"}
+        )
+    except Exception:
+        telemetry.LLM_REQUESTS.inc(model=LLM_MODEL, outcome="error")
+        raise
+    telemetry.LLM_REQUESTS.inc(model=LLM_MODEL, outcome="success")
+    _record_usage(response)
     
     content = response.choices[0].message.content
     return json.loads(content)
@@ -54,6 +181,8 @@ def _analyze_rule_based(metrics: Dict[str, Any], language: str) -> Dict[str, Any
     inventory = metrics.get('inventory_levels', {}).get('total', 0)
     debt = metrics.get('loan_obligations', {}).get('total', 0)
     industry = metrics.get('industry', 'General')
+    # Present when bank transactions have been synced (see services/cashflow.py)
+    runway = (metrics.get('cash_flow') or {}).get('runway_days')
     
     # 1. Risk Assessment
     if profit < 0 or debt > (revenue * 0.6):
@@ -100,6 +229,9 @@ def _analyze_rule_based(metrics: Dict[str, Any], language: str) -> Dict[str, Any
             recs.append("Immediate cost-cutting required. Review operational expenses.")
         else:
             recs.append("Consider reinvesting profits into marketing to scale revenue.")
+
+        if runway is not None and runway < RUNWAY_WARNING_DAYS:
+            recs.append(f"Cash runway is about {runway:.0f} days at the current burn rate. Secure financing or reduce spending.")
             
     # Hindi Logic (Mock)
     else:
@@ -117,9 +249,139 @@ def _analyze_rule_based(metrics: Dict[str, Any], language: str) -> Dict[str, Any
         else:
             recs.append("राजस्व बढ़ाने के लिए मुनाफे को मार्केटिंग में निवेश करने पर विचार करें।")
 
+        if runway is not None and runway < RUNWAY_WARNING_DAYS:
+            recs.append(f"नकदी लगभग {runway:.0f} दिनों में समाप्त हो सकती है। (Short cash runway)")
+
     return {
         "risk_assessment": risk,
         "credit_score_estimate": score,
         "recommendations": recs,
          "analysis_summary": f"Based on revenue of {revenue} and profit of {profit}, the business is in {risk} risk category."
     }
+
+# Localised risk labels used by the rule-based scorer
+RISK_LABELS = {
+    "en": {"High": "High", "Medium": "Medium", "Low": "Low"},
+    "other": {"High": "उच्च (High)", "Medium": "मध्य (Medium)", "Low": "कम (Low)"},
+}
+
+def _runway(metrics: Dict[str, Any]) -> float:
+    runway = (metrics.get('cash_flow') or {}).get('runway_days')
+    return np.nan if runway is None else runway
+
+def _load_batch(metrics_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Loads the scoring inputs of many metrics dicts into NumPy arrays (raw values kept for messages)."""
+    raw_revenue = [m.get('revenue_streams', {}).get('total', 0) for m in metrics_list]
+    raw_profit = [m.get('net_profit', 0) for m in metrics_list]
+    raw_debt = [m.get('loan_obligations', {}).get('total', 0) for m in metrics_list]
+    return {
+        "raw_revenue": raw_revenue,
+        "raw_profit": raw_profit,
+        "raw_debt": raw_debt,
+        "revenue": np.asarray(raw_revenue, dtype=float),
+        "profit": np.asarray(raw_profit, dtype=float),
+        "debt": np.asarray(raw_debt, dtype=float),
+        "inventory": np.asarray([m.get('inventory_levels', {}).get('total', 0) for m in metrics_list], dtype=float),
+        "tax": np.asarray([m.get('tax_compliance', {}).get('total', 0) for m in metrics_list], dtype=float),
+        "industry": np.asarray([m.get('industry', 'General') for m in metrics_list], dtype=object),
+        "runway": np.asarray([_runway(m) for m in metrics_list], dtype=float),
+    }
+
+def _score_arrays(batch: Dict[str, Any]):
+    """1. Risk Assessment as array expressions: returns (tier, score) arrays."""
+    revenue, profit, debt = batch["revenue"], batch["profit"], batch["debt"]
+    high = (profit < 0) | (debt > revenue * 0.6)
+    # Stricter margin requirements for Services vs Retail
+    threshold = np.where(batch["industry"] == "Services", 0.15, 0.05)
+    medium = ~high & (profit < revenue * 0.1) & (profit < revenue * threshold)
+    tier = np.where(high, "High", np.where(medium, "Medium", "Low"))
+    score = np.where(high, 550, np.where(medium, 650, 750))
+    return tier, score
+
+def score_batch(metrics_list: List[Dict[str, Any]], language: str = "en") -> Tuple[List[str], List[int]]:
+    """Risk label and credit score of every metrics dict, without building recommendations."""
+    if not metrics_list:
+        return [], []
+    tier, score = _score_arrays(_load_batch(metrics_list))
+    labels = RISK_LABELS["en" if language == "en" else "other"]
+    return [labels[t] for t in tier.tolist()], score.tolist()
+
+def analyze_batch(metrics_list: List[Dict[str, Any]], language: str = "en") -> List[Dict[str, Any]]:
+    """
+    Vectorized equivalent of calling _analyze_rule_based on every metrics dict.
+    Inputs are loaded into NumPy arrays once and the risk tier, score and every
+    recommendation flag are computed as array expressions; only the final
+    per-report lists and strings are assembled in Python.
+    """
+    if not metrics_list:
+        return []
+
+    batch = _load_batch(metrics_list)
+    revenue, profit, debt = batch["revenue"], batch["profit"], batch["debt"]
+    inventory, tax, industry = batch["inventory"], batch["tax"], batch["industry"]
+    raw_revenue, raw_profit, raw_debt = batch["raw_revenue"], batch["raw_profit"], batch["raw_debt"]
+    tier, score = _score_arrays(batch)
+
+    # 3. Recommendations
+    english = language == "en"
+    flags = {
+        "stock_turnover": english & np.isin(industry, ["Retail", "Manufacturing"]) & (inventory > revenue * 0.4),
+        "services": english & (industry == "Services"),
+        "agriculture": english & (industry == "Agriculture"),
+        "high_inventory": (inventory > revenue * 0.3) & (revenue > 0),
+        "debt": debt > 0,
+        "no_tax": tax == 0,
+        "loss": profit < 0,
+        "short_runway": batch["runway"] < RUNWAY_WARNING_DAYS,
+    }
+    labels = RISK_LABELS["en" if english else "other"]
+    # Plain lists index far faster than NumPy scalars in the assembly loop below
+    flags = {name: np.broadcast_to(flag, len(metrics_list)).tolist() for name, flag in flags.items()}
+    tier = tier.tolist()
+    score = score.tolist()
+    runway = batch["runway"].tolist()
+
+    results = []
+    for i in range(len(metrics_list)):
+        recs = []
+        if english:
+            if flags["stock_turnover"][i]:
+                recs.append("Inventory levels are high relative to revenue. Optimize stock turnover.")
+            if flags["services"][i]:
+                recs.append("Focus on client retention and recurring revenue models.")
+            if flags["agriculture"][i]:
+                recs.append("Review crop insurance and government subsidy options.")
+            if flags["high_inventory"][i]:
+                recs.append("High inventory levels detected (Over 30% of revenue). Consider JIT strategies.")
+            if flags["debt"][i]:
+                recs.append(f"Debt obligation found: ${raw_debt[i]}. Ensure adequate cash flow service coverage.")
+            if flags["no_tax"][i]:
+                recs.append("No tax records found. Ensure GST/Tax compliance is up to date.")
+            if flags["loss"][i]:
+                recs.append("Immediate cost-cutting required. Review operational expenses.")
+            else:
+                recs.append("Consider reinvesting profits into marketing to scale revenue.")
+            if flags["short_runway"][i]:
+                recs.append(f"Cash runway is about {runway[i]:.0f} days at the current burn rate. Secure financing or reduce spending.")
+        else:
+            if flags["high_inventory"][i]:
+                recs.append("उच्च इन्वेंट्री स्तर पाया गया। (High inventory detected)")
+            if flags["debt"][i]:
+                recs.append(f"ऋण दायित्व पाया गया: ${raw_debt[i]}। कृपया नकदी प्रवाह सुनिश्चित करें।")
+            if flags["no_tax"][i]:
+                recs.append("कोई कर रिकॉर्ड नहीं मिला। सुनिश्चित करें कि GST/Tax अनुपालन अद्यतित है।")
+            if flags["loss"][i]:
+                recs.append("तत्काल लागत में कटौती आवश्यक है। परिचालन व्यय की समीक्षा करें।")
+            else:
+                recs.append("राजस्व बढ़ाने के लिए मुनाफे को मार्केटिंग में निवेश करने पर विचार करें।")
+            if flags["short_runway"][i]:
+                recs.append(f"नकदी लगभग {runway[i]:.0f} दिनों में समाप्त हो सकती है। (Short cash runway)")
+
+        risk = labels[tier[i]]
+        results.append({
+            "risk_assessment": risk,
+            "credit_score_estimate": score[i],
+            "recommendations": recs,
+            "analysis_summary": f"Based on revenue of {raw_revenue[i]} and profit of {raw_profit[i]}, the business is in {risk} risk category."
+        })
+    return results
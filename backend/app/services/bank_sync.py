@@ -0,0 +1,325 @@
+import asyncio
+import os
+import random
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import select
+
+from ..core import telemetry
+from ..database import AsyncSessionLocal
+from ..models import BankAccount
+from . import banking, cashflow
+from .banking import ProviderError, BankingProvider, MockPlaid
+
+def _setting(provider: str, key: str, default: str) -> str:
+    """Per-provider override (BANK_PLAID_RATE_LIMIT) falling back to the global one (BANK_RATE_LIMIT)."""
+    return os.getenv(f"BANK_{provider.upper()}_{key}", os.getenv(f"BANK_{key}", default))
+
+class TokenBucket:
+    """Allows `rate` calls per second on average with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class CircuitOpenError(ProviderError):
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} is unavailable (circuit open)", retryable=False)
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for `reset_timeout`
+    seconds; then lets one trial call through (half-open), closing on success and
+    re-opening on failure. A trial that ends neither way (cancelled) must be release()d.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial_running:
+                return False
+            self._trial_running = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self) -> None:
+        """Ends a call without an outcome: a half-open breaker lets the next call be the trial."""
+        self._trial_running = False
+
+class ProviderClient:
+    """A provider behind its own rate limit, call timeout, retry policy and circuit breaker."""
+
+    def __init__(self, name: str, provider: BankingProvider):
+        self.name = name
+        self.provider = provider
+        self.bucket = TokenBucket(float(_setting(name, "RATE_LIMIT", "10")), float(_setting(name, "RATE_BURST", "20")))
+        self.breaker = CircuitBreaker(int(_setting(name, "BREAKER_THRESHOLD", "5")), float(_setting(name, "BREAKER_RESET", "30")))
+        self.timeout = float(_setting(name, "CALL_TIMEOUT", "10"))
+        self.max_retries = int(_setting(name, "MAX_RETRIES", "3"))
+        self.backoff = float(_setting(name, "RETRY_BACKOFF", "0.2"))
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+
+    async def call(self, method: str, *args):
+        """Calls provider.<method>(*args) with rate limiting, timeout and jittered exponential backoff."""
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                self.counters["rejected"] += 1
+                raise CircuitOpenError(self.name)
+            try:
+                await self.bucket.acquire()
+                self.counters["calls"] += 1
+                with telemetry.stage("provider_call"):
+                    result = await asyncio.wait_for(getattr(self.provider, method)(*args), self.timeout)
+            except (ProviderError, asyncio.TimeoutError, httpx.TransportError) as e:
+                self.breaker.record_failure()
+                self.counters["failures"] += 1
+                if not getattr(e, "retryable", True) or attempt == self.max_retries:
+                    if isinstance(e, asyncio.TimeoutError):
+                        raise ProviderError(f"{self.name} timed out after {self.timeout}s") from e
+                    raise
+                delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+                retry_after = getattr(e, "retry_after", None)
+                await asyncio.sleep(max(delay, retry_after or 0))
+                self.counters["retries"] += 1
+            except Exception:
+                # A malformed response (bad JSON, missing keys) is a provider failure too; not retried
+                self.breaker.record_failure()
+                self.counters["failures"] += 1
+                raise
+            except BaseException:
+                # Cancelled (e.g. the client went away): no verdict on the provider, but free the trial slot
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "tokens": round(self.bucket.tokens, 2),
+        }
+
+class HttpBankProvider(BankingProvider):
+    """
+    Aggregator reached over HTTP, exposing POST /transactions/sync and
+    GET /accounts/{account_id}/balance. One pooled client per provider.
+    """
+
+    def __init__(self, name: str, base_url: str, api_key: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else None,
+                limits=httpx.Limits(
+                    max_connections=int(_setting(self.name, "MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(_setting(self.name, "MAX_KEEPALIVE", "10")),
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        response = await self._get_client().request(method, path, **kwargs)
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = response.headers.get("Retry-After")
+            raise ProviderError(
+                f"{self.name} returned {response.status_code}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        if response.status_code >= 400:
+            raise ProviderError(f"{self.name} returned {response.status_code}: {response.text[:200]}", retryable=False)
+        return response.json()
+
+    async def sync_async(self, account_id, cursor=None, count=banking.BANK_SYNC_PAGE_SIZE):
+        return await self._request("POST", "/transactions/sync", json={"account_id": account_id, "cursor": cursor, "count": count})
+
+    async def get_balance_async(self, account_id):
+        return (await self._request("GET", f"/accounts/{account_id}/balance"))["balance"]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class StubProvider(MockPlaid):
+    """
+    Local stand-in for a remote provider: the MockPlaid history served with injected
+    latency, failures (retryable, like a 503) and hangs (to exercise call timeouts).
+    Failures are drawn from `seed`, so a run is reproducible.
+    """
+    name = "stub"
+
+    def __init__(self, latency: Optional[float] = None, error_rate: Optional[float] = None, hang_rate: Optional[float] = None, **options):
+        super().__init__(**options)
+        self.latency = float(os.getenv("BANK_STUB_LATENCY", "0.05")) if latency is None else latency
+        self.error_rate = float(os.getenv("BANK_STUB_ERROR_RATE", "0.1")) if error_rate is None else error_rate
+        self.hang_rate = float(os.getenv("BANK_STUB_HANG_RATE", "0")) if hang_rate is None else hang_rate
+        self._faults = random.Random(f"{self.seed}:faults")
+
+    async def _inject(self) -> None:
+        await asyncio.sleep(self.latency * (0.5 + self._faults.random()))
+        roll = self._faults.random()
+        if roll < self.hang_rate:
+            await asyncio.sleep(3600)
+        if roll < self.hang_rate + self.error_rate:
+            raise ProviderError("stub provider: injected 503")
+
+    async def sync_async(self, account_id, cursor=None, count=banking.BANK_SYNC_PAGE_SIZE):
+        await self._inject()
+        return self.sync(account_id, cursor, count)
+
+    async def get_balance_async(self, account_id):
+        await self._inject()
+        return self.get_balance(account_id)
+
+banking.register_provider("stub", StubProvider)
+
+def _register_http_providers() -> None:
+    # BANK_HTTP_PROVIDERS="name=https://host/v1,other=https://..."; API keys in BANK_<NAME>_API_KEY
+    for entry in filter(None, (e.strip() for e in os.getenv("BANK_HTTP_PROVIDERS", "").split(","))):
+        name, _, url = entry.partition("=")
+        name = name.strip().lower()
+        banking.register_provider(name, lambda name=name, url=url.strip(): HttpBankProvider(name, url, os.getenv(f"BANK_{name.upper()}_API_KEY")))
+
+_register_http_providers()
+
+_clients: Dict[str, ProviderClient] = {}
+
+def get_client(provider_name: str) -> ProviderClient:
+    name = provider_name.lower()
+    if name not in _clients:
+        _clients[name] = ProviderClient(name, banking.get_provider(name))
+    return _clients[name]
+
+def provider_stats() -> Dict[str, Any]:
+    return {name: client.stats() for name, client in _clients.items()}
+
+async def aclose() -> None:
+    for client in _clients.values():
+        if isinstance(client.provider, HttpBankProvider):
+            await client.provider.aclose()
+
+async def _sync_one(account_pk: int, full: bool, page_size: int) -> Dict[str, Any]:
+    """Pages one account through its provider client; committed pages survive a later failure."""
+    fetched = pages = 0
+    async with AsyncSessionLocal() as db:
+        account = await db.get(BankAccount, account_pk)
+        result = {"provider": account.provider, "account_id": account.account_id}
+        started = time.monotonic()
+        try:
+            client = get_client(account.provider)
+            while True:
+                page = await client.call("sync_async", account.account_id, account.cursor, page_size)
+                with telemetry.stage("store_page"):
+                    await db.run_sync(banking.store_page, account, page)
+                fetched += len(page["added"])
+                pages += 1
+                if not page["has_more"]:
+                    break
+            balance = await client.call("get_balance_async", account.account_id)
+            summary = await db.run_sync(banking.finish_sync, account, balance, False)
+            result.update(summary, status="success")
+        except Exception as e:
+            await db.rollback()
+            result.update(status="failed", error=str(e))
+        result.update(fetched=fetched, pages=pages, seconds=round(time.monotonic() - started, 3))
+    return result
+
+async def sync_report(
+    report_id: int,
+    accounts: Optional[List[Tuple[str, str]]] = None,
+    include_linked: bool = True,
+    full: bool = False,
+    page_size: int = banking.BANK_SYNC_PAGE_SIZE,
+) -> Dict[str, Any]:
+    """
+    Syncs the given (provider, account_id) pairs, linking them to the report, plus
+    (with include_linked) every account already linked to it, all concurrently.
+    Each provider is throttled and retried independently, so one slow or failing
+    provider neither blocks nor fails the others. The report's consolidated
+    banking_data is written once at the end, and the cash-flow cache is brought up
+    to date with the newly stored transactions.
+    """
+    async with AsyncSessionLocal() as db:
+        targets = set()
+        for provider, account_id in accounts or []:
+            account = await db.run_sync(banking.open_account, provider, account_id, report_id, full)
+            targets.add(account.id)
+        if include_linked:
+            linked = (await db.execute(select(BankAccount).where(BankAccount.report_id == report_id))).scalars().all()
+            for account in linked:
+                if full and account.cursor is not None:
+                    account.cursor = None
+                targets.add(account.id)
+            await db.commit()
+
+    results = await asyncio.gather(*(_sync_one(pk, full, page_size) for pk in sorted(targets)))
+
+    async with AsyncSessionLocal() as db:
+        with telemetry.stage("refresh"):
+            data = await db.run_sync(banking.refresh_report_banking_data, report_id)
+            await db.commit()
+        with telemetry.stage("cashflow"):
+            flows = await db.run_sync(cashflow.compute, report_id, 0)
+
+    succeeded = sum(r["status"] == "success" for r in results)
+    status = "success" if succeeded == len(results) else "partial" if succeeded else "failed"
+    return {
+        "status": status,
+        "report_id": report_id,
+        "data": data,
+        "cash_flow": cashflow.advisor_inputs(flows) if flows else None,
+        "accounts": list(results),
+        "providers": {name: get_client(name).stats() for name in sorted({r["provider"] for r in results})},
+    }
@@ -1,50 +1,376 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, List, Optional
+import asyncio
+import os
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..models import BankAccount, BankTransaction, FinancialReport
+
+# Mock providers: seed and history length (0 = provider default). Same seed, same history.
+BANK_MOCK_SEED = os.getenv("BANK_MOCK_SEED", "0")
+BANK_MOCK_VOLUME = int(os.getenv("BANK_MOCK_VOLUME", "0"))
+# Transactions requested per provider page during a sync
+BANK_SYNC_PAGE_SIZE = int(os.getenv("BANK_SYNC_PAGE_SIZE", "5000"))
+# Latest transactions copied into report.banking_data for display
+RECENT_TRANSACTIONS = 20
+
+class ProviderError(Exception):
+    """A provider call failed. `retryable` errors (timeouts, 5xx, 429) may be retried."""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
 
 class BankingProvider:
     def get_transactions(self, account_id: str) -> List[Dict[str, Any]]:
         raise NotImplementedError
 
-class MockPlaid(BankingProvider):
-    def get_transactions(self, account_id: str) -> List[Dict[str, Any]]:
-        # Simulate last 30 days transactions
-        txs = []
-        categories = ["Rent", "Utilities", "Salary", "Vendor Payment", "Subscription"]
-        for i in range(10):
-            txs.append({
-                "date": (datetime.now() - timedelta(days=i*3)).strftime("%Y-%m-%d"),
-                "amount": round(random.uniform(-5000, 10000), 2),
-                "description": f"Txn Ref: {random.randint(1000,9999)} - {random.choice(categories)}",
-                "category": random.choice(categories)
-            })
-        return txs
-
-class MockStripe(BankingProvider):
+    def get_balance(self, account_id: str) -> float:
+        raise NotImplementedError
+
+    def sync(self, account_id: str, cursor: Optional[str] = None, count: int = BANK_SYNC_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        Incremental fetch: transactions added after `cursor` (all of them when None),
+        oldest first, at most `count` per call. Returns {"added", "next_cursor", "has_more"}.
+        """
+        raise NotImplementedError
+
+    # Async entry points used by the sync orchestrator. Blocking providers run on a
+    # worker thread; network providers override these with native async calls.
+    async def sync_async(self, account_id: str, cursor: Optional[str] = None, count: int = BANK_SYNC_PAGE_SIZE) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.sync, account_id, cursor, count)
+
+    async def get_balance_async(self, account_id: str) -> float:
+        return await asyncio.to_thread(self.get_balance, account_id)
+
+class MockBankProvider(BankingProvider):
+    """
+    Deterministic mock: an account's history is a fixed sequence of `volume`
+    transactions spread over the `span_days` ending at `end_date` (`step_days`
+    apart), generated from the seed in blocks so any page of it can be produced
+    without the rest. Passing the same end_date/step_days with a larger volume
+    extends the history with newer transactions and leaves the existing ones as they were.
+    """
+    name = "mock"
+    default_volume = 10
+    span_days = 30
+    block_size = 1000
+
+    def __init__(self, seed: Optional[str] = None, volume: Optional[int] = None, end_date: Optional[date] = None, step_days: Optional[float] = None):
+        self.seed = BANK_MOCK_SEED if seed is None else str(seed)
+        self.volume = volume or BANK_MOCK_VOLUME or self.default_volume
+        self.end_date = end_date or date.today()
+        self.step_days = step_days or self.span_days / self.volume
+        self._block = (None, None, [])  # (account_id, block number, transactions)
+
+    def _make(self, rng: random.Random, account_id: str, index: int, day: date) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def _transaction(self, account_id: str, index: int) -> Dict[str, Any]:
+        number = index // self.block_size
+        cached_account, cached_number, block = self._block
+        if (cached_account, cached_number) != (account_id, number):
+            rng = random.Random(f"{self.seed}:{self.name}:{account_id}:{number}")
+            start = self.end_date - timedelta(days=self.span_days)
+            block = [
+                self._make(rng, account_id, i, start + timedelta(days=int(i * self.step_days)))
+                for i in range(number * self.block_size, min((number + 1) * self.block_size, self.volume))
+            ]
+            self._block = (account_id, number, block)
+        return block[index - number * self.block_size]
+
+    def _cursor_index(self, cursor: Optional[str]) -> int:
+        return int(cursor) if cursor else 0
+
+    def _next_cursor(self, index: int, last: Optional[Dict[str, Any]]) -> str:
+        return str(index)
+
+    def sync(self, account_id: str, cursor: Optional[str] = None, count: int = BANK_SYNC_PAGE_SIZE) -> Dict[str, Any]:
+        start = self._cursor_index(cursor)
+        stop = min(start + count, self.volume)
+        added = [self._transaction(account_id, i) for i in range(start, stop)]
+        return {
+            "added": added,
+            "next_cursor": self._next_cursor(stop, added[-1] if added else None) if added else cursor,
+            "has_more": stop < self.volume,
+        }
+
     def get_transactions(self, account_id: str) -> List[Dict[str, Any]]:
+        # Newest first, like the provider's transaction list
+        return [self._transaction(account_id, i) for i in range(self.volume - 1, -1, -1)]
+
+    def get_balance(self, account_id: str) -> float:
+        return round(random.Random(f"{self.seed}:{self.name}:{account_id}:balance").uniform(10000, 500000), 2)
+
+class MockPlaid(MockBankProvider):
+    name = "plaid"
+    categories = ["Rent", "Utilities", "Salary", "Vendor Payment", "Subscription"]
+
+    def _make(self, rng, account_id, index, day):
+        # Simulate bank account transactions
+        category = rng.choice(self.categories)
+        return {
+            "id": f"txn_{account_id}_{index:09d}",
+            "date": day.strftime("%Y-%m-%d"),
+            "amount": round(rng.uniform(-5000, 10000), 2),
+            "description": f"Txn Ref: {rng.randint(1000,9999)} - {category}",
+            "category": category
+        }
+
+class MockStripe(MockBankProvider):
+    name = "stripe"
+    default_volume = 5
+    span_days = 35
+
+    def _make(self, rng, account_id, index, day):
         # Simulate stripe payouts
-        txs = []
-        for i in range(5):
-            txs.append({
-                "date": (datetime.now() - timedelta(days=i*7)).strftime("%Y-%m-%d"),
-                "amount": round(random.uniform(1000, 5000), 2),
-                "description": f"Payout #{random.randint(10000,99999)}",
-                "type": "payout"
-            })
-        return txs
+        return {
+            "id": f"po_{account_id}_{index:09d}",
+            "date": day.strftime("%Y-%m-%d"),
+            "amount": round(rng.uniform(1000, 5000), 2),
+            "description": f"Payout #{rng.randint(10000,99999)}",
+            "type": "payout"
+        }
+
+    # Stripe-style pagination: the cursor is the last object seen (starting_after)
+    def _cursor_index(self, cursor):
+        return int(cursor.rsplit("_", 1)[1]) + 1 if cursor else 0
+
+    def _next_cursor(self, index, last):
+        return last["id"]
+
+# Provider registry: name -> factory. Instances are built once and shared.
+PROVIDERS: Dict[str, Callable[..., BankingProvider]] = {}
+_instances: Dict[str, BankingProvider] = {}
+
+def register_provider(name: str, factory: Callable[..., BankingProvider]) -> None:
+    PROVIDERS[name.lower()] = factory
+    _instances.pop(name.lower(), None)
+
+def get_provider(provider_name: str, **options) -> BankingProvider:
+    """The shared provider instance, or a fresh one when construction options are given."""
+    name = provider_name.lower()
+    factory = PROVIDERS.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown provider: {provider_name}")
+    if options:
+        return factory(**options)
+    if name not in _instances:
+        _instances[name] = factory()
+    return _instances[name]
+
+register_provider("plaid", MockPlaid)
+register_provider("stripe", MockStripe)
 
 def fetch_banking_data(provider_name: str, account_id: str) -> Dict[str, Any]:
-    if provider_name.lower() == "plaid":
-        provider = MockPlaid()
-    elif provider_name.lower() == "stripe":
-        provider = MockStripe()
-    else:
+    try:
+        provider = get_provider(provider_name)
+    except ValueError:
         return {"error": "Unknown provider"}
-    
+
     return {
         "provider": provider_name,
         "account_id": account_id,
-        "balance": round(random.uniform(10000, 500000), 2),
+        "balance": provider.get_balance(account_id),
         "transactions": provider.get_transactions(account_id),
         "last_sync": datetime.now().isoformat()
     }
+
+def _insert_ignoring_duplicates(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Bulk insert that skips transactions already stored for the account."""
+    table = BankTransaction.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = (postgresql if dialect == "postgresql" else sqlite).insert(table)
+        db.execute(insert.on_conflict_do_nothing(index_elements=["bank_account_id", "provider_transaction_id"]), rows)
+        return
+    account_id = rows[0]["bank_account_id"]
+    seen = set(db.execute(
+        select(BankTransaction.provider_transaction_id).where(
+            BankTransaction.bank_account_id == account_id,
+            BankTransaction.provider_transaction_id.in_([row["provider_transaction_id"] for row in rows]),
+        )
+    ).scalars())
+    rows = [row for row in rows if row["provider_transaction_id"] not in seen]
+    if rows:
+        db.execute(table.insert(), rows)
+
+def _transaction_row(bank_account_id: int, tx: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "bank_account_id": bank_account_id,
+        "provider_transaction_id": tx["id"],
+        "date": date.fromisoformat(tx["date"]),
+        "amount": tx["amount"],
+        "description": tx.get("description"),
+        "category": tx.get("category"),
+        "type": tx.get("type"),
+    }
+
+def serialize_transaction(tx: BankTransaction) -> Dict[str, Any]:
+    data = {
+        "id": tx.provider_transaction_id,
+        "date": tx.date.isoformat(),
+        "amount": tx.amount,
+        "description": tx.description,
+    }
+    if tx.category is not None:
+        data["category"] = tx.category
+    if tx.type is not None:
+        data["type"] = tx.type
+    return data
+
+def recent_transactions(db: Session, bank_account_ids: List[int], limit: int = RECENT_TRANSACTIONS) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        select(BankTransaction)
+        .where(BankTransaction.bank_account_id.in_(bank_account_ids))
+        .order_by(BankTransaction.date.desc(), BankTransaction.id.desc())
+        .limit(limit)
+    ).scalars().all()
+    return [serialize_transaction(tx) for tx in rows]
+
+def open_account(db: Session, provider_name: str, account_id: str, report_id: Optional[int] = None, full: bool = False) -> BankAccount:
+    """Loads (or creates) the report's row for the account and rewinds the cursor for a full sync."""
+    provider_name = provider_name.lower()
+    account = db.execute(
+        select(BankAccount).where(
+            BankAccount.provider == provider_name,
+            BankAccount.account_id == account_id,
+            BankAccount.report_id == report_id if report_id is not None else BankAccount.report_id.is_(None),
+        )
+    ).scalars().first()
+    if account is None:
+        account = BankAccount(provider=provider_name, account_id=account_id, report_id=report_id, transaction_count=0)
+        db.add(account)
+    if full:
+        account.cursor = None
+    db.commit()
+    return account
+
+def store_page(db: Session, account: BankAccount, page: Dict[str, Any]) -> None:
+    """Inserts one provider page and advances the cursor, in one transaction."""
+    if page["added"]:
+        _insert_ignoring_duplicates(db, [_transaction_row(account.id, tx) for tx in page["added"]])
+    account.cursor = page["next_cursor"]
+    db.commit()
+
+def report_banking_data(db: Session, report_id: int) -> Dict[str, Any]:
+    """
+    Consolidated banking summary across every account linked to the report: providers,
+    total balance, per-account figures and the latest transactions overall.
+    """
+    accounts = db.execute(
+        select(BankAccount).where(BankAccount.report_id == report_id).order_by(BankAccount.provider, BankAccount.account_id)
+    ).scalars().all()
+    synced = [a.last_sync for a in accounts if a.last_sync]
+    return {
+        "provider": ", ".join(sorted({a.provider for a in accounts})),
+        "balance": round(sum(a.balance or 0 for a in accounts), 2),
+        "transaction_count": sum(a.transaction_count or 0 for a in accounts),
+        "transactions": recent_transactions(db, [a.id for a in accounts]),
+        "accounts": [
+            {
+                "provider": a.provider,
+                "account_id": a.account_id,
+                "balance": a.balance,
+                "transaction_count": a.transaction_count,
+                "last_sync": a.last_sync.isoformat() if a.last_sync else None,
+            }
+            for a in accounts
+        ],
+        "last_sync": max(synced).isoformat() if synced else None,
+    }
+
+def refresh_report_banking_data(db: Session, report_id: int) -> Optional[Dict[str, Any]]:
+    report = db.get(FinancialReport, report_id)
+    if report is None:
+        return None
+    db.flush()
+    report.banking_data = report_banking_data(db, report_id)
+    return report.banking_data
+
+def finish_sync(db: Session, account: BankAccount, balance: float, refresh_report: bool = True) -> Dict[str, Any]:
+    """
+    Records the account's balance and stored transaction count, refreshes the linked
+    report's banking_data (unless the caller does it once for several accounts), and
+    returns the account summary (with `added` since the last sync).
+    """
+    before = account.transaction_count or 0
+    account.transaction_count = db.execute(
+        select(func.count()).select_from(BankTransaction).where(BankTransaction.bank_account_id == account.id)
+    ).scalar()
+    account.balance = balance
+    account.last_sync = datetime.now()
+    if refresh_report and account.report_id is not None:
+        refresh_report_banking_data(db, account.report_id)
+    db.commit()
+    return {
+        "provider": account.provider,
+        "account_id": account.account_id,
+        "balance": account.balance,
+        "transaction_count": account.transaction_count,
+        "added": account.transaction_count - before,
+        "last_sync": account.last_sync.isoformat(),
+    }
+
+def sync_account(
+    db: Session,
+    provider_name: str,
+    account_id: str,
+    report_id: Optional[int] = None,
+    full: bool = False,
+    page_size: int = BANK_SYNC_PAGE_SIZE,
+    provider: Optional[BankingProvider] = None,
+) -> Dict[str, Any]:
+    """
+    Incrementally syncs one provider account into bank_transactions.
+
+    Pages are pulled from the stored cursor onward and bulk-inserted; each page and
+    the cursor it advances to are committed together, so an interrupted sync
+    resumes where it stopped. Duplicates (by provider transaction id) are ignored,
+    which also makes `full=True` (restart from the beginning) safe. The linked
+    report's banking_data is refreshed (see report_banking_data).
+    """
+    provider = provider or get_provider(provider_name)
+    account = open_account(db, provider_name, account_id, report_id, full)
+
+    fetched = pages = 0
+    while True:
+        page = provider.sync(account_id, account.cursor, page_size)
+        store_page(db, account, page)
+        fetched += len(page["added"])
+        pages += 1
+        if not page["has_more"]:
+            break
+
+    summary = finish_sync(db, account, provider.get_balance(account_id))
+    return {**summary, "fetched": fetched, "pages": pages}
+
+def encode_transaction_cursor(tx: BankTransaction) -> str:
+    return f"{tx.date.isoformat()}_{tx.id}"
+
+def transactions_query(
+    bank_account_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+):
+    """Transactions in [start, end], oldest first, keyset-paginated on (date, id); fetches limit + 1 rows."""
+    stmt = select(BankTransaction).where(BankTransaction.bank_account_id == bank_account_id)
+    if start is not None:
+        stmt = stmt.where(BankTransaction.date >= start)
+    if end is not None:
+        stmt = stmt.where(BankTransaction.date <= end)
+    if cursor:
+        try:
+            day, tx_id = cursor.split("_")
+            after = (date.fromisoformat(day), int(tx_id))
+        except ValueError:
+            raise ValueError("Malformed cursor")
+        stmt = stmt.where(tuple_(BankTransaction.date, BankTransaction.id) > tuple_(*after))
+    return stmt.order_by(BankTransaction.date, BankTransaction.id).limit(limit + 1)
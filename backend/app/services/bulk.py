@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+from ..database import AsyncSessionLocal
+from . import parser, pdf_parser, ai_advisor, reports, peers, streaming, line_items
+
+# Worker processes that parse and extract metrics for a bulk upload
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", str(os.cpu_count() or 1)))
+# Files accepted per request, after ZIP archives are expanded
+BULK_MAX_FILES = int(os.getenv("BULK_MAX_FILES", "500"))
+# Uncompressed size cap for a single ZIP member (guards against ZIP bombs)
+BULK_MAX_MEMBER_BYTES = int(os.getenv("BULK_MAX_MEMBER_BYTES", str(50 * 1024 * 1024)))
+# Reports inserted per transaction, and the longest a finished file waits for its batch
+BULK_COMMIT_BATCH = int(os.getenv("BULK_COMMIT_BATCH", "25"))
+BULK_COMMIT_INTERVAL = float(os.getenv("BULK_COMMIT_INTERVAL", "1.0"))
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls", ".pdf", ".parquet", ".feather")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _init_worker() -> None:
+    # Files are already spread across processes: one extraction process per worker, kept
+    # so PDF_TIME_BUDGET can still stop a pathological page of a large document
+    pdf_parser.PDF_WORKERS = 1
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=BULK_WORKERS, initializer=_init_worker)
+    return _pool
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def expand_upload(path: str, filename: str) -> List[Dict[str, Any]]:
+    """
+    Turns one spooled upload into work items. A ZIP contributes one item per supported
+    member (directories, macOS resource forks and other extensions are skipped);
+    anything else is a single item. Items that cannot be processed carry an `error`.
+    """
+    if not filename.lower().endswith(".zip"):
+        return [{"filename": filename, "path": path, "member": None}]
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = archive.infolist()
+    except zipfile.BadZipFile:
+        return [{"filename": filename, "error": "Not a valid ZIP archive"}]
+
+    items = []
+    for info in members:
+        name = info.filename
+        if info.is_dir() or name.startswith("__MACOSX/") or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+            continue
+        label = f"{filename}/{name}"
+        if info.file_size > BULK_MAX_MEMBER_BYTES:
+            items.append({"filename": label, "error": f"File exceeds {BULK_MAX_MEMBER_BYTES} bytes uncompressed"})
+        else:
+            items.append({"filename": label, "path": path, "member": name})
+    return items
+
+def extract_item(path: str, member: Optional[str], filename: str) -> Dict[str, Any]:
+    """
+    Runs in a worker: reads a file (or ZIP member), parses it and extracts metrics.
+    Errors are returned rather than raised so one bad file does not fail the batch.
+    """
+    try:
+        if member is None:
+            with open(path, "rb") as f:
+                content = f.read()
+        else:
+            with zipfile.ZipFile(path) as archive:
+                content = archive.read(member)
+        # Parse by the member's own extension
+        df = parser.parse_file(content, (member or filename).lower())
+        metrics = parser.extract_financial_metrics(df)
+        return {"metrics": metrics, "aggregates": streaming.MetricsAccumulator.from_metrics(df, metrics).state()}
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        return {"error": str(detail)}
+
+async def _process(item: Dict[str, Any], language: str) -> Dict[str, Any]:
+    if "error" not in item:
+        loop = asyncio.get_running_loop()
+        try:
+            outcome = await loop.run_in_executor(_get_pool(), extract_item, item["path"], item["member"], item["filename"])
+        except Exception as e:
+            # e.g. a worker process died (BrokenProcessPool)
+            outcome = {"error": f"Worker failed: {e}"}
+        if "error" in outcome:
+            item["error"] = outcome["error"]
+        else:
+            item["metrics"], item["items"] = line_items.split(outcome["metrics"])
+            item["aggregates"] = outcome["aggregates"]
+            item["analysis"] = await ai_advisor.analyze_financial_health_async(item["metrics"], language)
+    return item
+
+def _line(payload: Dict[str, Any]) -> str:
+    return json.dumps(payload, default=str) + "\n"
+
+async def _commit_batch(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Inserts the batch's reports in one transaction and returns their result entries."""
+    rows = [
+        reports.build_report(item["metrics"], item["analysis"], os.path.basename(item["filename"]), aggregates=item["aggregates"], items=item["items"])
+        for item in batch
+    ]
+    try:
+        async with AsyncSessionLocal() as db:
+            db.add_all(rows)
+            await db.commit()
+        await peers.record_async([peers.observation(row, item["metrics"]) for item, row in zip(batch, rows)])
+    except Exception as e:
+        return [{"filename": item["filename"], "status": "failed", "error": f"Could not save report: {e}"} for item in batch]
+    return [
+        {
+            "filename": item["filename"],
+            "status": "completed",
+            "report_id": row.id,
+            "industry": row.industry,
+            "risk_assessment": row.risk_assessment,
+            "credit_score_estimate": row.credit_score_estimate,
+            "advisor_degraded": item["analysis"].get("degraded", False),
+        }
+        for item, row in zip(batch, rows)
+    ]
+
+async def run_bulk(items: List[Dict[str, Any]], language: str) -> AsyncIterator[str]:
+    """
+    Processes work items concurrently and yields one NDJSON line per file as results
+    are saved, then a summary line. Successful reports are committed in batches of
+    BULK_COMMIT_BATCH, or sooner once the oldest unsaved result has waited
+    BULK_COMMIT_INTERVAL seconds. Closing the generator cancels outstanding work.
+    """
+    pending = {asyncio.ensure_future(_process(item, language)) for item in items}
+    batch: List[Dict[str, Any]] = []
+    batch_started = 0.0
+    completed = failed = 0
+    try:
+        while pending or batch:
+            timeout = None
+            if batch:
+                timeout = max(batch_started + BULK_COMMIT_INTERVAL - time.monotonic(), 0)
+            if pending:
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                done = set()
+
+            for task in done:
+                item = task.result()
+                if "error" in item:
+                    failed += 1
+                    yield _line({"filename": item["filename"], "status": "failed", "error": item["error"]})
+                    continue
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(item)
+
+            if batch and (not pending or len(batch) >= BULK_COMMIT_BATCH or time.monotonic() - batch_started >= BULK_COMMIT_INTERVAL):
+                for result in await _commit_batch(batch):
+                    if result["status"] == "completed":
+                        completed += 1
+                    else:
+                        failed += 1
+                    yield _line(result)
+                batch = []
+
+        yield _line({"status": "done", "total": completed + failed, "completed": completed, "failed": failed})
+    finally:
+        for task in pending:
+            task.cancel()
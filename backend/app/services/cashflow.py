@@ -0,0 +1,183 @@
+from datetime import date
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from ..models import BankAccount, BankTransaction, CashflowCache
+
+# Complete months averaged for the burn rate
+BURN_MONTHS = 3
+# Trailing days used for daily volatility
+VOLATILITY_DAYS = 90
+DAYS_PER_MONTH = 365.25 / 12
+
+def build_months(dates: np.ndarray, amounts: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """
+    Per calendar month ("YYYY-MM"): the daily net flow for each day of the month,
+    total inflow and outflow and the transaction count. One vectorized pass: months
+    and day offsets are integer arrays and every sum is a bincount.
+    """
+    if not len(dates):
+        return {}
+    months = dates.astype("datetime64[M]")
+    unique_months, month_index = np.unique(months, return_inverse=True)
+    inflow = np.bincount(month_index, weights=np.where(amounts > 0, amounts, 0.0), minlength=len(unique_months))
+    outflow = np.bincount(month_index, weights=np.where(amounts < 0, amounts, 0.0), minlength=len(unique_months))
+    counts = np.bincount(month_index, minlength=len(unique_months))
+
+    first_day = unique_months[0].astype("datetime64[D]")
+    span = ((unique_months[-1] + 1).astype("datetime64[D]") - first_day).astype(int)
+    daily = np.bincount((dates - first_day).astype(int), weights=amounts, minlength=span)
+
+    starts = (unique_months.astype("datetime64[D]") - first_day).astype(int)
+    lengths = ((unique_months + 1).astype("datetime64[D]") - unique_months.astype("datetime64[D]")).astype(int)
+    return {
+        str(month): {
+            "daily": daily[start:start + length].tolist(),
+            "inflow": float(inflow[i]),
+            "outflow": float(outflow[i]),
+            "transactions": int(counts[i]),
+        }
+        for i, (month, start, length) in enumerate(zip(unique_months, starts, lengths))
+    }
+
+def _load(db: Session, account_ids: List[int], since: Optional[date] = None):
+    stmt = select(BankTransaction.date, BankTransaction.amount).where(BankTransaction.bank_account_id.in_(account_ids))
+    if since is not None:
+        stmt = stmt.where(BankTransaction.date >= since)
+    rows = db.execute(stmt).all()
+    if not rows:
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype=float)
+    dates, amounts = zip(*rows)
+    return np.array(dates, dtype="datetime64[D]"), np.array(amounts, dtype=float)
+
+def load_months(db: Session, report_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Monthly aggregates for every account linked to the report, from the cache where
+    possible. Months before the earliest transaction stored since the cache's
+    watermark are reused; that month onward is recomputed from bank_transactions.
+    Linking or unlinking an account rebuilds everything.
+    """
+    accounts = db.execute(select(BankAccount).where(BankAccount.report_id == report_id)).scalars().all()
+    if not accounts:
+        return None
+    account_ids = sorted(a.id for a in accounts)
+    key = ",".join(map(str, account_ids))
+    in_accounts = BankTransaction.bank_account_id.in_(account_ids)
+    watermark = db.execute(select(func.max(BankTransaction.id)).where(in_accounts)).scalar() or 0
+
+    cache = db.get(CashflowCache, report_id)
+    recomputed_from = None
+    if cache is not None and cache.accounts_key == key:
+        months = cache.months
+        if watermark != cache.watermark:
+            since = db.execute(
+                select(func.min(BankTransaction.date)).where(in_accounts, BankTransaction.id > cache.watermark)
+            ).scalar()
+            if since is not None:
+                since = since.replace(day=1)
+                recomputed_from = since.strftime("%Y-%m")
+                months = {m: v for m, v in months.items() if m < recomputed_from}
+                months.update(build_months(*_load(db, account_ids, since)))
+    else:
+        months = build_months(*_load(db, account_ids))
+        recomputed_from = min(months) if months else None
+
+    if cache is None:
+        cache = CashflowCache(report_id=report_id)
+        db.add(cache)
+    if recomputed_from is not None or cache.accounts_key != key or cache.watermark != watermark:
+        cache.accounts_key = key
+        cache.watermark = watermark
+        cache.months = months
+        db.commit()
+
+    return {
+        "months": months,
+        "balance": sum(a.balance or 0 for a in accounts),
+        "recomputed_from": recomputed_from,
+    }
+
+def summarize(months: Dict[str, Dict[str, Any]], balance: float, days: int = 90, today: Optional[date] = None) -> Dict[str, Any]:
+    """Running balance, monthly flows, burn rate, runway and volatility from the monthly aggregates."""
+    if not months:
+        return {"balance": round(balance, 2), "as_of": None, "burn_rate": None, "gross_burn": None, "runway_days": None,
+                "volatility": {"daily_net_std": None, "monthly_net_std": None}, "monthly": [], "daily_balance": []}
+    keys = sorted(months)
+    calendar = np.arange(np.datetime64(keys[0], "M"), np.datetime64(keys[-1], "M") + 1)
+    empty = {"inflow": 0.0, "outflow": 0.0, "transactions": 0}
+    entries = [months.get(str(m), empty) for m in calendar]
+    lengths = ((calendar + 1).astype("datetime64[D]") - calendar.astype("datetime64[D]")).astype(int)
+    daily = np.concatenate([
+        np.asarray(e["daily"], dtype=float) if "daily" in e else np.zeros(n) for e, n in zip(entries, lengths)
+    ])
+    first_day = calendar[0].astype("datetime64[D]")
+
+    # The series runs to the end of the last month, or today if that is earlier
+    today = np.datetime64(today or date.today(), "D")
+    end = min(len(daily), int((today - first_day).astype(int)) + 1)
+    end = max(end, 1)
+    daily = daily[:end]
+    as_of = first_day + end - 1
+
+    # Running balance, anchored on the current (synced) balance at the end of the series
+    cumulative = np.cumsum(daily)
+    running = balance - (cumulative[-1] - cumulative)
+
+    inflow = np.array([e["inflow"] for e in entries])
+    outflow = np.array([e["outflow"] for e in entries])
+    net = inflow + outflow
+    complete = (calendar + 1).astype("datetime64[D]") <= as_of + 1
+    window = np.flatnonzero(complete)[-BURN_MONTHS:]
+
+    burn_rate = gross_burn = runway = None
+    if len(window):
+        burn_rate = float(max(0.0, -net[window].mean()))
+        gross_burn = float(-outflow[window].mean())
+        if burn_rate > 0:
+            runway = max(0.0, balance) / (burn_rate / DAYS_PER_MONTH)
+
+    tail = daily[-VOLATILITY_DAYS:]
+    series_start = max(0, len(running) - days) if days else 0
+    dates = np.arange(first_day + series_start, as_of + 1)
+    return {
+        "balance": round(balance, 2),
+        "as_of": str(as_of),
+        "burn_rate": round(burn_rate, 2) if burn_rate is not None else None,
+        "gross_burn": round(gross_burn, 2) if gross_burn is not None else None,
+        "runway_days": round(runway, 1) if runway is not None else None,
+        "volatility": {
+            "daily_net_std": round(float(tail.std()), 2),
+            "monthly_net_std": round(float(net[complete].std()), 2) if complete.any() else None,
+        },
+        "monthly": [
+            {"month": str(m), "inflow": round(float(i), 2), "outflow": round(float(o), 2), "net": round(float(i + o), 2), "transactions": e["transactions"]}
+            for m, i, o, e in zip(calendar, inflow, outflow, entries)
+        ],
+        "daily_balance": [
+            {"date": str(d), "balance": round(b, 2)}
+            for d, b in zip(dates.tolist(), running[series_start:].tolist())
+        ],
+    }
+
+def compute(db: Session, report_id: int, days: int = 90) -> Optional[Dict[str, Any]]:
+    """Cash-flow analytics for a report's linked bank accounts (None when none are linked)."""
+    loaded = load_months(db, report_id)
+    if loaded is None:
+        return None
+    result = summarize(loaded["months"], loaded["balance"], days)
+    result["report_id"] = report_id
+    result["recomputed_from"] = loaded["recomputed_from"]
+    return result
+
+def advisor_inputs(cashflow: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of the analytics passed to ai_advisor as metrics["cash_flow"]."""
+    return {
+        "balance": cashflow["balance"],
+        "burn_rate": cashflow["burn_rate"],
+        "runway_days": cashflow["runway_days"],
+        "daily_net_std": cashflow["volatility"]["daily_net_std"],
+        "monthly_net_std": cashflow["volatility"]["monthly_net_std"],
+    }
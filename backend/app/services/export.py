@@ -0,0 +1,214 @@
+import csv
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import FinancialReport
+from ..core import security
+from . import key_rotation, portfolio, reports
+
+# Rows fetched per round trip from the server-side cursor, and decrypted per task
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+# Decryption processes (0 decrypts in the exporting thread); by default one per spare core, up to 4
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", str(min(4, (os.cpu_count() or 1) - 1))))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+FORMATS = list(MEDIA_TYPES)
+
+# Columns loaded per report: the plain ones, the envelope and the legacy per-bucket columns
+_COLUMNS = [getattr(FinancialReport, name) for name in reports.REPORT_FIELDS if name not in reports.SENSITIVE_FIELDS]
+_COLUMNS += [FinancialReport.sensitive_data] + [getattr(FinancialReport, name) for name in reports.SENSITIVE_FIELDS]
+
+# Parquet has a fixed schema; the nested buckets (free-form dicts) are stored as JSON strings
+_ARROW_TYPES = {"id": pa.int64(), "created_at": pa.timestamp("us"), "credit_score_estimate": pa.int64()}
+_SCALAR_FIELDS = {"id", "source_type", "filename", "created_at", "industry", "risk_assessment", "credit_score_estimate"}
+PARQUET_SCHEMA = pa.schema([(name, _ARROW_TYPES.get(name, pa.string())) for name in reports.REPORT_FIELDS])
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _submit(workers: int, fn, *args):
+    """
+    Runs fn(*args) on the decryption pool shared by every export, started on first use
+    and replaced when `workers` asks for another size (or a worker died). Exports
+    running at once share its processes instead of each starting their own.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers or _pool._broken:
+            if _pool is not None:
+                # Batches already submitted to the old pool still finish
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=key_rotation._init_worker, initargs=(security.KEY, security.OLD_KEYS))
+            _pool_workers = workers
+        return _pool.submit(fn, *args)
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def decrypt_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Report records (as GET /{report_id} returns them, created_at in ISO format) for a batch of raw rows."""
+    records = []
+    for row in rows:
+        sensitive = reports.load_sensitive(SimpleNamespace(**row))
+        key_metrics = row["key_metrics"]
+        record = {
+            name: sensitive[name] if name in sensitive else row[name]
+            for name in reports.REPORT_FIELDS
+        }
+        record["key_metrics"] = key_metrics if isinstance(key_metrics, dict) else {"net_profit": key_metrics}
+        record["created_at"] = row["created_at"].isoformat() if row["created_at"] else None
+        records.append(record)
+    return records
+
+def export_query(**filters):
+    """Every matching report in primary-key order, streamed EXPORT_BATCH_SIZE rows at a time."""
+    return portfolio.apply_filters(select(*_COLUMNS), **filters).order_by(FinancialReport.id)
+
+def _flat(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value if name in _SCALAR_FIELDS or value is None else json.dumps(value) for name, value in record.items()}
+
+def render_rows(rows: List[Dict[str, Any]], fmt: str):
+    """
+    Decrypts and serializes a batch of raw rows: NDJSON lines or CSV rows (no header)
+    as bytes, or flat Parquet rows. Runs on the worker processes, so only compact
+    output (not the decoded buckets) travels back to the exporter.
+    """
+    records = decrypt_rows(rows)
+    if fmt == "ndjson":
+        return "".join(json.dumps(record) + "\n" for record in records).encode()
+    flat = [_flat(record) for record in records]
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=reports.REPORT_FIELDS).writerows(flat)
+        return buffer.getvalue().encode()
+    for row in flat:
+        if row["created_at"]:
+            row["created_at"] = datetime.fromisoformat(row["created_at"])
+    return flat
+
+def iter_batches(
+    db: Session,
+    fmt: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    workers: int = EXPORT_WORKERS,
+    **filters,
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Yields (rows, render_rows output) per batch of matching reports, in id order.
+
+    Rows come off a server-side cursor (yield_per), so only the batches in flight
+    are held in memory: one being fetched plus at most 2 * workers being decrypted
+    on the shared process pool, whatever the size of the table.
+    """
+    result = db.execute(export_query(**filters).execution_options(yield_per=batch_size))
+    batches = ([row._asdict() for row in partition] for partition in result.partitions())
+    if workers <= 0:
+        for rows in batches:
+            yield len(rows), render_rows(rows, fmt)
+        return
+    pending = []
+    try:
+        for rows in batches:
+            pending.append((len(rows), _submit(workers, render_rows, rows, fmt)))
+            if len(pending) >= 2 * workers:
+                count, future = pending.pop(0)
+                yield count, future.result()
+        while pending:
+            count, future = pending.pop(0)
+            yield count, future.result()
+    finally:
+        # A client that disconnects mid-export leaves nothing queued on the shared pool
+        for _, future in pending:
+            future.cancel()
+
+class _Drain:
+    """Write-only file for ParquetWriter whose contents are handed out as they are written."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def export_reports(
+    db: Session,
+    fmt: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    workers: int = EXPORT_WORKERS,
+    progress: Optional[Callable[[int, float], None]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+    **filters,
+) -> Iterator[bytes]:
+    """
+    Streams every report matching the portfolio `filters` as `fmt` (ndjson, csv or
+    parquet), one chunk per batch (one row group per batch for Parquet).
+    `progress(rows, elapsed)` is called after each batch; `stats`, when given, is filled
+    with rows, seconds and rows_per_second once the export finishes.
+    """
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unknown export format {fmt!r}. Use one of: {', '.join(FORMATS)}")
+    started = time.monotonic()
+    done = 0
+    writer = sink = None
+    if fmt == "csv":
+        header = io.StringIO()
+        csv.DictWriter(header, fieldnames=reports.REPORT_FIELDS).writeheader()
+        yield header.getvalue().encode()
+    elif fmt == "parquet":
+        sink = _Drain()
+        writer = pq.ParquetWriter(sink, PARQUET_SCHEMA)
+
+    for count, payload in iter_batches(db, fmt, batch_size, workers, **filters):
+        if writer is not None:
+            writer.write_table(pa.Table.from_pylist(payload, schema=PARQUET_SCHEMA))
+            payload = sink.drain()
+        yield payload
+        done += count
+        if progress:
+            progress(done, time.monotonic() - started)
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+    elapsed = time.monotonic() - started
+    if stats is not None:
+        stats.update({"rows": done, "seconds": round(elapsed, 3), "rows_per_second": round(done / elapsed, 1) if elapsed else None})
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from ..database import SessionLocal
+from . import parser, ai_advisor, reports, peers, parse_cache, streaming, line_items
+from .parse_cache import get_parse_cache
+
+# "thread" runs the whole pipeline on worker threads; "process" additionally moves
+# parsing/metric extraction (the CPU-bound part) to a process pool of the same size.
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "thread")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Jobs allowed to wait behind the running ones before submissions are rejected
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "analysis_jobs.db")
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", "job_uploads")
+
+class JobQueueFull(Exception):
+    pass
+
+class JobStore:
+    """Job state in a local SQLite table, so queued/finished jobs survive a restart."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    language TEXT,
+                    input_path TEXT,
+                    report_id INTEGER,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+
+    def create(self, job_id: str, filename: str, language: str, input_path: str) -> None:
+        now = datetime.utcnow().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO analysis_jobs (id, status, filename, language, input_path, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, filename, language, input_path, now, now),
+            )
+
+    def update(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE analysis_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM analysis_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def pending(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM analysis_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+def compute_metrics(input_path: str, filename: str) -> Dict[str, Any]:
+    """Parse + extract, returning {"metrics", "aggregates"}. Module-level so it can be shipped to a process pool."""
+    with open(input_path, "rb") as f:
+        content = f.read()
+    cache = get_parse_cache()
+    key = parse_cache.cache_key(hashlib.sha256(content).hexdigest(), filename)
+    entry = cache.get(key) if cache else None
+    if entry is None:
+        df = parser.parse_file(content, filename)
+        metrics = parser.extract_financial_metrics(df)
+        entry = {"metrics": metrics, "aggregates": streaming.MetricsAccumulator.from_metrics(df, metrics).state()}
+        if cache:
+            cache.put(key, metrics, entry["aggregates"])
+    return entry
+
+class JobManager:
+    """
+    Runs upload analyses off the event loop on a bounded pool.
+
+    At most `workers` jobs run at once and at most `queue_size` more may wait;
+    submit() raises JobQueueFull beyond that instead of letting the backlog grow.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE, executor: str = JOB_EXECUTOR):
+        self.store = store
+        self.workers = workers
+        self.queue_size = queue_size
+        self._threads = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-job")
+        self._processes = ProcessPoolExecutor(max_workers=workers) if executor == "process" else None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._running = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def is_full(self) -> bool:
+        with self._lock:
+            return self._inflight >= self.capacity
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._inflight - self._running,
+                "capacity": self.capacity,
+            }
+
+    def submit(self, filename: str, language: str, input_path: str) -> str:
+        with self._lock:
+            if self._inflight >= self.capacity:
+                raise JobQueueFull(f"Analysis queue is full ({self._inflight} jobs in flight)")
+            self._inflight += 1
+        job_id = uuid.uuid4().hex
+        try:
+            self.store.create(job_id, filename, language, input_path)
+            self._threads.submit(self._run, job_id, filename, language, input_path)
+        except Exception:
+            with self._lock:
+                self._inflight -= 1
+            raise
+        return job_id
+
+    def recover(self) -> None:
+        """Re-queues jobs left queued/running by a previous process; fails those whose input is gone."""
+        for job in self.store.pending():
+            if not job["input_path"] or not os.path.exists(job["input_path"]):
+                self.store.update(job["id"], status="failed", error="Upload was lost before the job could run")
+                continue
+            with self._lock:
+                self._inflight += 1
+            self.store.update(job["id"], status="queued")
+            self._threads.submit(self._run, job["id"], job["filename"], job["language"], job["input_path"])
+
+    def shutdown(self) -> None:
+        # Unfinished jobs stay queued/running in the store and are picked up by recover()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, filename: str, language: str, input_path: str) -> None:
+        with self._lock:
+            self._running += 1
+        self.store.update(job_id, status="running")
+        try:
+            if self._processes is not None:
+                parsed = self._processes.submit(compute_metrics, input_path, filename).result()
+            else:
+                parsed = compute_metrics(input_path, filename)
+            metrics, items = line_items.split(parsed["metrics"])
+
+            # AI Analysis
+            analysis_result = ai_advisor.analyze_financial_health(metrics, language)
+
+            db = SessionLocal()
+            try:
+                report = reports.build_report(metrics, analysis_result, filename, aggregates=parsed["aggregates"], items=items)
+                db.add(report)
+                db.commit()
+                report_id = report.id
+                try:
+                    peers.record(db, [peers.observation(report, metrics)])
+                    db.commit()
+                except Exception as e:
+                    # Sketches can be rebuilt offline; don't fail the job over them
+                    db.rollback()
+                    print(f"Peer sketch update failed: {e}")
+            finally:
+                db.close()
+            self.store.update(job_id, status="completed", report_id=report_id, input_path=None)
+            os.remove(input_path)
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            self.store.update(job_id, status="failed", error=str(detail), input_path=None)
+            if os.path.exists(input_path):
+                os.remove(input_path)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._inflight -= 1
+
+_manager: Optional[JobManager] = None
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+        _manager = JobManager(JobStore(JOB_STORE_PATH))
+    return _manager
@@ -0,0 +1,135 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Callable, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from ..models import FinancialReport, ReportLineItems
+from ..core import security
+from . import report_cache
+from .reports import SENSITIVE_FIELDS
+
+ROTATION_BATCH_SIZE = 500
+
+def _init_worker(key: str, old_keys: List[str]) -> None:
+    # Workers must use exactly the parent's keys, even when ENCRYPTION_KEY was generated at import
+    from cryptography.fernet import Fernet, MultiFernet
+    security.cipher_suite = MultiFernet([Fernet(key.encode())] + [Fernet(k.encode()) for k in old_keys])
+
+def rotate_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Re-encrypts a batch of reports under the current key.
+    Envelope rows are rotated in place; legacy rows (one token per column) are
+    folded into a new envelope (write_rotated clears their per-bucket columns).
+    Each update carries the version it was read at.
+    """
+    updates = []
+    for row in rows:
+        if row["sensitive_data"]:
+            sensitive_data = security.rotate_token(row["sensitive_data"])
+        else:
+            sensitive_data = security.encrypt_envelope({name: security.decrypt_data(row[name]) for name in SENSITIVE_FIELDS})
+        updates.append({"id": row["id"], "version": row["version"], "sensitive_data": sensitive_data})
+    return updates
+
+_ROTATION_COLUMNS = [FinancialReport.id, FinancialReport.version, FinancialReport.sensitive_data] + [
+    getattr(FinancialReport, name) for name in SENSITIVE_FIELDS
+]
+
+def write_rotated(db: Session, updates: List[Dict[str, Any]]) -> List[int]:
+    """
+    Writes rotate_rows output (the caller commits), each row only if its version is
+    still the one it was read at, and bumps the version. Returns the ids of rows
+    another writer changed in between: they were left untouched and must be re-read.
+    """
+    if not updates:
+        return []
+    table = FinancialReport.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version"))
+        .values(sensitive_data=bindparam("b_sensitive_data"), version=table.c.version + 1, **{name: None for name in SENSITIVE_FIELDS})
+    )
+    db.execute(statement, [{"b_id": u["id"], "b_version": u["version"], "b_sensitive_data": u["sensitive_data"]} for u in updates])
+    # Every new token is unique, so a row holds it only if this UPDATE matched (multi-row rowcounts are not reliable)
+    stored = dict(db.execute(select(table.c.id, table.c.sensitive_data).where(table.c.id.in_([u["id"] for u in updates]))).all())
+    return [u["id"] for u in updates if u["id"] in stored and stored[u["id"]] != u["sensitive_data"]]
+
+def rotate_all(
+    db: Session,
+    batch_size: int = ROTATION_BATCH_SIZE,
+    workers: int = 4,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Re-encrypts every FinancialReport (then every line-item block) under security.KEY.
+
+    Rows are streamed in primary-key batches (only the encrypted columns are loaded),
+    re-encrypted on a process pool with at most 2 * workers batches in flight, and
+    written back with one bulk UPDATE + commit per batch, so the table is never
+    locked as a whole and a crash only loses the in-flight batches (rotation is
+    idempotent and can simply be re-run). The UPDATE is conditional on each row's
+    version: rows updated by the app meanwhile are re-read and rotated again, so
+    their new contents are never overwritten with the stale ones.
+    """
+    total = db.query(FinancialReport).count()
+    done = 0
+    started = time.monotonic()
+
+    def batches():
+        last_id = 0
+        while True:
+            rows = db.query(*_ROTATION_COLUMNS).filter(FinancialReport.id > last_id).order_by(FinancialReport.id).limit(batch_size).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield [row._asdict() for row in rows]
+
+    def write(updates: List[Dict[str, Any]]) -> None:
+        nonlocal done
+        while updates:
+            lost = write_rotated(db, updates)
+            db.commit()
+            report_cache.invalidate(u["id"] for u in updates if u["id"] not in lost)
+            done += len(updates) - len(lost)
+            # Few rows lose the race: rotate their current contents here
+            rows = db.query(*_ROTATION_COLUMNS).filter(FinancialReport.id.in_(lost)).all() if lost else []
+            updates = rotate_rows([row._asdict() for row in rows])
+        if progress:
+            progress(done, total, time.monotonic() - started)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(security.KEY, security.OLD_KEYS)) as pool:
+        pending = []
+        for rows in batches():
+            pending.append(pool.submit(rotate_rows, rows))
+            if len(pending) >= 2 * workers:
+                write(pending.pop(0).result())
+        for future in pending:
+            write(future.result())
+
+    blocks = rotate_line_items(db, batch_size)
+    elapsed = time.monotonic() - started
+    return {
+        "rotated": done, "total": total, "line_item_blocks": blocks,
+        "seconds": round(elapsed, 3), "rows_per_second": round(done / elapsed, 1) if elapsed else None,
+    }
+
+def rotate_line_items(db: Session, batch_size: int = ROTATION_BATCH_SIZE) -> int:
+    """Re-encrypts the report line-item blocks, in primary-key batches like the reports."""
+    rotated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.query(ReportLineItems.id, ReportLineItems.data)
+            .filter(ReportLineItems.id > last_id)
+            .order_by(ReportLineItems.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return rotated
+        last_id = rows[-1].id
+        db.bulk_update_mappings(ReportLineItems, [{"id": row.id, "data": security.rotate_token(row.data)} for row in rows])
+        db.commit()
+        rotated += len(rows)
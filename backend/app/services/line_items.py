@@ -0,0 +1,128 @@
+import base64
+import json
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import ReportLineItems
+from ..core import security
+from . import parser
+
+# Items per encrypted block: one cipher operation per block; a full page spans at most two blocks of an upload
+LINE_ITEM_BLOCK_SIZE = int(os.getenv("LINE_ITEM_BLOCK_SIZE", "1000"))
+# Largest items kept inline in each bucket's summary
+LINE_ITEM_TOP_N = int(os.getenv("LINE_ITEM_TOP_N", "10"))
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = LINE_ITEM_BLOCK_SIZE
+
+ITEM_BUCKETS = list(parser.DETAIL_BUCKETS.values())
+
+class InvalidCursor(ValueError):
+    pass
+
+def _top(items: List[Dict[str, Any]], n: int = LINE_ITEM_TOP_N) -> List[Dict[str, Any]]:
+    # Largest amounts first; sorted() is stable, so ties keep upload order
+    return sorted(items, key=lambda item: -item["amount"])[:n]
+
+def summarize(bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact form of a {"total", "details"} bucket: {"total", "count", "top"}."""
+    details = bucket.get("details", [])
+    return {"total": bucket.get("total", 0), "count": len(details), "top": _top(details)}
+
+def merge_summaries(a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary of two consecutive item lists from their summaries (the top-N of a union is in the union of top-Ns)."""
+    return {"total": a["total"] + b["total"], "count": a["count"] + b["count"], "top": _top(a["top"] + b["top"])}
+
+def split(metrics: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[Dict[str, Any]]]]:
+    """
+    Separates the line items from a metrics dict: returns a copy whose item buckets
+    are summaries, and the items per bucket. Already-summarised buckets pass through.
+    """
+    compact = dict(metrics)
+    items = {}
+    for key in ITEM_BUCKETS:
+        bucket = metrics.get(key)
+        if isinstance(bucket, dict) and "details" in bucket:
+            compact[key] = summarize(bucket)
+            items[key] = bucket["details"]
+    return compact, items
+
+def blocks(items: Dict[str, List[Dict[str, Any]]], start: Optional[Dict[str, int]] = None) -> List[ReportLineItems]:
+    """Encrypted blocks for the items of each bucket, numbered from `start[bucket]` (0 by default)."""
+    start = start or {}
+    out = []
+    for bucket, bucket_items in items.items():
+        offset = start.get(bucket, 0)
+        for i in range(0, len(bucket_items), LINE_ITEM_BLOCK_SIZE):
+            chunk = [[item["item"], item["amount"]] for item in bucket_items[i:i + LINE_ITEM_BLOCK_SIZE]]
+            out.append(ReportLineItems(
+                bucket=bucket,
+                start=offset + i,
+                count=len(chunk),
+                data=security.cipher_suite.encrypt(json.dumps(chunk).encode()).decode(),
+            ))
+    return out
+
+async def replace(db: AsyncSession, report_id: int, items: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Replaces the stored items of the given buckets (the caller commits)."""
+    if not items:
+        return
+    await db.execute(delete(ReportLineItems).where(ReportLineItems.report_id == report_id, ReportLineItems.bucket.in_(list(items))))
+    await append(db, report_id, items)
+
+async def append(db: AsyncSession, report_id: int, items: Dict[str, List[Dict[str, Any]]], start: Optional[Dict[str, int]] = None) -> None:
+    """Adds blocks for `items` after the bucket's existing `start[bucket]` items (the caller commits)."""
+    new_blocks = blocks(items, start)
+    for block in new_blocks:
+        block.report_id = report_id
+    db.add_all(new_blocks)
+
+def encode_cursor(position: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([position]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        (position,) = json.loads(raw)
+        return int(position)
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+async def page(db: AsyncSession, report_id: int, bucket: Dict[str, Any], bucket_key: str,
+               cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    One page of a bucket's items in upload order. `bucket` is the report's stored
+    bucket: a summary (only the blocks overlapping the page are read and decrypted,
+    whatever the bucket's size) or, on reports stored before line items moved out,
+    the inline details list.
+    """
+    position = decode_cursor(cursor) if cursor else 0
+    end = position + limit
+    if "details" in bucket:
+        items = bucket["details"][position:end]
+        count = len(bucket["details"])
+    else:
+        rows = (await db.execute(
+            select(ReportLineItems.start, ReportLineItems.data)
+            .where(
+                ReportLineItems.report_id == report_id,
+                ReportLineItems.bucket == bucket_key,
+                ReportLineItems.start < end,
+                ReportLineItems.start + ReportLineItems.count > position,
+            )
+            .order_by(ReportLineItems.start)
+        )).all()
+        items = []
+        for start, data in rows:
+            chunk = json.loads(security.cipher_suite.decrypt(data.encode()))
+            items.extend({"item": item, "amount": amount} for item, amount in chunk[max(position - start, 0):end - start])
+        count = bucket.get("count", 0)
+    return {
+        "report_id": report_id,
+        "bucket": bucket_key,
+        "count": count,
+        "items": items,
+        "next_cursor": encode_cursor(end) if end < count else None,
+    }
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from cryptography.fernet import InvalidToken
+
+from ..core import security, telemetry
+from .parser import PARSER_VERSION
+
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "parse_cache")
+# Total bytes of stored entries; least recently used entries are evicted beyond it
+PARSE_CACHE_MAX_BYTES = int(os.getenv("PARSE_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+def cache_key(digest: str, filename: str) -> str:
+    """
+    Key for an upload's SHA-256 `digest`. The extension picks the parser and the
+    parser version invalidates entries whenever parsing or extraction changes.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    return hashlib.sha256(f"{PARSER_VERSION}:{extension}:{digest}".encode()).hexdigest()
+
+class ParseCache:
+    """
+    Content-addressed store of parse results: metrics and mergeable aggregates
+    keyed by cache_key().
+
+    Blobs are Fernet-encrypted files under `directory`; a SQLite index there tracks
+    their size and last access. When a put() takes the total past `max_bytes`, the
+    least recently used entries are deleted until it fits again.
+    """
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        with self._lock, self._conn:
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(parse_cache)")]
+            if "has_frame" in columns:
+                # Index written when frames were cached too: start over (it is only a cache)
+                stale = [row[0] for row in self._conn.execute("SELECT key FROM parse_cache")]
+                self._conn.execute("DROP TABLE parse_cache")
+                for key in stale:
+                    self._remove(key)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parse_cache (key TEXT PRIMARY KEY, size INTEGER NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_parse_cache_accessed_at ON parse_cache (accessed_at)")
+
+    def _path(self, key: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def _write(self, key: str, kind: str, data: bytes) -> int:
+        # Write-then-rename so a concurrent reader never sees a partial blob
+        path = self._path(key, kind)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    def _remove(self, key: str) -> None:
+        # .parquet: frames stored by older versions
+        for kind in ("metrics", "parquet"):
+            try:
+                os.remove(self._path(key, kind))
+            except FileNotFoundError:
+                pass
+
+    def _drop(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM parse_cache WHERE key = ?", (key,))
+        self._remove(key)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """The cached {"metrics", "aggregates"} entry for `key`, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM parse_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                with self._conn:
+                    self._conn.execute("UPDATE parse_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        entry = None
+        if row is not None:
+            try:
+                with open(self._path(key, "metrics"), "rb") as f:
+                    entry = security.decrypt_data(f.read().decode())
+            except FileNotFoundError:
+                pass
+            except InvalidToken:
+                # Written under a different ENCRYPTION_KEY
+                self._drop(key)
+        with self._lock:
+            self._counters["hits" if entry is not None else "misses"] += 1
+        return entry
+
+    def put(self, key: str, metrics: Dict[str, Any], aggregates: Optional[Dict[str, Any]] = None) -> None:
+        entry = {"metrics": metrics, "aggregates": aggregates}
+        size = self._write(key, "metrics", security.encrypt_data(entry).encode())
+
+        now = time.time()
+        evicted = []
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parse_cache (key, size, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, size, now, now),
+            )
+            self._counters["stores"] += 1
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM parse_cache").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, old_size in self._conn.execute("SELECT key, size FROM parse_cache ORDER BY accessed_at"):
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append(old_key)
+                    total -= old_size
+                self._conn.executemany("DELETE FROM parse_cache WHERE key = ?", [(k,) for k in evicted])
+                self._counters["evictions"] += len(evicted)
+        for old_key in evicted:
+            self._remove(old_key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            items, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parse_cache").fetchone()
+            return {**self._counters, "items": items, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            keys = [row[0] for row in self._conn.execute("SELECT key FROM parse_cache")]
+            self._conn.execute("DELETE FROM parse_cache")
+        for key in keys:
+            self._remove(key)
+
+_cache: Optional[ParseCache] = None
+_cache_lock = threading.Lock()
+
+def get_parse_cache() -> Optional[ParseCache]:
+    """The process-wide cache, or None when PARSE_CACHE_ENABLED is off."""
+    global _cache
+    if not PARSE_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ParseCache()
+        return _cache
+
+def _cache_samples():
+    """Parse cache counters for /metrics (only once the cache has been opened)."""
+    if _cache is None:
+        return
+    stats = _cache.stats()
+    yield ("fhp_parse_cache_events_total", "counter", "Parse cache lookups, stores and evictions by event.",
+           [({"event": event}, stats[event]) for event in ("hits", "misses", "stores", "evictions")])
+    yield ("fhp_parse_cache_bytes", "gauge", "Bytes held by the parse cache.", [({}, stats["bytes"])])
+    yield ("fhp_parse_cache_items", "gauge", "Entries held by the parse cache.", [({}, stats["items"])])
+
+telemetry.register_collector(_cache_samples)
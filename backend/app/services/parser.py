@@ -1,44 +1,453 @@
 import pandas as pd
 import io
 import re
-from pypdf import PdfReader
+import csv
 from fastapi import HTTPException
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv, feather, parquet
+
+from ..core import telemetry
+from . import pdf_parser
+
+# Bump whenever parse_file/extract_financial_metrics output changes: it is part of
+# the parse cache key, so older cached results stop matching
+PARSER_VERSION = "3"
+
+# Keywords configuration
+KEYWORDS = {
+    "revenue": ["revenue", "sales", "income", "receipts"],
+    "expenses": ["expense", "cost", "salary", "rent", "utilities", "marketing"],
+    "receivable": ["receivable", "due from", "invoice out"],
+    "payable": ["payable", "due to", "invoice in", "bill"],
+    "inventory": ["inventory", "stock", "goods"],
+    "loans": ["loan", "interest", "credit", "debt", "principal", "emi"],
+    "tax": ["tax", "gst", "vat", "deduction", "duty"]
+}
+
+# Buckets that carry an itemised "details" list, mapped to their metrics key
+DETAIL_BUCKETS = {
+    "receivable": "accounts_receivable",
+    "payable": "accounts_payable",
+    "inventory": "inventory_levels",
+    "loans": "loan_obligations",
+    "tax": "tax_compliance",
+}
+
+# Categories kept per bucket in a period cube; the rest are summed into PERIOD_OTHER
+PERIOD_MAX_CATEGORIES = 50
+PERIOD_OTHER = "Other"
+
+# Compiled once at import: one alternation per bucket is equivalent to any(k in text for k in keywords)
+KEYWORD_PATTERNS = {bucket: re.compile("|".join(re.escape(k) for k in words)) for bucket, words in KEYWORDS.items()}
+
+# Helper to check if row/col matches keywords
+def matches(text, keywords):
+    if not isinstance(text, str): return False
+    text = text.lower()
+    return any(k in text for k in keywords)
+
+def classify_label(text: str) -> Dict[str, bool]:
+    """Classifies a single label (e.g. a column header) against every bucket."""
+    text = str(text).lower()
+    return {bucket: bool(pattern.search(text)) for bucket, pattern in KEYWORD_PATTERNS.items()}
+
+def classify_categories(categories: pd.Series):
+    """
+    Labels a whole category column in vectorized passes.
+    Each distinct value is stringified and classified once; the result is broadcast
+    back to the rows through the factorized codes.
+    Returns (codes, labels, masks) where masks[bucket] is a per-row boolean array.
+    """
+    codes, uniques = pd.factorize(categories, use_na_sentinel=False)
+    # Distinct raw values can collapse to the same string (e.g. 1 and "1"), so factorize again
+    label_codes, labels = pd.factorize(pd.Index([str(u) for u in uniques], dtype=object))
+    codes = label_codes[codes]
+    lowered = pd.Series(labels, dtype=object).str.lower()
+
+    masks = {}
+    for bucket, pattern in KEYWORD_PATTERNS.items():
+        hits = lowered.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+        masks[bucket] = hits[codes]
+    # Revenue takes precedence over expenses for the same row
+    masks["expenses"] = masks["expenses"] & ~masks["revenue"]
+    return codes, list(labels), masks
+
+def coerce_amounts(amounts: pd.Series):
+    """
+    Converts an amount column to float the same way float(value) would per row.
+    Returns (values, valid) where valid marks rows whose value could be converted.
+    """
+    if pd.api.types.is_numeric_dtype(amounts):
+        values = amounts.to_numpy(dtype=float, na_value=np.nan)
+        return values, np.ones(len(values), dtype=bool)
+
+    codes, uniques = pd.factorize(amounts, use_na_sentinel=False)
+    converted = np.empty(len(uniques), dtype=float)
+    ok = np.ones(len(uniques), dtype=bool)
+    for i, value in enumerate(uniques):
+        try:
+            converted[i] = float(value)
+        except:
+            converted[i] = np.nan
+            ok[i] = False
+    values, valid = converted[codes], ok[codes]
+    # factorize folds None/pd.NA into NaN, but only a float NaN survives float(value)
+    missing = np.flatnonzero(amounts.isna().to_numpy())
+    valid[missing] = [isinstance(amounts.iat[i], float) for i in missing]
+    return values, valid
+
+def aggregate_ledger(categories: pd.Series, amounts: pd.Series, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Adds a (category, amount) ledger into the metrics containers using mask aggregation.
+    Totals, category maps (last amount per category, first-seen order) and details lists
+    extend whatever is already in `metrics`, so successive chunks can be folded in.
+    """
+    codes, labels, masks = classify_categories(categories)
+    values, valid = coerce_amounts(amounts)
+
+    for bucket, key in (("revenue", "revenue_streams"), ("expenses", "cost_structure")):
+        mask = masks[bucket] & valid
+        if not mask.any():
+            continue
+        bucket_codes = codes[mask]
+        bucket_values = values[mask]
+        metrics[key]["total"] += float(bucket_values.sum())
+
+        latest = pd.Series(bucket_values, index=bucket_codes)
+        latest = latest[~latest.index.duplicated(keep="last")]
+        latest = latest.reindex(pd.unique(bucket_codes))
+        categories_out = metrics[key]["categories"]
+        for code, amount in zip(latest.index, latest.to_numpy()):
+            categories_out[labels[code]] = float(amount)
+
+    for bucket, key in DETAIL_BUCKETS.items():
+        mask = masks[bucket] & valid
+        if not mask.any():
+            continue
+        bucket_values = values[mask]
+        metrics[key]["total"] += float(bucket_values.sum())
+        metrics[key]["details"].extend(
+            {"item": labels[code], "amount": float(amount)}
+            for code, amount in zip(codes[mask], bucket_values)
+        )
+
+    return metrics
+
+# Industry keywords in priority order: the first industry with any hit wins
+INDUSTRY_KEYWORDS = {
+    "Agriculture": ["crop", "farm", "seed", "harvest", "agriculture"],
+    "Manufacturing": ["manufacturing", "factory", "plant", "raw material", "production"],
+    "Logistics": ["shipping", "freight", "logistics", "transport", "delivery"],
+    "E-commerce": ["shopify", "stripe", "ecommerce", "online store", "cart"],
+    "Retail": ["retail", "store", "shop", "inventory", "stock"],
+    "Services": ["consulting", "service", "subscription", "agency", "software"],
+}
+INDUSTRY_PRIORITY = list(INDUSTRY_KEYWORDS)
+INDUSTRY_BY_KEYWORD = {k: industry for industry, words in INDUSTRY_KEYWORDS.items() for k in words}
+
+# INDUSTRY_PATTERNS[r] matches every keyword of the industries ranked above r, so once an
+# industry of rank r is found the scan only keeps looking for something that outranks it.
+# Each is a single compiled alternation (one pass over the text for all keywords); the
+# lookahead reports overlapping hits and the priority ordering picks the best one per offset.
+INDUSTRY_PATTERNS = [
+    re.compile("(?=(" + "|".join(re.escape(k) for industry in INDUSTRY_PRIORITY[:rank] for k in INDUSTRY_KEYWORDS[industry]) + "))")
+    if rank else None
+    for rank in range(len(INDUSTRY_PRIORITY) + 1)
+]
+
+def _text_columns(df_local: pd.DataFrame):
+    """Columns that can hold keyword text; numeric, boolean and datetime cells never match."""
+    return df_local.select_dtypes(include=["object", "string", "category"]).columns
+
+def industry_hits(df_local: pd.DataFrame, text_content: str = "", known: set = frozenset()) -> set:
+    """
+    Returns the highest-priority industry with a keyword in the headers, text columns
+    or `text_content`, as a set so per-chunk results can be unioned; empty if none.
+    Only distinct cell values are scanned, and the scan stops as soon as nothing can
+    outrank the best hit (including anything already in `known`).
+    """
+    best = min((INDUSTRY_PRIORITY.index(i) for i in known), default=len(INDUSTRY_PRIORITY))
+
+    def scan(blob: str) -> None:
+        nonlocal best
+        pattern = INDUSTRY_PATTERNS[best]
+        if pattern is None:
+            return
+        for keyword in pattern.findall(blob.lower()):
+            best = min(best, INDUSTRY_PRIORITY.index(INDUSTRY_BY_KEYWORD[keyword]))
+            if best == 0:
+                return
+
+    # Newline-joined so a keyword can never straddle two cells
+    scan(text_content + "\n" + "\n".join(df_local.columns.astype(str)))
+    for col in _text_columns(df_local):
+        if best == 0:
+            break
+        scan("\n".join(str(v) for v in df_local[col].dropna().unique()))
+
+    return {INDUSTRY_PRIORITY[best]} if best < len(INDUSTRY_PRIORITY) else set()
+
+def resolve_industry(hits: set) -> str:
+    for industry in INDUSTRY_KEYWORDS:
+        if industry in hits:
+            return industry
+    return "General"
+
+# Industry Determination Logic
+def determine_industry(df_local: pd.DataFrame, text_content: str = "") -> str:
+    return resolve_industry(industry_hits(df_local, text_content))
+
+def is_risk_dataset(columns) -> bool:
+    return "loan amount" in columns and "income" in columns and "risk rating" in columns
+
+# The only risk-dataset columns the metrics read (normalized names); the rest are never loaded
+RISK_COLUMNS = ["income", "loan amount", "debt-to-income ratio", "employment status", "loan purpose", "risk rating"]
+# Low-cardinality labels, loaded as categoricals (Arrow dictionary arrays)
+RISK_CATEGORICAL = ["employment status", "loan purpose", "risk rating"]
+RISK_CSV_BLOCK_SIZE = 8 << 20
+
+def risk_projection(names) -> Optional[List[str]]:
+    """The original names of the columns to load if `names` is a risk-assessment header, else None."""
+    normalized = {str(n).lower().strip(): n for n in names}
+    if not is_risk_dataset(normalized):
+        return None
+    return [normalized[c] for c in RISK_COLUMNS if c in normalized]
+
+def is_risk_label(name) -> bool:
+    return str(name).lower().strip() in RISK_CATEGORICAL
+
+def csv_risk_projection(header_line: bytes) -> Optional[List[str]]:
+    """risk_projection() of a CSV from its first line; the in-memory and chunked CSV readers both load this."""
+    return risk_projection(_csv_header(header_line))
+
+def _label_codes(df: pd.DataFrame, column: str):
+    """Integer codes (missing labels last) and the observed labels of a label column."""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.intp), []
+    codes, labels = pd.factorize(df[column])
+    return np.where(codes < 0, len(labels), codes), list(labels)
+
+def risk_aggregates(df: pd.DataFrame):
+    """
+    (total_revenue, revenue_by_employment, total_loans, loans_by_purpose, estimated_costs)
+    for a risk-assessment frame with normalized column names, in one grouped pass:
+    income, loan amount and DTI x income are summed per (employment status, loan purpose)
+    cell with bincount, and the totals and per-label sums are read off that small grid.
+    Missing amounts count as 0 and rows with a missing label still count in the totals.
+    """
+    employment, employment_labels = _label_codes(df, "employment status")
+    purpose, purpose_labels = _label_codes(df, "loan purpose")
+    shape = (len(employment_labels) + 1, len(purpose_labels) + 1)
+    cell = employment * shape[1] + purpose
+
+    income = df["income"].to_numpy(dtype=float, na_value=0.0)
+    def grid(weights):
+        return np.bincount(cell, weights=weights, minlength=shape[0] * shape[1]).reshape(shape)
+    revenue = grid(income)
+    loans = grid(df["loan amount"].to_numpy(dtype=float, na_value=0.0))
+    # Calculate approximate yearly debt payments based on DTI * Income
+    # Assuming DTI is monthly, so we infer some yearly cost
+    if "debt-to-income ratio" in df.columns:
+        estimated_costs = float((df["debt-to-income ratio"].to_numpy(dtype=float, na_value=0.0) * income).sum())
+    else:
+        estimated_costs = 0
+
+    revenue_by_employment = dict(sorted(zip(employment_labels, revenue[:-1].sum(axis=1))))
+    loans_by_purpose = dict(sorted(zip(purpose_labels, loans[:, :-1].sum(axis=0))))
+    return revenue.sum(), revenue_by_employment, loans.sum(), loans_by_purpose, estimated_costs
+
+def find_ledger_columns(columns):
+    """Picks the (category, amount) columns of a row-per-transaction ledger, if any."""
+    cat_col = next((c for c in columns if matches(c, ["category", "type", "description", "item"])), None)
+    amt_col = next((c for c in columns if matches(c, ["amount", "value", "cost", "price", "total"])), None)
+    return cat_col, amt_col
+
+def find_date_column(columns, exclude=()) -> Optional[str]:
+    """The ledger's transaction date column, if any."""
+    return next((c for c in columns if c not in exclude and matches(c, ["date"])), None)
+
+def _month_numbers(dates: pd.Series) -> np.ndarray:
+    """Months since year 0 (year * 12 + month - 1) per row, NaN where the date does not parse."""
+    # Ledgers repeat dates heavily: parse each distinct value once
+    codes, uniques = pd.factorize(dates, use_na_sentinel=False)
+    parsed = pd.to_datetime(pd.Index(uniques, dtype=object), errors="coerce")
+    months = (parsed.year * 12 + parsed.month - 1).to_numpy(dtype=float, na_value=np.nan)
+    return months[codes]
+
+def month_label(number: int) -> str:
+    return f"{number // 12:04d}-{number % 12 + 1:02d}"
+
+def period_totals(categories: pd.Series, amounts: pd.Series, dates: pd.Series) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Period cube of a (category, amount, date) ledger: {bucket key: {category: {"YYYY-MM": total}}},
+    with rows assigned to buckets exactly as aggregate_ledger does. One bincount per
+    bucket over (category, month) cells; rows with an unparseable date are left out.
+    """
+    codes, labels, masks = classify_categories(categories)
+    values, valid = coerce_amounts(amounts)
+    months = _month_numbers(dates)
+    valid = valid & ~np.isnan(months)
+    month_codes, month_numbers = pd.factorize(months[valid])
+    row_codes = codes[valid]
+    cells = row_codes * len(month_numbers) + month_codes
+    size = len(labels) * len(month_numbers)
+
+    cube = {}
+    bucket_keys = [("revenue", "revenue_streams"), ("expenses", "cost_structure")] + list(DETAIL_BUCKETS.items())
+    for bucket, key in bucket_keys:
+        mask = masks[bucket][valid] & ~np.isnan(values[valid])
+        if not mask.any():
+            continue
+        counts = np.bincount(cells[mask], minlength=size)
+        totals = np.bincount(cells[mask], weights=values[valid][mask], minlength=size)
+        out = cube[key] = {}
+        for cell in np.flatnonzero(counts):
+            category, month = divmod(int(cell), len(month_numbers))
+            out.setdefault(labels[category], {})[month_label(int(month_numbers[month]))] = float(totals[cell])
+    return cube
+
+def merge_periods(into: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+    """Adds one period cube into another (in place) and returns it."""
+    for key, categories in other.items():
+        bucket = into.setdefault(key, {})
+        for category, months in categories.items():
+            cells = bucket.setdefault(category, {})
+            for month, total in months.items():
+                cells[month] = cells.get(month, 0.0) + total
+    return into
+
+def compact_periods(cube: Dict[str, Any], max_categories: int = PERIOD_MAX_CATEGORIES) -> Dict[str, Any]:
+    """
+    Folds the smallest categories of each bucket (by absolute total) into "Other" so
+    a cube keyed on e.g. free-text descriptions stays small. Bucket totals are unchanged.
+    """
+    for key, categories in cube.items():
+        if len(categories) <= max_categories:
+            continue
+        other = categories.pop(PERIOD_OTHER, {})
+        ranked = sorted(categories, key=lambda c: -abs(sum(categories[c].values())))
+        for category in ranked[max_categories - 1:]:
+            for month, total in categories.pop(category, {}).items():
+                other[month] = other.get(month, 0.0) + total
+        categories[PERIOD_OTHER] = other
+    return cube
+
+def empty_metrics() -> Dict[str, Any]:
+    return {
+        "revenue_streams": {"total": 0, "categories": {}},
+        "cost_structure": {"total": 0, "categories": {}},
+        "net_profit": 0,
+        "accounts_receivable": {"total": 0, "details": []},
+        "accounts_payable": {"total": 0, "details": []},
+        "inventory_levels": {"total": 0, "details": []},
+        "loan_obligations": {"total": 0, "details": []},
+        "tax_compliance": {"total": 0, "details": []}
+    }
+
+def finalize_metrics(metrics: Dict[str, Any], industry: str) -> Dict[str, Any]:
+    metrics["industry"] = industry
+    metrics["net_profit"] = metrics["revenue_streams"]["total"] - metrics["cost_structure"]["total"]
+    return metrics
+
+def add_column_total(metrics: Dict[str, Any], col: str, col_total) -> None:
+    """Folds one non-zero column total into the buckets its header matches (column-header layout)."""
+    # numpy scalar -> Python number, so the metrics stay JSON-serialisable
+    col_total = col_total.item() if hasattr(col_total, "item") else col_total
+    labels = classify_label(col)
+    if labels["revenue"]:
+        metrics["revenue_streams"]["total"] += col_total
+        metrics["revenue_streams"]["categories"][col] = col_total
+    elif labels["expenses"]:
+        metrics["cost_structure"]["total"] += col_total
+        metrics["cost_structure"]["categories"][col] = col_total
+    
+    for bucket, key in DETAIL_BUCKETS.items():
+        if labels[bucket]:
+            metrics[key]["total"] += col_total
+
+def build_risk_metrics(total_revenue, revenue_by_employment, total_loans, loans_by_purpose, estimated_costs) -> Dict[str, Any]:
+    """Shapes the risk-assessment dataset aggregates into the standard metrics dict."""
+    return {
+        "revenue_streams": {
+            "total": float(total_revenue),
+            "categories": {k: float(v) for k, v in revenue_by_employment.items()},
+            "growth": 0.0
+        },
+        "cost_structure": {
+            "total": float(estimated_costs),
+            "categories": {"Estimated Debt Service": float(estimated_costs)},
+        },
+        "net_profit": float(total_revenue - estimated_costs),
+        "accounts_receivable": {"total": 0.0, "details": []},
+        "accounts_payable": {"total": 0.0, "details": []},
+        "inventory_levels": {"total": 0.0, "details": []},
+        "loan_obligations": {
+            "total": float(total_loans),
+            "details": [{"item": k, "amount": float(v)} for k, v in loans_by_purpose.items()]
+        },
+        "tax_compliance": {"total": 0.0, "details": []},
+        "raw_text": "Processed Financial Risk Assessment Dataset",
+        # We can smuggle the risk profile into recommendations or a separate field if needed,
+        # but for now let's just ensure the base keys work.
+        # The AI advisor might overwrite risk_assessment, so we rely on standard metrics.
+    }
+
+def _csv_header(content: bytes) -> List[str]:
+    first_line = content[:content.find(b"\n") if b"\n" in content else len(content)]
+    return next(csv.reader([first_line.decode("utf-8-sig", errors="replace")]), [])
+
+def _arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Dictionary-encodes the categorical risk columns, then converts (zero-copy where the layout allows)."""
+    for i, name in enumerate(table.column_names):
+        if is_risk_label(name) and pa.types.is_string(table.schema.field(i).type):
+            table = table.set_column(i, name, pc.dictionary_encode(table.column(i)))
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+def _read_risk_csv(content: bytes, columns: List[str]) -> pd.DataFrame:
+    """
+    Arrow CSV reader loading only `columns`: amounts as float64, labels as dictionaries.
+    Read block by block, so only the projected columns are ever materialized.
+    """
+    column_types = {}
+    for c in columns:
+        column_types[c] = pa.dictionary(pa.int32(), pa.string()) if is_risk_label(c) else pa.float64()
+    options = pa_csv.ConvertOptions(include_columns=columns, column_types=column_types, strings_can_be_null=True)
+    reader = pa_csv.open_csv(pa.BufferReader(content), convert_options=options, read_options=pa_csv.ReadOptions(block_size=RISK_CSV_BLOCK_SIZE))
+    return pa.Table.from_batches(list(reader), schema=reader.schema).to_pandas(split_blocks=True, self_destruct=True)
+
+def _read_arrow_file(content: bytes, filename: str) -> pd.DataFrame:
+    """Parquet/Feather from the upload's buffer without copying it; risk datasets are projected."""
+    if filename.endswith('.parquet'):
+        columns = risk_projection(parquet.read_schema(pa.BufferReader(content)).names)
+        table = parquet.read_table(pa.BufferReader(content), columns=columns)
+    else:
+        columns = risk_projection(pa.ipc.open_file(pa.BufferReader(content)).schema.names)
+        table = feather.read_table(pa.BufferReader(content), columns=columns, memory_map=False)
+    return _arrow_to_pandas(table)
 
 def parse_file(content: bytes, filename: str) -> pd.DataFrame:
     try:
         if filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
+            # Risk-assessment files only need a few columns: read those through Arrow
+            risk_columns = csv_risk_projection(content)
+            df = _read_risk_csv(content, risk_columns) if risk_columns else pd.read_csv(io.BytesIO(content))
+        elif filename.endswith('.parquet') or filename.endswith('.feather'):
+            df = _read_arrow_file(content, filename)
         elif filename.endswith('.xlsx') or filename.endswith('.xls'):
             df = pd.read_excel(io.BytesIO(content))
         elif filename.endswith('.pdf'):
-            reader = PdfReader(io.BytesIO(content))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            
-            # Simple heuristic: Look for lines with Text followed by Number
-            # This is a basic implementation. For complex PDFs, we'd need Tabula or Azure Form Recognizer.
-            data = []
-            for line in text.split('\n'):
-                # Regex to find "Item Name .... 1234.56"
-                match = re.search(r'([a-zA-Z\s]+)[\s:$\-]+([\d,]+\.?\d*)', line)
-                if match:
-                    item, amount_str = match.groups()
-                    try:
-                        amount = float(amount_str.replace(',', ''))
-                        data.append({"Description": item.strip(), "Amount": amount})
-                    except:
-                        pass
-            
-            if not data:
-                # Fallback: Create empty DF if no structured data found
-                df = pd.DataFrame(columns=["Description", "Amount"])
-            else:
-                df = pd.DataFrame(data)
+            # Pages are extracted (in parallel for large documents) and streamed as rows;
+            # the DataFrame is built once at the end. Empty if no structured data was found.
+            stats = {}
+            df = pd.DataFrame(pdf_parser.iter_pdf_rows(content, stats=stats), columns=["Description", "Amount"])
+            if stats.get("truncated"):
+                print(f"PDF extraction truncated for {filename}: parsed {stats['pages_parsed']} of {stats['pages_total']} pages.")
                 
         else:
-            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload CSV, Excel, or PDF.")
+            raise HTTPException(status_code=400, detail="Unsupported file format. Please upload CSV, Excel, PDF, Parquet or Feather.")
         
         df = df.dropna(how='all')
         return df
@@ -59,118 +468,20 @@ def extract_financial_metrics(df: pd.DataFrame) -> Dict[str, Any]:
     df.columns = [str(c).lower().strip() for c in df.columns]
     
     # 3. Check for Financial Risk Assessment Dataset (Row-per-applicant)
-    if "loan amount" in df.columns and "income" in df.columns and "risk rating" in df.columns:
+    if is_risk_dataset(df.columns):
         # This is the risk assessment dataset
-        total_revenue = df["income"].sum()
-        revenue_by_employment = df.groupby("employment status")["income"].sum().to_dict() if "employment status" in df.columns else {}
-        
-        total_loans = df["loan amount"].sum()
-        loans_by_purpose = df.groupby("loan purpose")["loan amount"].sum().to_dict() if "loan purpose" in df.columns else {}
-        
-        avg_credit_score = df["credit score"].mean() if "credit score" in df.columns else 0
-        
-        # Calculate approximate yearly debt payments based on DTI * Income
-        # Assuming DTI is monthly, so we infer some yearly cost
-        if "debt-to-income ratio" in df.columns:
-            estimated_costs = (df["debt-to-income ratio"] * df["income"]).sum()
-        else:
-            estimated_costs = 0
-            
-        risk_counts = df["risk rating"].value_counts().to_dict()
-        majority_risk = df["risk rating"].mode()[0] if not df["risk rating"].empty else "Unknown"
-
-        return {
-            "revenue_streams": {
-                "total": float(total_revenue),
-                "categories": {k: float(v) for k, v in revenue_by_employment.items()},
-                "growth": 0.0
-            },
-            "cost_structure": {
-                "total": float(estimated_costs),
-                "categories": {"Estimated Debt Service": float(estimated_costs)},
-            },
-            "net_profit": float(total_revenue - estimated_costs),
-            "accounts_receivable": {"total": 0.0, "details": []},
-            "accounts_payable": {"total": 0.0, "details": []},
-            "inventory_levels": {"total": 0.0, "details": []},
-            "loan_obligations": {
-                "total": float(total_loans),
-                "details": [{"item": k, "amount": float(v)} for k, v in loans_by_purpose.items()]
-            },
-            "tax_compliance": {"total": 0.0, "details": []},
-            "raw_text": "Processed Financial Risk Assessment Dataset",
-            # We can smuggle the risk profile into recommendations or a separate field if needed,
-            # but for now let's just ensure the base keys work.
-            # The AI advisor might overwrite risk_assessment, so we rely on standard metrics.
-        }
+        return build_risk_metrics(*risk_aggregates(df))
 
     # If not a risk assessment dataset, proceed with general financial metrics extraction
     # Initialize metric containers
-    metrics = {
-        "revenue_streams": {"total": 0, "categories": {}},
-        "cost_structure": {"total": 0, "categories": {}},
-        "net_profit": 0,
-        "accounts_receivable": {"total": 0, "details": []},
-        "accounts_payable": {"total": 0, "details": []},
-        "inventory_levels": {"total": 0, "details": []},
-        "loan_obligations": {"total": 0, "details": []},
-        "tax_compliance": {"total": 0, "details": []}
-    }
-    
-    # Helper to check if row/col matches keywords
-    def matches(text, keywords):
-        if not isinstance(text, str): return False
-        text = text.lower()
-        return any(k in text for k in keywords)
-
-    # Keywords configuration
-    keywords = {
-        "revenue": ["revenue", "sales", "income", "receipts"],
-        "expenses": ["expense", "cost", "salary", "rent", "utilities", "marketing"],
-        "receivable": ["receivable", "due from", "invoice out"],
-        "payable": ["payable", "due to", "invoice in", "bill"],
-        "inventory": ["inventory", "stock", "goods"],
-        "loans": ["loan", "interest", "credit", "debt", "principal", "emi"],
-        "tax": ["tax", "gst", "vat", "deduction", "duty"]
-    }
+    metrics = empty_metrics()
     
     # 1. Column-based Approach (if data is pivoted, e.g. columns = [Date, Type, Amount])
     # Identify relevant columns
-    cat_col = next((c for c in df.columns if matches(c, ["category", "type", "description", "item"])), None)
-    amt_col = next((c for c in df.columns if matches(c, ["amount", "value", "cost", "price", "total"])), None)
+    cat_col, amt_col = find_ledger_columns(df.columns)
     
     if cat_col and amt_col:
-        # Row-wise iteration
-        for _, row in df.iterrows():
-            category = str(row[cat_col])
-            try:
-                amount = float(row[amt_col])
-            except:
-                continue
-                
-            if is_revenue := matches(category, keywords["revenue"]):
-                metrics["revenue_streams"]["total"] += amount
-                metrics["revenue_streams"]["categories"][category] = amount
-            elif is_expense := matches(category, keywords["expenses"]):
-                metrics["cost_structure"]["total"] += amount
-                metrics["cost_structure"]["categories"][category] = amount
-            
-            # Specific dimension checks
-            if matches(category, keywords["receivable"]):
-                metrics["accounts_receivable"]["total"] += amount
-                metrics["accounts_receivable"]["details"].append({"item": category, "amount": amount})
-            if matches(category, keywords["payable"]):
-                metrics["accounts_payable"]["total"] += amount
-                metrics["accounts_payable"]["details"].append({"item": category, "amount": amount})
-            if matches(category, keywords["inventory"]):
-                metrics["inventory_levels"]["total"] += amount
-                metrics["inventory_levels"]["details"].append({"item": category, "amount": amount})
-            if matches(category, keywords["loans"]):
-                metrics["loan_obligations"]["total"] += amount
-                metrics["loan_obligations"]["details"].append({"item": category, "amount": amount})
-            if matches(category, keywords["tax"]):
-                metrics["tax_compliance"]["total"] += amount
-                metrics["tax_compliance"]["details"].append({"item": category, "amount": amount})
+        aggregate_ledger(df[cat_col], df[amt_col], metrics)
 
     else:
         # Fallback: Column-header Approach (e.g. columns = [Sales, Rent, Taxes])
@@ -182,45 +493,8 @@ def extract_financial_metrics(df: pd.DataFrame) -> Dict[str, Any]:
             
             if col_total == 0: continue
 
-            if matches(col, keywords["revenue"]):
-                metrics["revenue_streams"]["total"] += col_total
-                metrics["revenue_streams"]["categories"][col] = col_total
-            elif matches(col, keywords["expenses"]):
-                metrics["cost_structure"]["total"] += col_total
-                metrics["cost_structure"]["categories"][col] = col_total
-            
-            if matches(col, keywords["receivable"]):
-                metrics["accounts_receivable"]["total"] += col_total
-            if matches(col, keywords["payable"]):
-                metrics["accounts_payable"]["total"] += col_total
-            if matches(col, keywords["inventory"]):
-                metrics["inventory_levels"]["total"] += col_total
-            if matches(col, keywords["loans"]):
-                metrics["loan_obligations"]["total"] += col_total
-            if matches(col, keywords["tax"]):
-                metrics["tax_compliance"]["total"] += col_total
-
-    # Industry Determination Logic
-    def determine_industry(df_local, text_content=""):
-        combo_text = (text_content + " " + " ".join(df_local.columns.astype(str)) + " " + " ".join(df_local.astype(str).values.flatten())).lower()
-        
-        if any(x in combo_text for x in ["crop", "farm", "seed", "harvest", "agriculture"]):
-            return "Agriculture"
-        if any(x in combo_text for x in ["manufacturing", "factory", "plant", "raw material", "production"]):
-            return "Manufacturing"
-        if any(x in combo_text for x in ["shipping", "freight", "logistics", "transport", "delivery"]):
-            return "Logistics"
-        if any(x in combo_text for x in ["shopify", "stripe", "ecommerce", "online store", "cart"]):
-            return "E-commerce"
-        if any(x in combo_text for x in ["retail", "store", "shop", "inventory", "stock"]):
-            return "Retail"
-        if any(x in combo_text for x in ["consulting", "service", "subscription", "agency", "software"]):
-            return "Services"
-        
-        return "General"
+            add_column_total(metrics, col, col_total)
 
-    industry = determine_industry(df)
-    metrics["industry"] = industry
-    metrics["net_profit"] = metrics["revenue_streams"]["total"] - metrics["cost_structure"]["total"]
-    
-    return metrics
+    with telemetry.stage("industry"):
+        industry = determine_industry(df)
+    return finalize_metrics(metrics, industry)
@@ -0,0 +1,134 @@
+import io
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+# Regex to find "Item Name .... 1234.56"
+LINE_PATTERN = re.compile(r'([a-zA-Z\s]+)[\s:$\-]+([\d,]+\.?\d*)')
+
+# Worker processes used for page extraction (0 = extract in-process)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Documents with at most this many pages are not worth the process round-trip
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+# Pages handed to a worker per task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+# Per-document caps so one pathological PDF cannot stall the server (0 = unlimited)
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "0"))
+PDF_TIME_BUDGET = float(os.getenv("PDF_TIME_BUDGET", "0"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return _pool
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def parse_lines(text: str) -> List[Dict[str, Any]]:
+    """
+    Simple heuristic: Look for lines with Text followed by Number
+    This is a basic implementation. For complex PDFs, we'd need Tabula or Azure Form Recognizer.
+    """
+    rows = []
+    for line in text.split('\n'):
+        match = LINE_PATTERN.search(line)
+        if match:
+            item, amount_str = match.groups()
+            try:
+                amount = float(amount_str.replace(',', ''))
+                rows.append({"Description": item.strip(), "Amount": amount})
+            except:
+                pass
+    return rows
+
+def _extract_pages(content: bytes, start: int, stop: int) -> List[List[Dict[str, Any]]]:
+    """Runs in a worker: returns the parsed rows of pages [start, stop), one list per page."""
+    reader = PdfReader(io.BytesIO(content))
+    return [parse_lines(reader.pages[i].extract_text()) for i in range(start, stop)]
+
+def iter_pdf_rows(
+    content: bytes,
+    max_pages: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields Description/Amount rows page by page, in page order.
+
+    Documents over PDF_PARALLEL_MIN_PAGES pages are split into ranges of
+    PDF_PAGES_PER_TASK pages across worker processes; smaller ones are extracted
+    in-process. Extraction stops early once `max_pages` pages are read or `time_budget`
+    seconds have elapsed (defaults: PDF_MAX_PAGES / PDF_TIME_BUDGET, 0 meaning unlimited).
+    In-process the budget is checked between pages. A large document with a budget
+    gets its own short-lived workers, terminated when it runs out of time, so pages
+    still being extracted stop too without touching other documents' work.
+    If `stats` is given it is filled with pages_total, pages_parsed and truncated.
+    """
+    max_pages = PDF_MAX_PAGES if max_pages is None else max_pages
+    time_budget = PDF_TIME_BUDGET if time_budget is None else time_budget
+    deadline = time.monotonic() + time_budget if time_budget else None
+
+    reader = PdfReader(io.BytesIO(content))
+    pages_total = len(reader.pages)
+    page_limit = min(pages_total, max_pages) if max_pages else pages_total
+    stats = stats if stats is not None else {}
+    stats.update({"pages_total": pages_total, "pages_parsed": 0, "truncated": page_limit < pages_total})
+
+    if PDF_WORKERS <= 0 or page_limit <= PDF_PARALLEL_MIN_PAGES:
+        for i in range(page_limit):
+            if deadline is not None and time.monotonic() >= deadline:
+                stats["truncated"] = True
+                return
+            yield from parse_lines(reader.pages[i].extract_text())
+            stats["pages_parsed"] += 1
+        return
+
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_limit)) for start in range(0, page_limit, PDF_PAGES_PER_TASK)]
+    batches = _shared_pages(content, ranges) if deadline is None else _isolated_pages(content, ranges, deadline, stats)
+    for pages in batches:
+        for rows in pages:
+            yield from rows
+            stats["pages_parsed"] += 1
+
+def _shared_pages(content: bytes, ranges: List[Tuple[int, int]]) -> Iterator[List[List[Dict[str, Any]]]]:
+    """Extracts the ranges on the shared pool, yielding each range's pages in order."""
+    futures = [_get_pool().submit(_extract_pages, content, start, stop) for start, stop in ranges]
+    try:
+        for future in futures:
+            yield future.result()
+    finally:
+        # Ranges not yet started are dropped if the consumer went away
+        for future in futures:
+            future.cancel()
+
+def _isolated_pages(content: bytes, ranges: List[Tuple[int, int]], deadline: float, stats: Dict[str, Any]) -> Iterator[List[List[Dict[str, Any]]]]:
+    """
+    Like _shared_pages, on worker processes of this document's own. Stops at `deadline`
+    (marking stats truncated); the workers are terminated however the document ends.
+    """
+    pool = multiprocessing.Pool(min(PDF_WORKERS, len(ranges)))
+    try:
+        results = [pool.apply_async(_extract_pages, (content, start, stop)) for start, stop in ranges]
+        for result in results:
+            result.wait(max(deadline - time.monotonic(), 0))
+            if not result.ready():
+                stats["truncated"] = True
+                return
+            yield result.get()
+    finally:
+        pool.terminate()
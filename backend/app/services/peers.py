@@ -0,0 +1,149 @@
+import os
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..database import AsyncSessionLocal
+from ..models import FinancialReport, PeerSketch
+from .reports import scoring_metrics
+from .sketch import TDigest
+
+PEER_COMPRESSION = float(os.getenv("PEER_COMPRESSION", "100"))
+REBUILD_BATCH_SIZE = 1000
+
+# Ratios benchmarked against industry peers
+PEER_METRICS = ["net_profit_margin", "debt_to_revenue", "inventory_to_revenue", "credit_score"]
+
+# (industry, {metric: value}) for one report
+Observation = Tuple[str, Dict[str, float]]
+
+def report_ratios(metrics: Dict[str, Any], credit_score: Optional[int]) -> Dict[str, float]:
+    """Peer ratios for one report. Revenue-based ratios are skipped when there is no revenue."""
+    ratios = {}
+    revenue = metrics.get("revenue_streams", {}).get("total", 0) or 0
+    if revenue > 0:
+        ratios["net_profit_margin"] = float(metrics.get("net_profit", 0) or 0) / revenue
+        ratios["debt_to_revenue"] = float(metrics.get("loan_obligations", {}).get("total", 0) or 0) / revenue
+        ratios["inventory_to_revenue"] = float(metrics.get("inventory_levels", {}).get("total", 0) or 0) / revenue
+    if credit_score is not None:
+        ratios["credit_score"] = float(credit_score)
+    return ratios
+
+def observation(report: FinancialReport, metrics: Optional[Dict[str, Any]] = None) -> Observation:
+    """Builds a report's observation; metrics are decrypted from the report when not given."""
+    if metrics is None:
+        metrics = scoring_metrics(report)
+    return report.industry or "Unknown", report_ratios(metrics, report.credit_score_estimate)
+
+def _group(observations: Iterable[Observation]) -> Dict[Tuple[str, str], List[float]]:
+    grouped = defaultdict(list)
+    for industry, ratios in observations:
+        for metric, value in ratios.items():
+            grouped[(industry, metric)].append(value)
+    return grouped
+
+def record(db: Session, observations: List[Observation]) -> None:
+    """
+    Folds observations into the stored sketches (flushes, the caller commits).
+    Sketch rows are locked for the read-modify-write on databases that support it.
+    """
+    grouped = _group(observations)
+    if not grouped:
+        return
+    industries = {industry for industry, _ in grouped}
+    rows = db.execute(
+        select(PeerSketch).where(PeerSketch.industry.in_(industries)).with_for_update()
+    ).scalars().all()
+    existing = {(row.industry, row.metric): row for row in rows}
+    for (industry, metric), values in grouped.items():
+        row = existing.get((industry, metric))
+        digest = TDigest.from_dict(row.digest) if row else TDigest(PEER_COMPRESSION)
+        for value in values:
+            digest.add(value)
+        if row is None:
+            row = PeerSketch(industry=industry, metric=metric)
+            db.add(row)
+        row.digest = digest.to_dict()
+        row.count = int(digest.count)
+    db.flush()
+
+async def record_async(observations: List[Observation]) -> None:
+    """
+    Best-effort incremental update after a report is saved. Sketches can always be
+    rebuilt offline, so a failure here is logged rather than failing the upload.
+    Runs in its own session: rolling back must not expire the caller's saved report.
+    """
+    async with AsyncSessionLocal() as db:
+        for _ in range(2):
+            try:
+                await db.run_sync(record, observations)
+                await db.commit()
+                return
+            except IntegrityError:
+                # Another writer created the same sketch row first; retry as an update
+                await db.rollback()
+            except Exception as e:
+                await db.rollback()
+                print(f"Peer sketch update failed: {e}")
+                return
+    print("Peer sketch update failed: concurrent sketch creation")
+
+def rebuild(db: Session, batch_size: int = REBUILD_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Recomputes every sketch from the stored reports (keyset batches, decrypting only
+    the buckets the ratios need) and replaces the table contents in one transaction.
+    """
+    # The CLI may run against a database the API has not started on yet
+    PeerSketch.__table__.create(bind=db.get_bind(), checkfirst=True)
+    digests: Dict[Tuple[str, str], TDigest] = {}
+    scanned = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(FinancialReport)
+            .filter(FinancialReport.id > last_id)
+            .order_by(FinancialReport.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for key, values in _group(observation(report) for report in batch).items():
+            digest = digests.setdefault(key, TDigest(PEER_COMPRESSION))
+            for value in values:
+                digest.add(value)
+        db.expunge_all()
+        scanned += len(batch)
+
+    db.query(PeerSketch).delete()
+    for (industry, metric), digest in digests.items():
+        db.add(PeerSketch(industry=industry, metric=metric, digest=digest.to_dict(), count=int(digest.count)))
+    db.commit()
+    return {"scanned": scanned, "sketches": len(digests)}
+
+def _position(digest: TDigest, value: float) -> Dict[str, Any]:
+    return {
+        "value": value,
+        "percentile": round(digest.cdf(value) * 100, 1),
+        "peers": int(digest.count),
+        "p25": digest.quantile(0.25),
+        "median": digest.quantile(0.5),
+        "p75": digest.quantile(0.75),
+    }
+
+async def benchmark(db: AsyncSession, report: FinancialReport) -> Dict[str, Any]:
+    """Where the report sits among its industry's peers, per ratio, read from the sketches."""
+    industry, ratios = observation(report)
+    rows = (await db.execute(select(PeerSketch).where(PeerSketch.industry == industry))).scalars().all()
+    sketches = {row.metric: TDigest.from_dict(row.digest) for row in rows}
+    metrics = {}
+    for metric in PEER_METRICS:
+        digest = sketches.get(metric)
+        if metric in ratios and digest is not None and digest.count:
+            metrics[metric] = _position(digest, ratios[metric])
+    return {"report_id": report.id, "industry": industry, "metrics": metrics}
@@ -0,0 +1,142 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import FinancialReport
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Plain (unencrypted) columns returned by the listing; no decryption is needed
+LISTING_COLUMNS = [
+    FinancialReport.id,
+    FinancialReport.created_at,
+    FinancialReport.source_type,
+    FinancialReport.filename,
+    FinancialReport.industry,
+    FinancialReport.risk_assessment,
+    FinancialReport.credit_score_estimate,
+]
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(created_at: datetime, report_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), report_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, report_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(report_id)
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+def _naive_utc(value: datetime) -> datetime:
+    # created_at is stored as naive UTC (datetime.utcnow)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def apply_filters(
+    stmt,
+    user_id: Optional[int] = None,
+    industry: Optional[str] = None,
+    risk: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+):
+    """Adds the portfolio filters to a select; every filter is optional and they combine with AND."""
+    if user_id is not None:
+        stmt = stmt.where(FinancialReport.user_id == user_id)
+    if industry is not None:
+        stmt = stmt.where(FinancialReport.industry == industry)
+    if risk is not None:
+        stmt = stmt.where(FinancialReport.risk_assessment == risk)
+    if created_from is not None:
+        stmt = stmt.where(FinancialReport.created_at >= _naive_utc(created_from))
+    if created_to is not None:
+        stmt = stmt.where(FinancialReport.created_at < _naive_utc(created_to))
+    if min_score is not None:
+        stmt = stmt.where(FinancialReport.credit_score_estimate >= min_score)
+    if max_score is not None:
+        stmt = stmt.where(FinancialReport.credit_score_estimate <= max_score)
+    return stmt
+
+def listing_query(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, **filters):
+    """
+    Newest-first page of reports. Keyset pagination on (created_at, id): the cursor is
+    the last row of the previous page, so every page is an index range scan whatever
+    its depth. One extra row is fetched to tell whether another page follows.
+    """
+    stmt = apply_filters(select(*LISTING_COLUMNS), **filters)
+    if cursor:
+        created_at, report_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(FinancialReport.created_at, FinancialReport.id) < tuple_(created_at, report_id))
+    return stmt.order_by(FinancialReport.created_at.desc(), FinancialReport.id.desc()).limit(limit + 1)
+
+def summary_query(**filters):
+    """Counts and credit-score mean/min/max per (industry, risk tier), in one aggregate query."""
+    score = FinancialReport.credit_score_estimate
+    stmt = select(
+        FinancialReport.industry,
+        FinancialReport.risk_assessment,
+        func.count().label("count"),
+        func.avg(score).label("mean_score"),
+        func.min(score).label("min_score"),
+        func.max(score).label("max_score"),
+        # For the portfolio-wide mean; not returned per group
+        func.count(score).label("scored"),
+        func.sum(score).label("score_sum"),
+    )
+    stmt = apply_filters(stmt, **filters)
+    return stmt.group_by(FinancialReport.industry, FinancialReport.risk_assessment).order_by(
+        FinancialReport.industry, FinancialReport.risk_assessment
+    )
+
+def build_page(rows, limit: int) -> Dict[str, Any]:
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"items": items, "next_cursor": next_cursor}
+
+def build_summary(rows) -> Dict[str, Any]:
+    """Shapes grouped rows into the response; the portfolio totals are rolled up from the groups."""
+    groups: List[Dict[str, Any]] = []
+    total = scored = 0
+    score_sum = 0.0
+    low = high = None
+    for row in rows:
+        group = dict(row._mapping)
+        scored += group.pop("scored")
+        score_sum += float(group.pop("score_sum") or 0)
+        if group["mean_score"] is not None:
+            group["mean_score"] = round(float(group["mean_score"]), 2)
+            low = group["min_score"] if low is None else min(low, group["min_score"])
+            high = group["max_score"] if high is None else max(high, group["max_score"])
+        total += group["count"]
+        groups.append(group)
+    return {
+        "total": total,
+        "mean_score": round(score_sum / scored, 2) if scored else None,
+        "min_score": low,
+        "max_score": high,
+        "groups": groups,
+    }
+
+async def list_reports(db: AsyncSession, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, **filters) -> Dict[str, Any]:
+    rows = (await db.execute(listing_query(cursor, limit, **filters))).all()
+    return build_page(rows, limit)
+
+async def summarize(db: AsyncSession, **filters) -> Dict[str, Any]:
+    rows = (await db.execute(summary_query(**filters))).all()
+    return build_summary(rows)
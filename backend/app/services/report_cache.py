@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..models import FinancialReport
+from ..core import telemetry
+
+REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Bytes of serialized responses kept; least recently used entries are evicted beyond it
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Seconds an entry is served without checking the database. Writes in this process
+# invalidate immediately; this bounds staleness from writes made by other processes.
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "30"))
+
+_INVALIDATE_KEY = "report_cache_invalidate"
+
+def etag(report_id: int, version: int, fields: Optional[Tuple[str, ...]] = None) -> str:
+    """Strong ETag for one representation (full or a ?fields= projection) of a report version."""
+    tag = f"{report_id}-{version or 1}"
+    if fields:
+        tag += "-" + hashlib.sha256(",".join(fields).encode()).hexdigest()[:12]
+    return f'"{tag}"'
+
+def etag_matches(if_none_match: Optional[str], current: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return any(candidate.strip().removeprefix("W/") == current for candidate in if_none_match.split(","))
+
+class ReportCache:
+    """
+    Process-local LRU of serialized report responses, keyed by (report_id, fields).
+
+    Entries are bounded by their total size in bytes and by a TTL. Decrypted data
+    only ever lives in this dict: nothing is pickled, spooled or written to disk.
+    """
+
+    def __init__(self, max_bytes: int = REPORT_CACHE_MAX_BYTES, ttl: float = REPORT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (report_id, fields) -> (etag, body, stored_at)
+        self._by_report: Dict[int, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0, "evictions": 0, "invalidations": 0, "expired": 0}
+
+    def _drop(self, key) -> None:
+        _, body, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+        keys = self._by_report.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_report[key[0]]
+
+    def get(self, report_id: int, fields: Optional[Tuple[str, ...]] = None) -> Optional[Tuple[str, bytes]]:
+        """(etag, body) of a fresh entry, or None."""
+        key = (report_id, fields)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if self.ttl and time.monotonic() - entry[2] > self.ttl:
+                self._drop(key)
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0], entry[1]
+
+    def put(self, report_id: int, fields: Optional[Tuple[str, ...]], tag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        key = (report_id, fields)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (tag, body, time.monotonic())
+            self._by_report.setdefault(report_id, set()).add(key)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self._counters["not_modified"] += 1
+
+    def invalidate(self, report_ids: Iterable[int]) -> None:
+        with self._lock:
+            for report_id in report_ids:
+                for key in list(self._by_report.get(report_id, ())):
+                    self._drop(key)
+                    self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "items": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_report.clear()
+            self._bytes = 0
+
+_cache: Optional[ReportCache] = ReportCache() if REPORT_CACHE_ENABLED else None
+
+def get_report_cache() -> Optional[ReportCache]:
+    """The process-wide cache, or None when REPORT_CACHE_ENABLED is off."""
+    return _cache
+
+def invalidate(report_ids: Iterable[int]) -> None:
+    if _cache is not None:
+        _cache.invalidate(report_ids)
+
+@event.listens_for(Session, "before_flush")
+def _bump_versions(session, flush_context, instances) -> None:
+    """Every ORM update of a report bumps its version (and so its ETag)."""
+    for obj in session.dirty:
+        if isinstance(obj, FinancialReport) and session.is_modified(obj, include_collections=False):
+            obj.version = (obj.version or 1) + 1
+            session.info.setdefault(_INVALIDATE_KEY, set()).add(obj.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session) -> None:
+    # Only once committed: a read between the flush and the commit must not re-cache the old version for long
+    report_ids = session.info.pop(_INVALIDATE_KEY, None)
+    if report_ids:
+        invalidate(report_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session) -> None:
+    session.info.pop(_INVALIDATE_KEY, None)
+
+def _cache_samples():
+    """Report read cache counters for /metrics."""
+    if _cache is None:
+        return
+    stats = _cache.stats()
+    events = ["hits", "misses", "not_modified", "evictions", "invalidations", "expired"]
+    yield ("fhp_report_cache_events_total", "counter", "Report read cache lookups, 304s and evictions by event.",
+           [({"event": event}, stats[event]) for event in events])
+    yield ("fhp_report_cache_bytes", "gauge", "Bytes of serialized reports held by the read cache.", [({}, stats["bytes"])])
+
+telemetry.register_collector(_cache_samples)
@@ -0,0 +1,206 @@
+from typing import Dict, Any, Iterable, Optional
+
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models import FinancialReport
+from ..core import security, telemetry
+from . import ai_advisor, streaming, line_items, report_cache
+
+RESCORE_BATCH_SIZE = 1000
+
+# Buckets stored encrypted, in the envelope (or legacy per-bucket columns)
+SENSITIVE_FIELDS = [
+    "revenue_streams",
+    "cost_structure",
+    "accounts_receivable",
+    "accounts_payable",
+    "inventory_levels",
+    "loan_obligations",
+    "tax_compliance",
+    "recommendations",
+]
+
+# Envelope field holding the report's mergeable aggregates (never part of a response)
+AGGREGATES_FIELD = "aggregates"
+
+# Every field of the report response, in response order
+REPORT_FIELDS = [
+    "id", "source_type", "filename", "created_at", "industry", "risk_assessment", "credit_score_estimate",
+    "revenue_streams", "cost_structure", "key_metrics", "accounts_receivable", "accounts_payable",
+    "inventory_levels", "loan_obligations", "banking_data", "tax_compliance", "recommendations",
+]
+
+def _encrypt_sensitive(metrics: Dict[str, Any], analysis_result: Dict[str, Any], aggregates: Optional[Dict[str, Any]]) -> str:
+    sensitive = {name: metrics[name] for name in SENSITIVE_FIELDS if name != "recommendations"}
+    sensitive["recommendations"] = analysis_result["recommendations"]
+    if aggregates is not None:
+        sensitive[AGGREGATES_FIELD] = aggregates
+    with telemetry.stage("encrypt"):
+        return security.encrypt_envelope(sensitive)
+
+def build_report(metrics: Dict[str, Any], analysis_result: Dict[str, Any], filename: str, source_type: str = "file",
+                 aggregates: Optional[Dict[str, Any]] = None, items: Optional[Dict[str, Any]] = None) -> FinancialReport:
+    """
+    Create Report with Encrypted Data
+    All sensitive JSON buckets are serialized into one envelope and encrypted once
+    `aggregates` (streaming.MetricsAccumulator.state()) rides in the same envelope and
+    makes the report extendable with apply_rows(). `metrics` should have its line
+    items split off (line_items.split); `items` are stored as blocks with the report.
+    """
+    report = FinancialReport(
+        user_id=1, # Hardcoded for prototyping
+        source_type=source_type,
+        filename=filename,
+
+        # Encrypt sensitive JSON data
+        sensitive_data=_encrypt_sensitive(metrics, analysis_result, aggregates),
+        key_metrics=metrics["net_profit"], # This one is just a float/simple dict, keeping it open for quick querying or encrypt if needed
+
+        industry=metrics.get("industry", "Unknown"),
+
+        risk_assessment=analysis_result["risk_assessment"], # Open for querying
+        credit_score_estimate=analysis_result["credit_score_estimate"],
+    )
+    if items:
+        with telemetry.stage("encrypt"):
+            report.line_items = line_items.blocks(items)
+    return report
+
+def load_aggregates(report: FinancialReport) -> Optional[Dict[str, Any]]:
+    """The report's stored mergeable aggregates, or None if it was saved without them."""
+    if not report.sensitive_data:
+        return None
+    return security.open_envelope(report.sensitive_data).get(AGGREGATES_FIELD)
+
+async def apply_rows(db: AsyncSession, report: FinancialReport, df: pd.DataFrame, language: str = "en") -> Dict[str, Any]:
+    """
+    Folds new rows into a report in place: their aggregates are merged into the
+    stored ones (work proportional to the new rows only), the metrics rebuilt and
+    the advisor re-run. Ledger line items are appended after the stored ones; the
+    other layouts recompute their (few, aggregated) items. Returns the advisor
+    result; the caller commits.
+    Raises ValueError if the report has no stored aggregates or the layouts differ.
+    """
+    state = load_aggregates(report)
+    if state is None:
+        raise ValueError("Report has no stored aggregates; upload the full file again to enable row updates")
+    with telemetry.stage("merge"):
+        # Reports stored before line items moved out still carry them inline
+        buckets, inline_items = line_items.split(load_sensitive(report))
+        accumulator = streaming.MetricsAccumulator.from_state(state, buckets)
+        new_rows = streaming.MetricsAccumulator().update(df)
+        accumulator.merge(new_rows)
+        metrics = accumulator.result()
+        if accumulator.mode == "ledger":
+            new_items = {key: new_rows.metrics[key]["details"] for key in line_items.ITEM_BUCKETS}
+            for key in line_items.ITEM_BUCKETS:
+                metrics[key] = line_items.merge_summaries(buckets[key], line_items.summarize(new_rows.metrics[key]))
+    with telemetry.stage("encrypt"):
+        if accumulator.mode == "ledger":
+            await line_items.append(db, report.id, inline_items)
+            await line_items.append(db, report.id, new_items, start={key: buckets[key]["count"] for key in new_items})
+        else:
+            metrics, items = line_items.split(metrics)
+            await line_items.replace(db, report.id, items)
+    with telemetry.stage("advisor"):
+        analysis_result = await ai_advisor.analyze_financial_health_async(metrics, language)
+
+    report.sensitive_data = _encrypt_sensitive(metrics, analysis_result, accumulator.state())
+    report.key_metrics = metrics["net_profit"]
+    report.industry = metrics.get("industry", "Unknown")
+    report.risk_assessment = analysis_result["risk_assessment"]
+    report.credit_score_estimate = analysis_result["credit_score_estimate"]
+    return analysis_result
+
+def load_sensitive(report: FinancialReport, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Decrypts the requested sensitive buckets (all by default).
+    Envelope reports cost one decryption however many fields are read, and only the
+    requested fields are JSON-decoded; legacy reports decrypt only the requested columns.
+    """
+    fields = SENSITIVE_FIELDS if fields is None else [f for f in fields if f in SENSITIVE_FIELDS]
+    if not fields:
+        return {}
+    if report.sensitive_data:
+        envelope = security.open_envelope(report.sensitive_data)
+        return {name: envelope.get(name, {}) for name in fields}
+    return {name: security.decrypt_data(getattr(report, name)) for name in fields}
+
+def serialize_report(report: FinancialReport, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Decrypt fields for the response
+    We create a new dict or copy to avoid modifying the DB object in session
+    `fields` limits the response (and the decryption work) to a projection; id is always included.
+    """
+    wanted = REPORT_FIELDS if fields is None else ["id"] + [f for f in REPORT_FIELDS if f in fields and f != "id"]
+    with telemetry.stage("decrypt"):
+        sensitive = load_sensitive(report, wanted)
+    plain = {
+        "id": report.id,
+        "source_type": report.source_type,
+        "filename": report.filename,
+        "created_at": report.created_at,
+        "industry": report.industry,
+        "risk_assessment": report.risk_assessment,
+        "credit_score_estimate": report.credit_score_estimate,
+        "key_metrics": report.key_metrics if isinstance(report.key_metrics, dict) else {"net_profit": report.key_metrics}, # Handle legacy/types
+        "banking_data": report.banking_data,
+    }
+    return {name: sensitive[name] if name in sensitive else plain[name] for name in wanted}
+
+def scoring_metrics(report: FinancialReport) -> Dict[str, Any]:
+    """Rebuilds the subset of the metrics dict the rule-based scorer reads from a stored report."""
+    key_metrics = report.key_metrics
+    net_profit = key_metrics.get("net_profit", 0) if isinstance(key_metrics, dict) else (key_metrics or 0)
+    metrics = load_sensitive(report, ["revenue_streams", "inventory_levels", "loan_obligations", "tax_compliance"])
+    metrics["net_profit"] = net_profit
+    metrics["industry"] = report.industry
+    return metrics
+
+def advisor_metrics(report: FinancialReport) -> Dict[str, Any]:
+    """Rebuilds the full metrics dict the advisor was originally given from a stored report."""
+    metrics = load_sensitive(report, [f for f in SENSITIVE_FIELDS if f != "recommendations"])
+    key_metrics = report.key_metrics
+    metrics["net_profit"] = key_metrics.get("net_profit", 0) if isinstance(key_metrics, dict) else (key_metrics or 0)
+    metrics["industry"] = report.industry
+    return metrics
+
+def rescore_reports(db: Session, language: str = "en", batch_size: int = RESCORE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Re-scores every stored report with the current rule-based thresholds.
+    Reports are read in primary-key batches, scored with ai_advisor.score_batch and
+    written back with one bulk UPDATE per batch. Only risk_assessment and
+    credit_score_estimate change (and the version, which bulk updates do not bump).
+    """
+    scanned = changed = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.query(FinancialReport)
+            .filter(FinancialReport.id > last_id)
+            .order_by(FinancialReport.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        risks, scores = ai_advisor.score_batch([scoring_metrics(r) for r in batch], language)
+        updates = [
+            {"id": r.id, "risk_assessment": risk, "credit_score_estimate": score, "version": (r.version or 1) + 1}
+            for r, risk, score in zip(batch, risks, scores)
+            if (r.risk_assessment, r.credit_score_estimate) != (risk, score)
+        ]
+        if updates:
+            db.bulk_update_mappings(FinancialReport, updates)
+            db.commit()
+            report_cache.invalidate(u["id"] for u in updates)
+        # Drop the batch from the identity map so memory stays flat across batches
+        db.expunge_all()
+
+        scanned += len(batch)
+        changed += len(updates)
+    return {"scanned": scanned, "updated": changed}
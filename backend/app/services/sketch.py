@@ -0,0 +1,156 @@
+import math
+from typing import Dict, Any, List, Optional
+
+DEFAULT_COMPRESSION = 100
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) for streaming quantile estimates.
+
+    Values are buffered and periodically folded into at most ~compression centroids,
+    kept small in the tails (k1 scale function) so extreme percentiles stay accurate.
+    Digests built from disjoint data merge into a digest of the union, and serialize
+    to a small dict for storage.
+    """
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[tuple] = []
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        value = float(value)
+        if math.isnan(value) or math.isinf(value):
+            return
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        other._compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        means, weights = [], []
+        total = self.count
+        seen = 0.0  # weight left of the centroid being built
+        k_left = self._k(0.0)
+        mean, weight = points[0]
+        for value, w in points[1:]:
+            # Absorb the next point while the centroid spans at most one unit of k
+            if self._k(min((seen + weight + w) / total, 1.0)) - k_left <= 1:
+                weight += w
+                mean += (value - mean) * w / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                seen += weight
+                k_left = self._k(min(seen / total, 1.0))
+                mean, weight = value, w
+        means.append(mean)
+        weights.append(weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q in [0, 1] (None when empty)."""
+        self._compress()
+        if not self.count:
+            return None
+        if len(self.means) == 1 or q <= 0:
+            return self.min if q <= 0 else self.means[0] if q < 1 else self.max
+        if q >= 1:
+            return self.max
+        target = q * self.count
+        means, weights = self.means, self.weights
+        # Left tail: between min and the first centroid's center
+        if target < weights[0] / 2:
+            return self.min + (means[0] - self.min) * target / (weights[0] / 2)
+        cumulative = weights[0] / 2  # weight up to the current centroid's center
+        for i in range(len(means) - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if target <= cumulative + step:
+                return means[i] + (means[i + 1] - means[i]) * (target - cumulative) / step
+            cumulative += step
+        # Right tail
+        remaining = weights[-1] / 2
+        return means[-1] + (self.max - means[-1]) * min((target - cumulative) / remaining, 1.0)
+
+    def cdf(self, value: float) -> Optional[float]:
+        """
+        Estimated fraction of the data below `value`, counting values equal to it
+        as half below (mid-rank), so ties land in the middle of their block.
+        """
+        self._compress()
+        if not self.count:
+            return None
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+        means, weights = self.means, self.weights
+        below = equal = 0.0
+        last_below = next_above = None
+        for i, mean in enumerate(means):
+            if mean < value:
+                below += weights[i]
+                last_below = i
+            elif mean == value:
+                equal += weights[i]
+            elif next_above is None:
+                next_above = i
+        if equal:
+            return (below + equal / 2) / self.count
+        if last_below is None:
+            # Between min and the first centroid
+            span = means[0] - self.min
+            return ((value - self.min) / span * weights[0] / 2 if span > 0 else 0.0) / self.count
+        if next_above is None:
+            # Between the last centroid and max
+            span = self.max - means[-1]
+            tail = (value - means[-1]) / span * weights[-1] / 2 if span > 0 else weights[-1] / 2
+            return (below - weights[-1] / 2 + tail) / self.count
+        i, j = last_below, next_above
+        center = below - weights[i] / 2
+        fraction = (value - means[i]) / (means[j] - means[i])
+        return (center + fraction * (weights[i] + weights[j]) / 2) / self.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "means": self.means,
+            "weights": self.weights,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TDigest":
+        digest = cls(data.get("compression", DEFAULT_COMPRESSION))
+        digest.means = list(data.get("means", []))
+        digest.weights = list(data.get("weights", []))
+        digest.count = data.get("count", sum(digest.weights))
+        if digest.count:
+            digest.min = data["min"]
+            digest.max = data["max"]
+        return digest
@@ -0,0 +1,324 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+from fastapi import UploadFile
+
+from . import parser
+
+# Rows per pandas chunk. Peak memory is bounded by this, not by the upload size.
+CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "100000"))
+# Bytes copied per read when spooling the request body to disk
+SPOOL_BLOCK_BYTES = 1024 * 1024
+# Bump when MetricsAccumulator.state() changes shape; older stored state is rejected
+AGGREGATE_STATE_VERSION = 1
+
+async def read_upload(file: UploadFile) -> Tuple[bytes, str]:
+    """Reads an upload into memory block by block, returning it with its SHA-256 hex digest."""
+    hasher = hashlib.sha256()
+    blocks = []
+    while True:
+        block = await file.read(SPOOL_BLOCK_BYTES)
+        if not block:
+            break
+        hasher.update(block)
+        blocks.append(block)
+    return b"".join(blocks), hasher.hexdigest()
+
+async def spool_upload(file: UploadFile, directory: Optional[str] = None, hasher=None) -> str:
+    """
+    Copies an upload to a temporary file on disk block by block and returns its path.
+    If given, `hasher` (a hashlib object) is fed each block on the way.
+    The caller is responsible for removing the file.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await file.read(SPOOL_BLOCK_BYTES)
+                if not block:
+                    break
+                if hasher is not None:
+                    hasher.update(block)
+                out.write(block)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+class MetricsAccumulator:
+    """
+    Chunk-at-a-time equivalent of parser.extract_financial_metrics.
+
+    Each chunk is folded into per-bucket running state (totals, category maps,
+    details lists, per-group sums and industry keyword hits). Two accumulators fed
+    disjoint, consecutive slices of the same file can be merged, and result()
+    returns the same metrics dict extract_financial_metrics builds for the whole frame.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.mode = None  # "risk", "ledger" or "columns"
+        self.rows = 0
+        self.industries = set()
+
+        # Ledger / column-header layouts
+        self.metrics = parser.empty_metrics()
+        self.cat_col = None
+        self.amt_col = None
+        self.date_col = None
+        # Ledger period cube (parser.period_totals); None without a date column
+        self.periods = None
+        self.column_totals = {}
+        self.non_numeric = set()
+
+        # Risk-assessment layout
+        self.total_revenue = 0
+        self.revenue_by_employment = {}
+        self.total_loans = 0
+        self.loans_by_purpose = {}
+        self.estimated_costs = 0
+
+    def _bind(self, columns) -> None:
+        self.columns = list(columns)
+        if parser.is_risk_dataset(self.columns):
+            self.mode = "risk"
+            return
+        self.cat_col, self.amt_col = parser.find_ledger_columns(self.columns)
+        self.mode = "ledger" if self.cat_col and self.amt_col else "columns"
+        if self.mode == "ledger":
+            self.date_col = parser.find_date_column(self.columns, exclude=(self.cat_col, self.amt_col))
+            self.periods = {} if self.date_col else None
+        self.industries |= parser.industry_hits(pd.DataFrame(columns=self.columns))
+
+    def update(self, chunk: pd.DataFrame) -> "MetricsAccumulator":
+        chunk.columns = [str(c).lower().strip() for c in chunk.columns]
+        if self.columns is None:
+            self._bind(chunk.columns)
+        elif list(chunk.columns) != self.columns:
+            raise ValueError("Chunk columns do not match the first chunk")
+
+        chunk = chunk.dropna(how='all')
+        self.rows += len(chunk)
+
+        if self.mode == "risk":
+            self._update_risk(chunk)
+            return self
+
+        if self.mode == "ledger":
+            parser.aggregate_ledger(chunk[self.cat_col], chunk[self.amt_col], self.metrics)
+            if self.date_col:
+                parser.merge_periods(self.periods, parser.period_totals(chunk[self.cat_col], chunk[self.amt_col], chunk[self.date_col]))
+        else:
+            for col in chunk.columns:
+                if col in self.non_numeric:
+                    continue
+                if not pd.api.types.is_numeric_dtype(chunk[col]):
+                    # A single non-numeric chunk makes the whole column non-numeric
+                    self.non_numeric.add(col)
+                    self.column_totals.pop(col, None)
+                    continue
+                self.column_totals[col] = self.column_totals.get(col, 0) + chunk[col].sum()
+
+        self.industries |= parser.industry_hits(chunk, known=self.industries)
+        return self
+
+    def _update_risk(self, chunk: pd.DataFrame) -> None:
+        total_revenue, revenue_by_employment, total_loans, loans_by_purpose, estimated_costs = parser.risk_aggregates(chunk)
+        self.total_revenue += total_revenue
+        self.total_loans += total_loans
+        self.estimated_costs += estimated_costs
+        _add_group_sums(self.revenue_by_employment, revenue_by_employment)
+        _add_group_sums(self.loans_by_purpose, loans_by_purpose)
+
+    def merge(self, other: "MetricsAccumulator") -> "MetricsAccumulator":
+        """Folds `other`, which must cover rows after this accumulator's, into self."""
+        if other.columns is None:
+            return self
+        if self.columns is None:
+            self.__dict__.update(other.__dict__)
+            return self
+        # Risk aggregates only read the projected columns, so the rest of the header
+        # (loaded in full by streamed uploads stored before the projection) may differ
+        if other.mode != self.mode or (self.mode != "risk" and other.columns != self.columns):
+            raise ValueError("Cannot merge accumulators built from different layouts")
+
+        self.rows += other.rows
+        self.industries |= other.industries
+
+        self.total_revenue += other.total_revenue
+        self.total_loans += other.total_loans
+        self.estimated_costs += other.estimated_costs
+        _add_group_sums(self.revenue_by_employment, other.revenue_by_employment)
+        _add_group_sums(self.loans_by_purpose, other.loans_by_purpose)
+
+        for key in ("revenue_streams", "cost_structure"):
+            self.metrics[key]["total"] += other.metrics[key]["total"]
+            self.metrics[key]["categories"].update(other.metrics[key]["categories"])
+        for key in parser.DETAIL_BUCKETS.values():
+            self.metrics[key]["total"] += other.metrics[key]["total"]
+            self.metrics[key]["details"].extend(other.metrics[key]["details"])
+
+        if self.periods is not None and other.periods is not None:
+            parser.merge_periods(self.periods, other.periods)
+        else:
+            # A side without a cube (e.g. state stored before cubes existed) leaves no complete one
+            self.periods = None
+
+        self.non_numeric |= other.non_numeric
+        for col, total in other.column_totals.items():
+            self.column_totals[col] = self.column_totals.get(col, 0) + total
+        for col in self.non_numeric:
+            self.column_totals.pop(col, None)
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        if self.mode == "risk":
+            # groupby() sorts its keys, so keep the same order here
+            return parser.build_risk_metrics(
+                self.total_revenue,
+                dict(sorted(self.revenue_by_employment.items())),
+                self.total_loans,
+                dict(sorted(self.loans_by_purpose.items())),
+                self.estimated_costs,
+            )
+
+        # Copy the containers result() mutates so it can be called more than once
+        metrics = {key: dict(bucket) if isinstance(bucket, dict) else bucket for key, bucket in self.metrics.items()}
+        for key in ("revenue_streams", "cost_structure"):
+            metrics[key]["categories"] = dict(metrics[key]["categories"])
+        if self.mode == "columns":
+            for col in self.columns:
+                col_total = self.column_totals.get(col, 0)
+                if col_total == 0: continue
+                parser.add_column_total(metrics, col, col_total)
+
+        return parser.finalize_metrics(metrics, parser.resolve_industry(self.industries))
+
+    def state(self) -> Dict[str, Any]:
+        """
+        JSON-serialisable mergeable state, restored by from_state(). The ledger
+        buckets are left out: the report's stored buckets hold them.
+        """
+        state = {
+            "version": AGGREGATE_STATE_VERSION,
+            "mode": self.mode,
+            "columns": self.columns,
+            "rows": self.rows,
+            "industries": sorted(self.industries),
+        }
+        if self.mode == "risk":
+            state.update({
+                "total_revenue": float(self.total_revenue),
+                "revenue_by_employment": {k: float(v) for k, v in self.revenue_by_employment.items()},
+                "total_loans": float(self.total_loans),
+                "loans_by_purpose": {k: float(v) for k, v in self.loans_by_purpose.items()},
+                "estimated_costs": float(self.estimated_costs),
+            })
+        elif self.mode == "columns":
+            state["column_totals"] = {col: _plain(total) for col, total in self.column_totals.items()}
+            state["non_numeric"] = sorted(self.non_numeric)
+        elif self.periods is not None:
+            state["periods"] = parser.compact_periods(self.periods)
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], buckets: Dict[str, Any]) -> "MetricsAccumulator":
+        """Rebuilds an accumulator from state() and the report's stored buckets."""
+        if state.get("version") != AGGREGATE_STATE_VERSION:
+            raise ValueError("Stored aggregates were written by an incompatible version")
+        accumulator = cls()
+        accumulator._bind(state["columns"])
+        accumulator.rows = state["rows"]
+        accumulator.industries = set(state["industries"])
+        if accumulator.mode == "risk":
+            accumulator.total_revenue = state["total_revenue"]
+            accumulator.revenue_by_employment = dict(state["revenue_by_employment"])
+            accumulator.total_loans = state["total_loans"]
+            accumulator.loans_by_purpose = dict(state["loans_by_purpose"])
+            accumulator.estimated_costs = state["estimated_costs"]
+        elif accumulator.mode == "columns":
+            accumulator.column_totals = dict(state["column_totals"])
+            accumulator.non_numeric = set(state["non_numeric"])
+        else:
+            for key in ("revenue_streams", "cost_structure"):
+                accumulator.metrics[key] = buckets[key]
+            # Item buckets are stored as summaries with the items in their own table:
+            # only the total carries over, new rows' items start an empty list
+            for key in parser.DETAIL_BUCKETS.values():
+                accumulator.metrics[key] = {"total": buckets[key]["total"], "details": []}
+            accumulator.periods = state.get("periods")
+        return accumulator
+
+    @classmethod
+    def from_metrics(cls, df: pd.DataFrame, metrics: Dict[str, Any]) -> "MetricsAccumulator":
+        """
+        The accumulator update(df) would have built, for a frame already run through
+        parser.extract_financial_metrics (which returned `metrics`). Only the
+        column-header totals and a dated ledger's period cube need another
+        (vectorised) pass over the frame.
+        """
+        accumulator = cls()
+        accumulator._bind([str(c).lower().strip() for c in df.columns])
+        accumulator.rows = len(df)
+        industry = metrics.get("industry")
+        accumulator.industries = {industry} if industry in parser.INDUSTRY_KEYWORDS else set()
+        if accumulator.mode == "risk":
+            accumulator.total_revenue = metrics["revenue_streams"]["total"]
+            accumulator.revenue_by_employment = dict(metrics["revenue_streams"]["categories"])
+            accumulator.total_loans = metrics["loan_obligations"]["total"]
+            accumulator.loans_by_purpose = {d["item"]: d["amount"] for d in metrics["loan_obligations"]["details"]}
+            accumulator.estimated_costs = metrics["cost_structure"]["total"]
+        elif accumulator.mode == "columns":
+            for col, values in zip(accumulator.columns, (df.iloc[:, i] for i in range(df.shape[1]))):
+                if pd.api.types.is_numeric_dtype(values):
+                    accumulator.column_totals[col] = values.sum()
+                else:
+                    accumulator.non_numeric.add(col)
+        else:
+            for key in accumulator.metrics:
+                if isinstance(accumulator.metrics[key], dict):
+                    accumulator.metrics[key] = metrics[key]
+            if accumulator.date_col:
+                columns = df.set_axis(accumulator.columns, axis=1)
+                accumulator.periods = parser.period_totals(
+                    columns[accumulator.cat_col], columns[accumulator.amt_col], columns[accumulator.date_col]
+                )
+        return accumulator
+
+def _plain(value):
+    # numpy scalars -> Python numbers for JSON
+    return value.item() if hasattr(value, "item") else value
+
+def _add_group_sums(into: Dict[Any, Any], sums) -> None:
+    for key, value in sums.items():
+        into[key] = into[key] + value if key in into else value
+
+def accumulate_csv(path: str, chunk_rows: Optional[int] = None) -> MetricsAccumulator:
+    """
+    Reads a CSV from disk in fixed-size chunks into a MetricsAccumulator. Risk-assessment
+    files load the same projected columns, with the same types, as parser.parse_file.
+    """
+    accumulator = MetricsAccumulator()
+    with open(path, "rb") as f:
+        columns = parser.csv_risk_projection(f.readline())
+    options = {}
+    if columns:
+        options = {"usecols": columns, "dtype": {c: "category" if parser.is_risk_label(c) else "float64" for c in columns}}
+    with pd.read_csv(path, chunksize=chunk_rows or CHUNK_ROWS, **options) as reader:
+        for chunk in reader:
+            # usecols keeps the file's column order; parse_file's follows the projection
+            accumulator.update(chunk[columns] if columns else chunk)
+    if accumulator.columns is None:
+        raise ValueError("No columns to parse from file")
+    return accumulator
+
+def extract_metrics_from_csv(path: str, chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Reads a CSV from disk in fixed-size chunks and returns the same metrics dict
+    as parser.extract_financial_metrics(parser.parse_file(...)).
+    """
+    return accumulate_csv(path, chunk_rows).result()
@@ -0,0 +1,101 @@
+from typing import Dict, Any, List, Optional
+
+from . import parser
+
+# Cube buckets that can be charted, plus the derived net_profit (revenue - costs)
+TREND_BUCKETS = ["revenue_streams", "cost_structure", "net_profit"] + list(parser.DETAIL_BUCKETS.values())
+GRANULARITIES = ("month", "quarter")
+
+def _month_number(label: str) -> int:
+    year, month = label.split("-")
+    return int(year) * 12 + int(month) - 1
+
+def _monthly(cube: Dict[str, Any], bucket: str, category: Optional[str]) -> Dict[int, float]:
+    """Month number -> total of one bucket (optionally one category) of the cube."""
+    if bucket == "net_profit":
+        revenue = _monthly(cube, "revenue_streams", category)
+        for month, total in _monthly(cube, "cost_structure", category).items():
+            revenue[month] = revenue.get(month, 0.0) - total
+        return revenue
+    totals: Dict[int, float] = {}
+    for name, months in cube.get(bucket, {}).items():
+        if category is not None and name != category:
+            continue
+        for label, total in months.items():
+            month = _month_number(label)
+            totals[month] = totals.get(month, 0.0) + total
+    return totals
+
+def _growth(current: float, previous: Optional[float]) -> Optional[float]:
+    if not previous:
+        return None
+    return round((current - previous) / abs(previous) * 100, 2)
+
+def _seasonality(points: List[Dict[str, Any]], numbers: List[int], per_year: int) -> Dict[str, float]:
+    """
+    Mean total per month (or quarter) of the year over the overall mean, e.g. 1.25 for
+    a month 25% above average. Empty until the series spans a full year.
+    """
+    if len(points) < per_year:
+        return {}
+    overall = sum(p["total"] for p in points) / len(points)
+    if not overall:
+        return {}
+    by_slot: Dict[int, List[float]] = {}
+    for point, number in zip(points, numbers):
+        by_slot.setdefault(number % per_year, []).append(point["total"])
+    prefix = "M" if per_year == 12 else "Q"
+    return {f"{prefix}{slot + 1}": round(sum(v) / len(v) / overall, 4) for slot, v in sorted(by_slot.items())}
+
+def trends(cube: Dict[str, Any], bucket: str = "revenue_streams", granularity: str = "month",
+           category: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Slices a stored period cube (parser.period_totals) into a gap-free series with
+    period-over-period growth, seasonality indices and trailing-twelve-month figures.
+    Work is proportional to the cube (categories x months), never to the source rows.
+    """
+    monthly = _monthly(cube, bucket, category)
+    result = {
+        "bucket": bucket,
+        "granularity": granularity,
+        "category": category,
+        "categories": sorted(cube.get(bucket, {})) if bucket != "net_profit" else [],
+        "periods": [],
+        "seasonality": {},
+        "ttm": None,
+    }
+    if not monthly:
+        return result
+
+    first, last = min(monthly), max(monthly)
+    months = list(range(first, last + 1))
+    if granularity == "quarter":
+        numbers = sorted({m // 3 for m in months})
+        totals = {q: 0.0 for q in numbers}
+        for month in months:
+            totals[month // 3] += monthly.get(month, 0.0)
+        labels = [f"{q // 4:04d}-Q{q % 4 + 1}" for q in numbers]
+        per_year = 4
+    else:
+        numbers = months
+        totals = {m: monthly.get(m, 0.0) for m in months}
+        labels = [parser.month_label(m) for m in months]
+        per_year = 12
+
+    previous = None
+    for number, label in zip(numbers, labels):
+        total = round(totals[number], 2)
+        result["periods"].append({"period": label, "total": total, "growth": _growth(total, previous)})
+        previous = total
+    result["seasonality"] = _seasonality(result["periods"], numbers, per_year)
+
+    # Trailing twelve months ending with the last month in the data, and the twelve before
+    current = sum(monthly.get(m, 0.0) for m in range(last - 11, last + 1))
+    prior = sum(monthly.get(m, 0.0) for m in range(last - 23, last - 11)) if last - 12 >= first else None
+    result["ttm"] = {
+        "end": parser.month_label(last),
+        "total": round(current, 2),
+        "previous": round(prior, 2) if prior is not None else None,
+        "growth": _growth(current, prior),
+    }
+    return result
@@ -0,0 +1,70 @@
+"""
+Benchmark: incremental bank sync throughput against the deterministic mock providers.
+
+Runs banking.sync_account on a scratch database in four passes:
+  1. initial sync of --transactions transactions (cold, every page inserted)
+  2. immediate re-sync (cursor at the end: nothing fetched)
+  3. incremental sync after the provider's history grows by --growth transactions
+  4. full re-sync from the beginning (every row re-delivered and deduplicated)
+
+Usage (from backend/):
+    python -m benchmarks.bench_bank_sync --transactions 1000000
+"""
+import argparse
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.services import banking
+
+END_DATE = date(2025, 1, 31)
+
+
+def run(session_factory, label, provider, provider_name, account_id, page_size, full=False):
+    db = session_factory()
+    try:
+        start = time.perf_counter()
+        result = banking.sync_account(db, provider_name, account_id, full=full, page_size=page_size, provider=provider)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    rate = result["fetched"] / elapsed if elapsed else 0
+    print(
+        f"{label:<28} {elapsed:8.2f}s  fetched={result['fetched']:>9,} added={result['added']:>9,} "
+        f"pages={result['pages']:>4} stored={result['transaction_count']:>9,} ({rate:,.0f} tx/s)"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--transactions", type=int, default=1000000)
+    arg_parser.add_argument("--growth", type=int, default=10000, help="Transactions added before the incremental pass")
+    arg_parser.add_argument("--provider", choices=sorted(banking.PROVIDERS), default="plaid")
+    arg_parser.add_argument("--page-size", type=int, default=banking.BANK_SYNC_PAGE_SIZE)
+    arg_parser.add_argument("--seed", default="42")
+    arg_parser.add_argument("--database-url", default="sqlite:///bench_bank_sync.db", help="Scratch database (its tables are recreated)")
+    args = arg_parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    provider_cls = banking.PROVIDERS[args.provider]
+    account_id = "acc_bench"
+    print(f"provider={args.provider} transactions={args.transactions:,} page_size={args.page_size}")
+
+    provider = provider_cls(seed=args.seed, volume=args.transactions, end_date=END_DATE)
+    run(session_factory, "initial sync", provider, args.provider, account_id, args.page_size)
+    run(session_factory, "re-sync (no changes)", provider, args.provider, account_id, args.page_size)
+
+    grown = provider_cls(seed=args.seed, volume=args.transactions + args.growth, end_date=END_DATE, step_days=provider.step_days)
+    run(session_factory, f"incremental (+{args.growth:,})", grown, args.provider, account_id, args.page_size)
+    run(session_factory, "full re-sync (dedup)", grown, args.provider, account_id, args.page_size, full=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: cash-flow analytics latency on a multi-year transaction history.
+
+Syncs --years of mock transactions (--per-day a day) into one account on a scratch
+database, then times cashflow.compute in three passes:
+  1. cold (no cached months: every month aggregated from bank_transactions)
+  2. warm (nothing synced since: every month from the cache)
+  3. incremental (after a sync of --growth newer transactions: only the tail recomputed)
+
+Usage (from backend/):
+    python -m benchmarks.bench_cashflow --years 5
+"""
+import argparse
+import time
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import FinancialReport
+from app.services import banking, cashflow
+
+END_DATE = date(2025, 1, 31)
+
+
+def timed(session_factory, label, report_id, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            start = time.perf_counter()
+            result = cashflow.compute(db, report_id)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            db.close()
+    print(
+        f"{label:<28} {best * 1000:8.1f} ms  months={len(result['monthly']):>3} "
+        f"recomputed_from={result['recomputed_from']} runway_days={result['runway_days']}"
+    )
+
+
+def sync(session_factory, provider, report_id):
+    db = session_factory()
+    try:
+        banking.sync_account(db, provider.name, "acc_bench", report_id=report_id, provider=provider)
+    finally:
+        db.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--years", type=int, default=5)
+    arg_parser.add_argument("--per-day", type=int, default=4, help="Transactions per day")
+    arg_parser.add_argument("--growth", type=int, default=40, help="Transactions added before the incremental pass")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Runs per warm pass (best is reported)")
+    arg_parser.add_argument("--database-url", default="sqlite:///bench_cashflow.db", help="Scratch database (its tables are recreated)")
+    args = arg_parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+
+    db = session_factory()
+    report = FinancialReport(user_id=1, source_type="benchmark", filename="bench", industry="Retail")
+    db.add(report)
+    db.commit()
+    report_id = report.id
+    db.close()
+
+    days = args.years * 365
+    volume = days * args.per_day
+    provider = banking.MockPlaid(volume=volume, end_date=END_DATE, step_days=days / volume)
+    provider.span_days = days
+    sync(session_factory, provider, report_id)
+    print(f"years={args.years} transactions={volume:,}")
+
+    timed(session_factory, "cold (no cache)", report_id, 1)
+    timed(session_factory, "warm (cached)", report_id, args.repeat)
+
+    grown = banking.MockPlaid(volume=volume + args.growth, end_date=END_DATE, step_days=provider.step_days)
+    grown.span_days = days
+    sync(session_factory, grown, report_id)
+    timed(session_factory, f"incremental (+{args.growth})", report_id, 1)
+    timed(session_factory, "warm after incremental", report_id, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: industry detection on financial_risk_assessment.csv scaled up N times.
+
+Compares the previous full-table flatten (every cell stringified and joined into one
+lowercase string) with parser.determine_industry, reporting wall time and peak
+traced memory for each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_industry --scale 100
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.services import parser
+
+DATASET = os.path.join(os.path.dirname(__file__), "..", "..", "financial_risk_assessment.csv")
+
+
+def legacy_determine_industry(df_local, text_content=""):
+    cells = [str(v) for v in df_local.values.flatten()]
+    combo_text = (text_content + " " + " ".join(df_local.columns.astype(str)) + " " + " ".join(cells)).lower()
+    for industry, words in parser.INDUSTRY_KEYWORDS.items():
+        if any(x in combo_text for x in words):
+            return industry
+    return "General"
+
+
+def measure(func, df):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(df)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--scale", type=int, default=100, help="How many copies of the dataset to stack")
+    arg_parser.add_argument("--skip-legacy", action="store_true", help="Only time the current implementation")
+    args = arg_parser.parse_args()
+
+    base = pd.read_csv(DATASET)
+    df = pd.concat([base] * args.scale, ignore_index=True)
+    print(f"rows={len(df):,} cols={len(df.columns)} scale={args.scale}x")
+
+    # Current implementation first: at large scales the legacy run may exhaust memory
+    runs = [("single-pass matcher", parser.determine_industry)]
+    if not args.skip_legacy:
+        runs.append(("legacy flatten", legacy_determine_industry))
+
+    results = {}
+    for name, func in runs:
+        industry, elapsed, peak = measure(func, df)
+        results[name] = (elapsed, peak)
+        print(f"{name:<20} industry={industry:<12} time={elapsed:8.3f}s peak={peak / 2**20:9.1f} MiB")
+
+    if len(results) == 2:
+        (new_t, new_m), (old_t, old_m) = results.values()
+        print(f"speedup={old_t / new_t:.1f}x memory reduction={old_m / max(new_m, 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark: portfolio listing and summary queries on a seeded financial_reports table.
+
+Seeds N synthetic reports (deterministic for a given --seed) into a scratch database,
+then times the queries behind GET /api/v1/analysis/reports and /reports/summary:
+first page, a page deep in the table (keyset vs the equivalent OFFSET), filtered pages
+and the grouped summary. --explain prints each query plan, --without-indexes drops the
+composite indexes first for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_portfolio --rows 10000000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, select, func, text
+
+from app.database import Base
+from app.models import FinancialReport
+from app.services import parser, portfolio
+
+SEED_BATCH = 50000
+INDUSTRIES = list(parser.INDUSTRY_KEYWORDS) + ["General"]
+RISKS = ["Low", "Medium", "High"]
+EPOCH = datetime(2023, 1, 1)
+SPAN_SECONDS = 3 * 365 * 24 * 3600
+
+
+def seed(engine, rows, seed_value):
+    rng = random.Random(seed_value)
+    table = FinancialReport.__table__
+    with engine.begin() as conn:
+        for start in range(0, rows, SEED_BATCH):
+            batch = []
+            for _ in range(min(SEED_BATCH, rows - start)):
+                score = rng.randint(300, 850)
+                batch.append({
+                    "user_id": rng.randint(1, 1000),
+                    "created_at": EPOCH + timedelta(seconds=rng.randrange(SPAN_SECONDS)),
+                    "source_type": "file",
+                    "filename": "seed.csv",
+                    "industry": rng.choice(INDUSTRIES),
+                    "risk_assessment": "Low" if score >= 700 else "Medium" if score >= 550 else "High",
+                    "credit_score_estimate": score,
+                })
+            conn.execute(insert(table), batch)
+            print(f"\rseeded {start + len(batch):,}/{rows:,}", end="", flush=True)
+    print()
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    for row in conn.execute(text(prefix + str(compiled))):
+        print("      ", " | ".join(str(v) for v in row))
+
+
+def timed(conn, name, stmt, repeat, show_plan):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(stmt).all()
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<40} {best * 1000:10.2f} ms  rows={len(rows)}")
+    if show_plan:
+        explain(conn, stmt)
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--rows", type=int, default=1000000, help="Reports to seed")
+    arg_parser.add_argument("--seed", type=int, default=42)
+    arg_parser.add_argument("--database-url", default="sqlite:///bench_portfolio.db", help="Scratch database (its tables are recreated)")
+    arg_parser.add_argument("--reuse", action="store_true", help="Keep an already seeded database")
+    arg_parser.add_argument("--page-size", type=int, default=portfolio.DEFAULT_PAGE_SIZE)
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Runs per query; the best is reported")
+    arg_parser.add_argument("--explain", action="store_true", help="Print query plans")
+    arg_parser.add_argument("--without-indexes", action="store_true", help="Drop the composite indexes before timing")
+    args = arg_parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if not args.reuse:
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        start = time.perf_counter()
+        seed(engine, args.rows, args.seed)
+        print(f"seed time {time.perf_counter() - start:.1f}s")
+
+    with engine.connect() as conn:
+        for index in FinancialReport.__table__.indexes:
+            if args.without_indexes:
+                index.drop(bind=conn, checkfirst=True)
+            else:
+                index.create(bind=conn, checkfirst=True)
+        conn.commit()
+        if conn.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+        total = conn.execute(select(func.count()).select_from(FinancialReport)).scalar()
+        print(f"rows={total:,} page_size={args.page_size} indexes={'off' if args.without_indexes else 'on'}")
+        size = args.page_size
+
+        timed(conn, "first page", portfolio.listing_query(limit=size), args.repeat, args.explain)
+
+        # A cursor half-way through the newest-first order
+        middle = conn.execute(
+            select(FinancialReport.created_at, FinancialReport.id)
+            .order_by(FinancialReport.created_at.desc(), FinancialReport.id.desc())
+            .offset(total // 2).limit(1)
+        ).first()
+        cursor = portfolio.encode_cursor(middle.created_at, middle.id)
+        timed(conn, "middle page (keyset)", portfolio.listing_query(cursor, size), args.repeat, args.explain)
+        offset_stmt = select(*portfolio.LISTING_COLUMNS).order_by(
+            FinancialReport.created_at.desc(), FinancialReport.id.desc()
+        ).offset(total // 2).limit(size + 1)
+        timed(conn, "middle page (OFFSET, for comparison)", offset_stmt, args.repeat, args.explain)
+
+        timed(conn, "industry page", portfolio.listing_query(limit=size, industry=INDUSTRIES[0]), args.repeat, args.explain)
+        timed(conn, "industry page deep (keyset)", portfolio.listing_query(cursor, size, industry=INDUSTRIES[0]), args.repeat, args.explain)
+        timed(conn, "risk + score range page", portfolio.listing_query(limit=size, risk="High", min_score=400, max_score=450), args.repeat, args.explain)
+        timed(conn, "user + date range page", portfolio.listing_query(
+            limit=size, user_id=7, created_from=datetime(2024, 1, 1), created_to=datetime(2024, 7, 1)
+        ), args.repeat, args.explain)
+
+        timed(conn, "summary (all)", portfolio.summary_query(), args.repeat, args.explain)
+        timed(conn, "summary (industry)", portfolio.summary_query(industry=INDUSTRIES[0]), args.repeat, args.explain)
+        timed(conn, "summary (date range)", portfolio.summary_query(
+            created_from=datetime(2024, 1, 1), created_to=datetime(2024, 2, 1)
+        ), args.repeat, args.explain)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Micro-benchmark suite for the parsing, scoring and encryption hot paths.
+
+Times (median of --repeat runs) and measures peak traced memory (one extra run under
+tracemalloc) for:
+  parse_file                  ledger CSV, risk CSV and multi-page PDF uploads
+  extract_financial_metrics   ledger and risk DataFrames
+  determine_industry          ledger and risk DataFrames
+  _analyze_rule_based         --calls calls on one ledger's metrics
+  encrypt_data / decrypt_data --calls round trips of one ledger's metric buckets
+  upload                      POST /api/v1/analysis/upload through the FastAPI app on SQLite
+
+Inputs come from benchmarks.synthetic, sized by --sizes (rows) and --pdf-pages.
+The advisor runs rule-based (OPENAI_API_KEY is ignored): LLM latency is not what
+the suite measures. Results are written as JSON; `compare` flags cases slower or
+hungrier than a stored baseline by more than the thresholds and exits 1 if any are.
+
+Usage (from backend/):
+    python -m benchmarks.suite run --sizes 1k,100k,1M --output results.json
+    python -m benchmarks.suite run --sizes 1k,100k --baseline baseline.json
+    python -m benchmarks.suite compare results.json baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.pop("OPENAI_API_KEY", None)
+
+import numpy as np
+import pandas as pd
+
+from app.core import security
+from app.services import parser, ai_advisor
+from . import synthetic
+
+# Differences below these are noise whatever the ratio
+MIN_SECONDS_DELTA = 0.005
+MIN_MEMORY_DELTA_MIB = 1.0
+
+
+def measure(func, setup=None, repeat=3, memory=True):
+    """Median/min wall time over `repeat` runs of func(setup()), then peak memory of one more."""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    result = {"seconds": statistics.median(times), "min_seconds": min(times), "repeat": repeat}
+    if memory:
+        arg = setup() if setup else None
+        tracemalloc.start()
+        try:
+            func(arg)
+            result["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def data_cases(size, repeat, memory):
+    ledger_csv = synthetic.csv_bytes("ledger", size)
+    risk_csv = synthetic.csv_bytes("risk", size)
+    ledger_df = parser.parse_file(ledger_csv, "ledger.csv")
+    risk_df = parser.parse_file(risk_csv, "risk.csv")
+
+    # extract_financial_metrics renames columns in place, so each run gets a shallow copy
+    yield f"parse_file/ledger_csv/{size}", measure(lambda _: parser.parse_file(ledger_csv, "ledger.csv"), repeat=repeat, memory=memory)
+    yield f"parse_file/risk_csv/{size}", measure(lambda _: parser.parse_file(risk_csv, "risk.csv"), repeat=repeat, memory=memory)
+    yield f"extract_financial_metrics/ledger/{size}", measure(parser.extract_financial_metrics, lambda: ledger_df.copy(deep=False), repeat, memory)
+    yield f"extract_financial_metrics/risk/{size}", measure(parser.extract_financial_metrics, lambda: risk_df.copy(deep=False), repeat, memory)
+    yield f"determine_industry/ledger/{size}", measure(parser.determine_industry, lambda: ledger_df, repeat, memory)
+    yield f"determine_industry/risk/{size}", measure(parser.determine_industry, lambda: risk_df, repeat, memory)
+
+
+def pdf_cases(pages, repeat, memory):
+    content = synthetic.statement_pdf(pages)
+    yield f"parse_file/pdf/{pages}_pages", measure(lambda _: parser.parse_file(content, "statement.pdf"), repeat=repeat, memory=memory)
+
+
+def advisor_cases(calls, repeat, memory):
+    metrics = parser.extract_financial_metrics(synthetic.ledger(1000))
+    buckets = {k: v for k, v in metrics.items() if k != "raw_text"}
+    token = security.encrypt_data(buckets)
+
+    def analyze(_):
+        for _ in range(calls):
+            ai_advisor._analyze_rule_based(metrics, "en")
+
+    def encrypt(_):
+        for _ in range(calls):
+            security.encrypt_data(buckets)
+
+    def decrypt(_):
+        for _ in range(calls):
+            security.decrypt_data(token)
+
+    for name, func in [("_analyze_rule_based", analyze), ("encrypt_data", encrypt), ("decrypt_data", decrypt)]:
+        result = measure(func, repeat=repeat, memory=memory)
+        result["calls"] = calls
+        result["per_call_us"] = result["seconds"] / calls * 1e6
+        yield f"{name}/{calls}_calls", result
+
+
+def upload_cases(sizes, repeat, memory, database_url):
+    os.environ["DATABASE_URL"] = database_url
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        for size in sizes:
+            content = synthetic.csv_bytes("ledger", size)
+
+            def upload(_):
+                response = client.post("/api/v1/analysis/upload", files={"file": ("ledger.csv", content, "text/csv")})
+                response.raise_for_status()
+
+            yield f"upload/ledger_csv/{size}", measure(upload, repeat=repeat, memory=memory)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def run(args):
+    sizes = [synthetic.parse_count(s) for s in args.sizes.split(",")]
+    pages = [synthetic.parse_count(p) for p in args.pdf_pages.split(",") if p]
+    upload_sizes = [s for s in sizes if s <= args.upload_max_rows]
+    memory = not args.no_memory
+
+    groups = [data_cases(size, args.repeat, memory) for size in sizes]
+    groups += [pdf_cases(p, args.repeat, memory) for p in pages]
+    groups.append(advisor_cases(args.calls, args.repeat, memory))
+    if upload_sizes:
+        groups.append(upload_cases(upload_sizes, args.repeat, memory, args.database_url))
+
+    results = {}
+    for group in groups:
+        for name, result in group:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = result
+            peak = f"{result['peak_mib']:9.1f} MiB" if "peak_mib" in result else ""
+            print(f"{name:<44} {result['seconds'] * 1000:10.1f} ms {peak}", flush=True)
+
+    report = {"environment": environment(), "settings": vars(args) | {"command": "run"}, "results": results}
+    report["settings"].pop("func", None)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            return print_comparison(report, json.load(f), args.threshold, args.memory_threshold)
+    return 0
+
+
+def compare_results(current, baseline, threshold, memory_threshold):
+    """Per case present in both: time and memory ratios and whether either regressed."""
+    rows = []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        row = {"case": name, "seconds": now["seconds"], "baseline_seconds": before["seconds"],
+               "time_ratio": now["seconds"] / before["seconds"] if before["seconds"] else None, "regressions": []}
+        if now["seconds"] > before["seconds"] * (1 + threshold) and now["seconds"] - before["seconds"] > MIN_SECONDS_DELTA:
+            row["regressions"].append("time")
+        if "peak_mib" in now and "peak_mib" in before:
+            row["peak_mib"], row["baseline_peak_mib"] = now["peak_mib"], before["peak_mib"]
+            row["memory_ratio"] = now["peak_mib"] / before["peak_mib"] if before["peak_mib"] else None
+            if now["peak_mib"] > before["peak_mib"] * (1 + memory_threshold) and now["peak_mib"] - before["peak_mib"] > MIN_MEMORY_DELTA_MIB:
+                row["regressions"].append("memory")
+        rows.append(row)
+    return rows
+
+
+def print_comparison(current, baseline, threshold, memory_threshold):
+    rows = compare_results(current, baseline, threshold, memory_threshold)
+    print(f"\nbaseline {baseline['environment'].get('commit')} ({baseline['environment'].get('timestamp')})"
+          f" vs current {current['environment'].get('commit')}")
+    for row in rows:
+        memory = f"  mem x{row['memory_ratio']:.2f}" if row.get("memory_ratio") else ""
+        flag = "  REGRESSION (" + ", ".join(row["regressions"]) + ")" if row["regressions"] else ""
+        print(f"{row['case']:<44} {row['baseline_seconds'] * 1000:10.1f} -> {row['seconds'] * 1000:10.1f} ms"
+              f"  x{row['time_ratio'] or 0:.2f}{memory}{flag}")
+    only_current = sorted(set(current["results"]) - set(baseline["results"]))
+    only_baseline = sorted(set(baseline["results"]) - set(current["results"]))
+    if only_current:
+        print(f"not in baseline: {', '.join(only_current)}")
+    if only_baseline:
+        print(f"not in current run: {', '.join(only_baseline)}")
+    regressed = [row["case"] for row in rows if row["regressions"]]
+    print(f"{len(regressed)} regression(s) in {len(rows)} compared case(s)")
+    return 1 if regressed else 0
+
+
+def compare(args):
+    with open(args.current) as f:
+        current = json.load(f)
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    return print_comparison(current, baseline, args.threshold, args.memory_threshold)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--sizes", default="1k,100k", help="Comma-separated row counts, e.g. 1k,100k,1M,10M")
+    run_parser.add_argument("--pdf-pages", default="10,100", help="Comma-separated PDF page counts (empty to skip)")
+    run_parser.add_argument("--calls", type=int, default=10000, help="Calls per advisor/encryption case")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (faster on large sizes)")
+    run_parser.add_argument("--upload-max-rows", type=synthetic.parse_count, default=1_000_000, help="Largest size also run through the upload endpoint")
+    run_parser.add_argument("--filter", help="Only record cases whose name contains this")
+    run_parser.add_argument("--database-url", default="sqlite:///bench_suite.db", help="Database for the upload cases")
+    run_parser.add_argument("--output", help="Write results JSON here")
+    run_parser.add_argument("--baseline", help="Compare against this results JSON after running")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare two results files")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.set_defaults(func=compare)
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)")
+        sub.add_argument("--memory-threshold", type=float, default=0.2, help="Allowed peak memory growth")
+
+    args = arg_parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Synthetic financial data for the benchmarks.
+
+  ledger         rows shaped like detailed_sample.csv (Date, Description, Category, Amount)
+  risk           applicants shaped like financial_risk_assessment.csv (same columns,
+                 value sets, ranges and ~15% missing numeric cells)
+  pdf            a multi-page text statement whose lines parse with pdf_parser.LINE_PATTERN
+
+Output is deterministic for a given seed; large tables are generated in chunks, each
+chunk seeded on its own, so a 10M-row CSV never needs 10M rows in memory.
+
+Usage (from backend/):
+    python -m benchmarks.synthetic ledger --rows 10M --output ledger_10m.csv
+    python -m benchmarks.synthetic pdf --pages 200 --output statement.pdf
+"""
+import argparse
+import io
+from datetime import date
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+START_DATE = np.datetime64(date(2023, 1, 1), "D")
+
+# Category -> (share of rows, description prefix, median amount)
+LEDGER_CATEGORIES = {
+    "Revenue (Sales)": (0.20, "Client Payment", 30000),
+    "Revenue": (0.08, "Service Income", 20000),
+    "Expenses": (0.25, "Operating Expense", 800),
+    "Expenses (Rent)": (0.04, "Office Rent", 2000),
+    "Inventory": (0.10, "Inventory Purchase", 8000),
+    "Loan Interest": (0.05, "Loan Repayment", 1500),
+    "Tax": (0.04, "GST Payment", 3000),
+    "Accounts Receivable": (0.12, "Pending Invoice", 5000),
+    "Accounts Payable": (0.12, "Vendor Bill", 2000),
+}
+
+RISK_CATEGORIES = {
+    "Gender": (["Male", "Female", "Non-binary"], None),
+    "Education Level": (["High School", "Bachelor's", "Master's", "PhD"], None),
+    "Marital Status": (["Single", "Married", "Divorced", "Widowed"], None),
+    "Loan Purpose": (["Auto", "Business", "Home", "Personal"], None),
+    "Employment Status": (["Employed", "Self-employed", "Unemployed"], None),
+    "Payment History": (["Excellent", "Good", "Fair", "Poor"], None),
+    "Risk Rating": (["Low", "Medium", "High"], [0.6, 0.3, 0.1]),
+}
+RISK_COLUMNS = [
+    "Age", "Gender", "Education Level", "Marital Status", "Income", "Credit Score", "Loan Amount",
+    "Loan Purpose", "Employment Status", "Years at Current Job", "Payment History", "Debt-to-Income Ratio",
+    "Assets Value", "Number of Dependents", "City", "State", "Country", "Previous Defaults",
+    "Marital Status Change", "Risk Rating",
+]
+# Numeric columns left empty in ~15% of rows, as in the real dataset
+RISK_SPARSE = ["Income", "Credit Score", "Loan Amount", "Assets Value", "Number of Dependents", "Previous Defaults"]
+MISSING_RATE = 0.15
+STATES = ["AK", "AL", "AZ", "CA", "CO", "FL", "GA", "IL", "MA", "NY", "OH", "PA", "TX", "WA", "WY"]
+COUNTRIES = ["Cyprus", "India", "Kenya", "Peru", "Turkmenistan", "Vietnam", "Chile", "Norway", "Ghana", "Nepal"]
+CITY_NAMES = np.array([f"City {i}" for i in range(10000)], dtype=object)
+
+
+def _rng(seed: int, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([seed, chunk])
+
+
+def ledger(rows: int, seed: int = 0, chunk: int = 0, start: int = 0) -> pd.DataFrame:
+    """`rows` ledger lines numbered from `start`, roughly 8 a day from 2023-01-01."""
+    rng = _rng(seed, chunk)
+    names = list(LEDGER_CATEGORIES)
+    shares, prefixes, medians = (np.array(v, dtype=object) for v in zip(*LEDGER_CATEGORIES.values()))
+    which = rng.choice(len(names), size=rows, p=shares.astype(float))
+    numbers = np.arange(start, start + rows)
+    amounts = np.round(medians.astype(float)[which] * rng.lognormal(0.0, 0.5, rows))
+    return pd.DataFrame({
+        "Date": (START_DATE + numbers // 8).astype(str),
+        "Description": pd.Series(prefixes[which]).str.cat(pd.Series(numbers).astype(str), sep=" #"),
+        "Category": np.asarray(names, dtype=object)[which],
+        "Amount": amounts.astype(np.int64),
+    })
+
+
+def risk(rows: int, seed: int = 0, chunk: int = 0, start: int = 0) -> pd.DataFrame:
+    """`rows` loan applicants."""
+    rng = _rng(seed, chunk)
+    data = {
+        "Age": rng.integers(18, 70, rows),
+        "Income": rng.integers(20000, 120000, rows).astype(float),
+        "Credit Score": rng.integers(600, 800, rows).astype(float),
+        "Loan Amount": rng.integers(5000, 50000, rows).astype(float),
+        "Years at Current Job": rng.integers(0, 20, rows),
+        "Debt-to-Income Ratio": rng.uniform(0.1, 0.6, rows),
+        "Assets Value": rng.integers(20000, 300000, rows).astype(float),
+        "Number of Dependents": rng.integers(0, 5, rows).astype(float),
+        "City": CITY_NAMES[rng.integers(0, len(CITY_NAMES), rows)],
+        "State": np.asarray(STATES, dtype=object)[rng.integers(0, len(STATES), rows)],
+        "Country": np.asarray(COUNTRIES, dtype=object)[rng.integers(0, len(COUNTRIES), rows)],
+        "Previous Defaults": rng.integers(0, 5, rows).astype(float),
+        "Marital Status Change": rng.integers(0, 3, rows),
+    }
+    for column, (values, weights) in RISK_CATEGORIES.items():
+        data[column] = np.asarray(values, dtype=object)[rng.choice(len(values), size=rows, p=weights)]
+    for column in RISK_SPARSE:
+        data[column][rng.random(rows) < MISSING_RATE] = np.nan
+    return pd.DataFrame(data, columns=RISK_COLUMNS)
+
+
+GENERATORS = {"ledger": ledger, "risk": risk}
+
+
+def iter_chunks(kind: str, rows: int, seed: int = 0, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    generate = GENERATORS[kind]
+    for chunk, start in enumerate(range(0, rows, chunk_rows)):
+        yield generate(min(chunk_rows, rows - start), seed, chunk, start)
+
+
+def frame(kind: str, rows: int, seed: int = 0) -> pd.DataFrame:
+    return pd.concat(iter_chunks(kind, rows, seed), ignore_index=True)
+
+
+def write_csv(kind: str, rows: int, output, seed: int = 0) -> None:
+    """Writes the table to a path or binary file object chunk by chunk."""
+    handle = open(output, "wb") if isinstance(output, str) else output
+    try:
+        for chunk, df in enumerate(iter_chunks(kind, rows, seed)):
+            handle.write(df.to_csv(index=False, header=chunk == 0).encode())
+    finally:
+        if handle is not output:
+            handle.close()
+
+
+def csv_bytes(kind: str, rows: int, seed: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    write_csv(kind, rows, buffer, seed)
+    return buffer.getvalue()
+
+
+def statement_lines(pages: int, lines_per_page: int = 40, seed: int = 0) -> List[List[str]]:
+    """Per page, "Office Rent: $2,000.00" lines drawn from the ledger generator."""
+    df = ledger(pages * lines_per_page, seed)
+    labels = df["Description"].str.replace(r" #\d+$", "", regex=True)
+    lines = (labels + ": $" + df["Amount"].map("{:,}.00".format)).tolist()
+    return [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def statement_pdf(pages: int, lines_per_page: int = 40, seed: int = 0) -> bytes:
+    """A minimal uncompressed PDF (Helvetica text, one content stream per page)."""
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_lines = statement_lines(pages, lines_per_page, seed)
+    pages_id = 1 + 2 * len(page_lines) + 1
+    kids = []
+    for lines in page_lines:
+        stream = "\n".join(["BT /F1 10 Tf 40 800 Td 12 TL"] + [f"({_escape(line)}) Tj T*" for line in lines] + ["ET"]).encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 842] /Contents %d 0 R /Resources << /Font << /F1 1 0 R >> >> >>"
+            % (pages_id, len(objects))
+        )
+        kids.append(len(objects))
+    objects.append(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    objects.append(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return bytes(out)
+
+
+def parse_count(text: str) -> int:
+    """"10k" -> 10000, "1M" -> 1000000, "2500" -> 2500."""
+    text = text.strip()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("kind", choices=["ledger", "risk", "pdf"])
+    arg_parser.add_argument("--rows", type=parse_count, default=1000)
+    arg_parser.add_argument("--pages", type=parse_count, default=10)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--output", required=True)
+    args = arg_parser.parse_args()
+
+    if args.kind == "pdf":
+        with open(args.output, "wb") as f:
+            f.write(statement_pdf(args.pages, seed=args.seed))
+        print(f"wrote {args.pages:,} pages to {args.output}")
+    else:
+        write_csv(args.kind, args.rows, args.output, args.seed)
+        print(f"wrote {args.rows:,} {args.kind} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
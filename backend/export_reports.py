@@ -0,0 +1,47 @@
+"""
+Exports every FinancialReport, decrypted, as NDJSON, CSV or Parquet.
+
+Reports are streamed from a server-side cursor and decrypted in parallel batches,
+so memory stays flat however many reports there are. Run from the repository root:
+
+  python -m backend.export_reports --format parquet --output reports.parquet --industry Retail --risk High
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from backend.app.database import SessionLocal
+from backend.app.services import export
+
+def report_progress(done, elapsed):
+    rate = done / elapsed if elapsed else 0
+    print(f"Exported {done} reports ({rate:.0f} rows/s)", file=sys.stderr)
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--format", choices=export.FORMATS, default="ndjson")
+    arg_parser.add_argument("--output", default="-", help="File to write (default: stdout)")
+    arg_parser.add_argument("--industry")
+    arg_parser.add_argument("--risk", help="Risk tier: Low, Medium or High")
+    arg_parser.add_argument("--from", dest="created_from", type=datetime.fromisoformat, help="Created at or after (ISO date/time)")
+    arg_parser.add_argument("--to", dest="created_to", type=datetime.fromisoformat, help="Created before (ISO date/time)")
+    arg_parser.add_argument("--batch-size", type=int, default=export.EXPORT_BATCH_SIZE)
+    arg_parser.add_argument("--workers", type=int, default=export.EXPORT_WORKERS)
+    args = arg_parser.parse_args()
+
+    filters = {"industry": args.industry, "risk": args.risk, "created_from": args.created_from, "created_to": args.created_to}
+    stats = {}
+    db = SessionLocal()
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in export.export_reports(db, args.format, args.batch_size, args.workers, report_progress, stats, **filters):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        db.close()
+        export.shutdown()
+    print(f"Done: {stats}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Rebuilds the industry peer-benchmark sketches from every stored FinancialReport.
+
+Uploads update the sketches incrementally; run this after bulk imports, changes to
+the peer ratios or if the sketches drift (from the repository root):
+    python -m backend.rebuild_peers
+"""
+import argparse
+import time
+
+from backend.app.database import SessionLocal
+from backend.app.services import peers
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--batch-size", type=int, default=peers.REBUILD_BATCH_SIZE)
+    args = arg_parser.parse_args()
+
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        result = peers.rebuild(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"Done in {time.monotonic() - started:.1f}s: {result}")
+
+if __name__ == "__main__":
+    main()
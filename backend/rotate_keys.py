@@ -0,0 +1,33 @@
+"""
+Re-encrypts every FinancialReport and its line items under the current ENCRYPTION_KEY.
+
+Rotation procedure:
+  1. Set ENCRYPTION_KEY to the new key and ENCRYPTION_OLD_KEYS to the previous key(s)
+     and deploy; the app keeps reading old rows while new rows use the new key.
+  2. Run this command (from the repository root):  python -m backend.rotate_keys
+  3. Once it finishes, ENCRYPTION_OLD_KEYS can be emptied.
+"""
+import argparse
+
+from backend.app.database import SessionLocal
+from backend.app.services import key_rotation
+
+def report_progress(done, total, elapsed):
+    rate = done / elapsed if elapsed else 0
+    print(f"Rotated {done}/{total} reports ({rate:.0f} rows/s)")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--batch-size", type=int, default=key_rotation.ROTATION_BATCH_SIZE)
+    arg_parser.add_argument("--workers", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = key_rotation.rotate_all(db, args.batch_size, args.workers, report_progress)
+    finally:
+        db.close()
+    print(f"Done: {result}")
+
+if __name__ == "__main__":
+    main()
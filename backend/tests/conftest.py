@@ -0,0 +1,25 @@
+import os
+import sys
+import tempfile
+
+# Isolated settings, applied before the app (and its engines) is imported
+_scratch = tempfile.mkdtemp(prefix="fhp-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'app.db')}")
+os.environ.setdefault("ENCRYPTION_KEY", "gHJSYiNEA2XPZ_fGuT3KFRqrT4e5iA3sCK0FZ4CVxWI=")
+os.environ.setdefault("PARSE_CACHE_DIR", os.path.join(_scratch, "parse_cache"))
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(_scratch, "jobs.db"))
+os.environ.setdefault("JOB_SPOOL_DIR", os.path.join(_scratch, "job_uploads"))
+# Rule-based advisor only: tests never reach an LLM
+os.environ.pop("OPENAI_API_KEY", None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,51 @@
+import itertools
+
+import pytest
+
+from app.services import ai_advisor
+
+def metrics_grid():
+    """Metrics dicts crossing every input the rule-based scorer branches on."""
+    grid = []
+    revenues = [0, 1000, 250000.5]
+    profits = [-500, 0, 40, 120, 30000]
+    debts = [0, 550, 700, 200000]
+    inventories = [0, 350, 450]
+    industries = ["General", "Retail", "Manufacturing", "Services", "Agriculture", "Logistics"]
+    taxes = [0, 12.5]
+    runways = [None, 30, 89.6, 400]
+    for revenue, profit, debt, inventory, industry, tax, runway in itertools.product(
+        revenues, profits, debts, inventories, industries, taxes, runways,
+    ):
+        metrics = {
+            "revenue_streams": {"total": revenue},
+            "net_profit": profit,
+            "loan_obligations": {"total": debt},
+            "inventory_levels": {"total": inventory},
+            "tax_compliance": {"total": tax},
+            "industry": industry,
+        }
+        if runway is not None:
+            metrics["cash_flow"] = {"runway_days": runway}
+        grid.append(metrics)
+    # Missing buckets fall back to the same defaults on both paths
+    grid += [{}, {"net_profit": -1}, {"revenue_streams": {"total": 10}, "cash_flow": None}]
+    return grid
+
+@pytest.mark.parametrize("language", ["en", "hi"])
+def test_analyze_batch_matches_per_report_analysis(language):
+    grid = metrics_grid()
+    expected = [ai_advisor.analyze_financial_health(m, language) for m in grid]
+    assert ai_advisor.analyze_batch(grid, language) == expected
+
+@pytest.mark.parametrize("language", ["en", "hi"])
+def test_score_batch_matches_per_report_analysis(language):
+    grid = metrics_grid()
+    expected = [ai_advisor.analyze_financial_health(m, language) for m in grid]
+    risks, scores = ai_advisor.score_batch(grid, language)
+    assert risks == [e["risk_assessment"] for e in expected]
+    assert scores == [e["credit_score_estimate"] for e in expected]
+
+def test_batches_of_nothing():
+    assert ai_advisor.analyze_batch([]) == []
+    assert ai_advisor.score_batch([]) == ([], [])
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.bank_sync import CircuitOpenError, ProviderClient
+from app.services.banking import ProviderError
+
+class ScriptedProvider:
+    """Raises (or returns) the next scripted outcome on each get_balance call."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    async def get_balance(self, account_id):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setenv("BANK_TEST_BREAKER_THRESHOLD", "1")
+    monkeypatch.setenv("BANK_TEST_BREAKER_RESET", "0.05")
+    monkeypatch.setenv("BANK_TEST_MAX_RETRIES", "0")
+
+def half_open_client(outcomes):
+    client = ProviderClient("test", ScriptedProvider([ProviderError("down", retryable=False), *outcomes]))
+    with pytest.raises(ProviderError):
+        asyncio.run(client.call("get_balance", "acc"))
+    assert client.breaker.state == "open"
+    time.sleep(0.1)
+    return client
+
+def test_malformed_trial_response_reopens_the_breaker(breaker_settings):
+    client = half_open_client([KeyError("balance"), 10.0])
+    with pytest.raises(KeyError):
+        asyncio.run(client.call("get_balance", "acc"))
+    assert client.breaker.state == "open"
+    assert client.counters["failures"] == 2
+
+    time.sleep(0.1)
+    assert asyncio.run(client.call("get_balance", "acc")) == 10.0
+    assert client.breaker.state == "closed"
+
+def test_cancelled_trial_lets_the_next_call_through(breaker_settings):
+    client = half_open_client([asyncio.CancelledError(), 10.0])
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(client.call("get_balance", "acc"))
+    assert client.breaker.state == "half_open"
+
+    # Before the fix the trial slot stayed taken and this was rejected forever
+    assert asyncio.run(client.call("get_balance", "acc")) == 10.0
+    assert client.breaker.state == "closed"
+    assert client.counters["rejected"] == 0
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def upload_ledger(client, name):
+    csv = b"Date,Category,Amount\n2024-01-05,Sales Revenue,1200\n2024-01-09,Office Rent,-400\n"
+    response = client.post("/api/v1/analysis/upload", files={"file": (name, csv)})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def test_syncing_the_same_account_into_two_reports_keeps_both_linked(client):
+    first, second = upload_ledger(client, "first.csv"), upload_ledger(client, "second.csv")
+    for report_id in (first, second):
+        response = client.post("/api/v1/banking/sync/plaid", params={"report_id": report_id})
+        assert response.status_code == 200, response.text
+
+    for report_id in (first, second):
+        data = client.get(f"/api/v1/analysis/{report_id}").json()["banking_data"]
+        assert [a["provider"] for a in data["accounts"]] == ["plaid"]
+        assert data["transaction_count"] > 0
+        assert client.get(f"/api/v1/banking/{report_id}/cashflow").status_code == 200
+
+    transactions = client.get("/api/v1/banking/accounts/plaid/acc_12345/transactions", params={"report_id": first})
+    assert transactions.status_code == 200 and transactions.json()["transactions"]
+
+def test_startup_rescopes_an_existing_bank_accounts_table(tmp_path):
+    path = tmp_path / "old.db"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE bank_accounts (
+            id INTEGER NOT NULL PRIMARY KEY, provider VARCHAR NOT NULL, account_id VARCHAR NOT NULL,
+            report_id INTEGER, cursor VARCHAR, balance FLOAT, transaction_count INTEGER, last_sync DATETIME,
+            CONSTRAINT uq_bank_accounts_provider_account UNIQUE (provider, account_id)
+        );
+        CREATE INDEX ix_bank_accounts_id ON bank_accounts (id);
+        INSERT INTO bank_accounts (provider, account_id, report_id, cursor, transaction_count) VALUES ('plaid', 'acc_1', 7, '40', 40);
+    """)
+    conn.close()
+
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}"}
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=BACKEND, env=env, check=True)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT provider, account_id, report_id, cursor, transaction_count FROM bank_accounts").fetchall() == [
+        ("plaid", "acc_1", 7, "40", 40)
+    ]
+    # The same account can now be linked to a second report
+    conn.execute("INSERT INTO bank_accounts (provider, account_id, report_id, transaction_count) VALUES ('plaid', 'acc_1', 8, 0)")
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(bank_accounts)")}
+    assert "ix_bank_accounts_id" in indexes
+    conn.close()
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from app.database import SessionLocal
+from app.services import export
+
+@pytest.fixture
+def reports(client):
+    csv = b"Date,Category,Amount\n2024-01-05,Sales Revenue,1200\n2024-01-09,Office Rent,-400\n"
+    for i in range(5):
+        response = client.post("/api/v1/analysis/upload", files={"file": (f"export_{i}.csv", csv + f"2024-01-1{i},Misc,{i}\n".encode())})
+        assert response.status_code == 200
+
+def run_export(fmt, workers):
+    db = SessionLocal()
+    try:
+        return b"".join(export.export_reports(db, fmt, batch_size=2, workers=workers))
+    finally:
+        db.close()
+
+def test_exports_share_one_decryption_pool(reports):
+    export.shutdown()
+    try:
+        inline = run_export("ndjson", 0)
+        assert run_export("ndjson", 2) == inline
+        pool = export._pool
+        assert pool is not None
+        assert run_export("csv", 2) == run_export("csv", 0)
+        assert export._pool is pool
+    finally:
+        export.shutdown()
+    assert len([json.loads(line) for line in inline.splitlines()]) >= 5
@@ -0,0 +1,58 @@
+from cryptography.fernet import Fernet, MultiFernet
+import pytest
+
+from app.core import security
+from app.database import SessionLocal
+from app.models import FinancialReport
+from app.services import key_rotation
+
+LEDGER = b"Date,Category,Amount\n2024-01-05,Sales Revenue,1200\n2024-01-09,Office Rent,-400\n"
+
+@pytest.fixture
+def new_key(monkeypatch):
+    key = Fernet.generate_key().decode()
+    monkeypatch.setattr(security, "OLD_KEYS", [security.KEY])
+    monkeypatch.setattr(security, "cipher_suite", MultiFernet([Fernet(key.encode()), Fernet(security.KEY.encode())]))
+    original = security.KEY
+    monkeypatch.setattr(security, "KEY", key)
+    yield key
+    # Rotate back so later tests can read every report with the session's key
+    monkeypatch.setattr(security, "OLD_KEYS", [key])
+    monkeypatch.setattr(security, "cipher_suite", MultiFernet([Fernet(original.encode()), Fernet(key.encode())]))
+    monkeypatch.setattr(security, "KEY", original)
+    db = SessionLocal()
+    try:
+        key_rotation.rotate_all(db, workers=1)
+    finally:
+        db.close()
+
+def test_rotation_keeps_rows_updated_while_it_runs(client, new_key, monkeypatch):
+    for i in range(3):
+        assert client.post("/api/v1/analysis/upload", files={"file": (f"rotate_{i}.csv", LEDGER + f"2024-02-0{i + 1},Misc,{i}\n".encode())}).status_code == 200
+
+    raced = []
+    write_rotated = key_rotation.write_rotated
+
+    def concurrent_update(db, updates):
+        if not raced:
+            # The app rewrites a report after rotation read it but before the write
+            other = SessionLocal()
+            report = other.get(FinancialReport, updates[0]["id"])
+            report.sensitive_data = security.encrypt_envelope({"revenue_streams": {"total": 42}})
+            other.commit()
+            other.close()
+            raced.append(updates[0]["id"])
+        return write_rotated(db, updates)
+
+    monkeypatch.setattr(key_rotation, "write_rotated", concurrent_update)
+    db = SessionLocal()
+    try:
+        result = key_rotation.rotate_all(db, batch_size=2, workers=1)
+        assert result["rotated"] == result["total"]
+        only_new_key = Fernet(new_key.encode())
+        for report in db.query(FinancialReport).all():
+            only_new_key.decrypt(report.sensitive_data.encode())
+        raced_report = db.get(FinancialReport, raced[0])
+        assert security.open_envelope(raced_report.sensitive_data).get("revenue_streams") == {"total": 42}
+    finally:
+        db.close()
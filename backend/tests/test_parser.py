@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from app.services import parser
+
+def per_row_ledger(categories, amounts):
+    """The original row-by-row ledger loop that aggregate_ledger replaces."""
+    metrics = parser.empty_metrics()
+    for category, raw in zip(categories, amounts):
+        category = str(category)
+        try:
+            amount = float(raw)
+        except:
+            continue
+        if parser.matches(category, parser.KEYWORDS["revenue"]):
+            metrics["revenue_streams"]["total"] += amount
+            metrics["revenue_streams"]["categories"][category] = amount
+        elif parser.matches(category, parser.KEYWORDS["expenses"]):
+            metrics["cost_structure"]["total"] += amount
+            metrics["cost_structure"]["categories"][category] = amount
+        for bucket, key in parser.DETAIL_BUCKETS.items():
+            if parser.matches(category, parser.KEYWORDS[bucket]):
+                metrics[key]["total"] += amount
+                metrics[key]["details"].append({"item": category, "amount": amount})
+    return metrics
+
+def assert_same(actual, expected):
+    for key in ["revenue_streams", "cost_structure"] + list(parser.DETAIL_BUCKETS.values()):
+        assert actual[key]["total"] == pytest.approx(expected[key]["total"]), key
+        if "categories" in expected[key]:
+            assert list(actual[key]["categories"].items()) == pytest.approx(list(expected[key]["categories"].items())), key
+        if "details" in expected[key]:
+            assert actual[key]["details"] == expected[key]["details"], key
+
+# One label per keyword of every bucket, so each bucket (and overlaps such as
+# "Sales Tax" or "Loan Interest") is exercised
+KEYWORD_LABELS = [word.title() for words in parser.KEYWORDS.values() for word in words]
+MIXED_LABELS = KEYWORD_LABELS + ["Sales Tax", "Loan Interest Payable", "Misc", None, 42, "42", float("nan")]
+
+ROWS = len(MIXED_LABELS) * 3
+
+@pytest.mark.parametrize("amounts", [
+    pytest.param(pd.Series([float(i) * 3.5 - 20 for i in range(ROWS)]), id="numeric"),
+    pytest.param(pd.Series([str(i) if i % 4 else "n/a" for i in range(ROWS)]), id="strings"),
+    pytest.param(pd.Series([i if i % 5 else None for i in range(ROWS)], dtype=object), id="objects-with-none"),
+    pytest.param(pd.Series([f"{i}.25" if i % 3 else pd.NA for i in range(ROWS)], dtype=object), id="strings-with-na"),
+])
+def test_aggregate_ledger_matches_per_row_loop(amounts):
+    categories = (MIXED_LABELS * 3)[:len(amounts)]
+    # The old loop saw the column's own values (iterrows), not the Python inputs
+    expected = per_row_ledger(categories, amounts.tolist())
+    actual = parser.aggregate_ledger(pd.Series(categories, dtype=object), amounts, parser.empty_metrics())
+    assert_same(actual, expected)
+
+def test_aggregate_ledger_folds_chunks_like_one_pass():
+    categories = (MIXED_LABELS * 4)
+    amounts = [float(i) for i in range(len(categories))]
+    metrics = parser.empty_metrics()
+    for start in range(0, len(categories), 7):
+        parser.aggregate_ledger(pd.Series(categories[start:start + 7], dtype=object), pd.Series(amounts[start:start + 7]), metrics)
+    assert_same(metrics, per_row_ledger(categories, amounts))
+
+def test_classify_categories_marks_each_keyword_bucket():
+    _, _, masks = parser.classify_categories(pd.Series(KEYWORD_LABELS, dtype=object))
+    for row, label in enumerate(KEYWORD_LABELS):
+        for bucket, words in parser.KEYWORDS.items():
+            expected = parser.matches(label, words)
+            if bucket == "expenses":
+                expected = expected and not parser.matches(label, parser.KEYWORDS["revenue"])
+            assert masks[bucket][row] == expected, (label, bucket)
+
+def test_coerce_amounts_skips_what_float_rejects():
+    values, valid = parser.coerce_amounts(pd.Series(["1.5", "x", None, 3, "1e3", pd.NA], dtype=object))
+    assert valid.tolist() == [True, False, False, True, True, False]
+    assert values[valid].tolist() == [1.5, 3.0, 1000.0]
@@ -0,0 +1,78 @@
+import io
+import multiprocessing
+import threading
+import time
+
+import pytest
+from pypdf import PdfWriter
+
+from app.services import pdf_parser
+
+def blank_pdf(pages: int) -> bytes:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=200, height=200)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def stalled_extract(content, start, stop):
+    """Stands in for a pathological page."""
+    time.sleep(60)
+    return [[] for _ in range(start, stop)]
+
+def slow_extract(content, start, stop):
+    time.sleep(0.5)
+    return [[{"Description": f"Page {i}", "Amount": float(i)}] for i in range(start, stop)]
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(pdf_parser, "PDF_WORKERS", 2)
+    monkeypatch.setattr(pdf_parser, "PDF_PAGES_PER_TASK", 1)
+    pdf_parser.shutdown()
+    yield
+    pdf_parser.shutdown()
+
+def test_small_document_is_extracted_in_process(fresh_pool):
+    stats = {}
+    assert list(pdf_parser.iter_pdf_rows(blank_pdf(3), stats=stats)) == []
+    assert stats == {"pages_total": 3, "pages_parsed": 3, "truncated": False}
+    assert pdf_parser._pool is None
+
+def test_large_document_goes_through_the_shared_pool(fresh_pool, monkeypatch):
+    monkeypatch.setattr(pdf_parser, "PDF_PARALLEL_MIN_PAGES", 0)
+    monkeypatch.setattr(pdf_parser, "_extract_pages", slow_extract)
+    stats = {}
+    assert [row["Amount"] for row in pdf_parser.iter_pdf_rows(blank_pdf(3), stats=stats)] == [0.0, 1.0, 2.0]
+    assert stats["pages_parsed"] == 3 and pdf_parser._pool is not None
+
+def test_timeout_stops_only_the_slow_documents_workers(fresh_pool, monkeypatch):
+    monkeypatch.setattr(pdf_parser, "PDF_PARALLEL_MIN_PAGES", 0)
+    monkeypatch.setattr(pdf_parser, "_extract_pages", slow_extract)
+    healthy = {}
+
+    def parse_healthy():
+        healthy["rows"] = list(pdf_parser.iter_pdf_rows(blank_pdf(3)))
+
+    reader = threading.Thread(target=parse_healthy)
+    reader.start()
+
+    monkeypatch.setattr(pdf_parser, "_extract_pages", stalled_extract)
+    isolated = []
+    # multiprocessing.Pool names its workers ForkPoolWorker-N; the shared executor's are ForkProcess-N
+    watcher = threading.Timer(0.3, lambda: isolated.extend(p for p in multiprocessing.active_children() if "PoolWorker" in p.name))
+    watcher.start()
+    stats = {}
+    started = time.monotonic()
+    assert list(pdf_parser.iter_pdf_rows(blank_pdf(2), time_budget=1, stats=stats)) == []
+    assert time.monotonic() - started < 10
+    assert stats["truncated"] and stats["pages_parsed"] == 0
+
+    watcher.join()
+    assert isolated
+    for process in isolated:
+        process.join(timeout=5)
+        assert not process.is_alive()
+
+    reader.join(timeout=30)
+    assert [row["Amount"] for row in healthy["rows"]] == [0.0, 1.0, 2.0]
@@ -0,0 +1,24 @@
+import json
+
+from sqlalchemy.exc import IntegrityError
+
+from app.services import peers
+
+LEDGER = b"Date,Category,Amount\n2024-01-05,Sales Revenue,1200\n2024-01-09,Office Rent,-400\n"
+
+def failing_record(db, observations):
+    raise IntegrityError("INSERT INTO peer_sketches", {}, Exception("UNIQUE constraint failed"))
+
+def test_upload_succeeds_when_the_sketch_update_fails(client, monkeypatch):
+    monkeypatch.setattr(peers, "record", failing_record)
+    response = client.post("/api/v1/analysis/upload", files={"file": ("peer_race.csv", LEDGER + b"2024-01-10,Misc,1\n")})
+    assert response.status_code == 200, response.text
+    report_id = response.json()["id"]
+    assert client.get(f"/api/v1/analysis/{report_id}").status_code == 200
+
+def test_bulk_upload_succeeds_when_the_sketch_update_fails(client, monkeypatch):
+    monkeypatch.setattr(peers, "record", failing_record)
+    response = client.post("/api/v1/analysis/bulk", files=[("files", ("peer_bulk.csv", LEDGER + b"2024-01-11,Misc,2\n"))])
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["status"] == "completed" and lines[0]["report_id"], lines
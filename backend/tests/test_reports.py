@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+import pytest
+
+from app.services import parser, streaming
+
+RISK_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "financial_risk_assessment.csv")
+
+def risk_rows(start, stop) -> bytes:
+    lines = open(RISK_CSV, "rb").read().splitlines(keepends=True)
+    return b"".join([lines[0]] + lines[1 + start:1 + stop])
+
+def compared(report):
+    return {
+        **{f"revenue/{k}": v for k, v in report["revenue_streams"]["categories"].items()},
+        "revenue": report["revenue_streams"]["total"],
+        "costs": report["cost_structure"]["total"],
+        "loans": report["loan_obligations"]["total"],
+    }
+
+def test_rows_append_to_a_streamed_risk_upload(client):
+    response = client.post("/api/v1/analysis/upload", params={"stream": "true"}, files={"file": ("risk_head.csv", risk_rows(0, 300))})
+    assert response.status_code == 200, response.text
+    report_id = response.json()["id"]
+
+    response = client.patch(f"/api/v1/analysis/{report_id}/rows", files={"file": ("risk_tail.csv", risk_rows(300, 500))})
+    assert response.status_code == 200, response.text
+
+    whole = client.post("/api/v1/analysis/upload", files={"file": ("risk_all.csv", risk_rows(0, 500))})
+    assert whole.status_code == 200
+    assert compared(response.json()) == pytest.approx(compared(whole.json()))
+    for field in ("risk_assessment", "credit_score_estimate"):
+        assert response.json()[field] == whole.json()[field]
+
+def test_risk_state_stored_with_every_column_still_merges(tmp_path):
+    # Streamed uploads used to keep the whole header in their stored state
+    path = tmp_path / "head.csv"
+    path.write_bytes(risk_rows(0, 300))
+    old = streaming.MetricsAccumulator()
+    with pd.read_csv(path, chunksize=100) as reader:
+        for chunk in reader:
+            old.update(chunk)
+    stored = streaming.MetricsAccumulator.from_state(old.state(), {})
+
+    tail = parser.parse_file(risk_rows(300, 500), "tail.csv")
+    merged = stored.merge(streaming.MetricsAccumulator().update(tail)).result()
+    whole = parser.extract_financial_metrics(parser.parse_file(risk_rows(0, 500), "all.csv"))
+    assert compared(merged) == pytest.approx(compared(whole))
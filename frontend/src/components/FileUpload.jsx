@@ -31,13 +31,13 @@ const FileUpload = ({ onUploadSuccess, language = 'en' }) => {
         <div className="card glass-card upload-component">
             <h3>Upload Financial Records</h3>
             <p style={{ color: 'var(--text-muted)', marginBottom: '1rem' }}>
-                Upload your CSV, Excel, or PDF statements.
+                Upload your CSV, Excel, PDF, Parquet or Feather statements.
             </p>
 
             <input
                 type="file"
                 onChange={handleFileChange}
-                accept=".csv,.xlsx,.xls,.pdf"
+                accept=".csv,.xlsx,.xls,.pdf,.parquet,.feather"
                 style={{ marginBottom: '1rem', color: 'var(--text-main)' }}
             />
 